@@ -13,6 +13,7 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 
 from ask_docs.core import (
     ask_question, 
+    ask_many,
     preview_matches, 
     build_or_rebuild_kb, 
     get_kb_info
@@ -33,10 +34,12 @@ app = typer.Typer(
 # Create subcommands
 tui_app = typer.Typer(help="Terminal User Interface for AskDocs")
 web_app = typer.Typer(help="Web Interface for AskDocs")
+cache_app = typer.Typer(help="Manage the LLM response cache")
 
 # Add the subcommands to the main app
 app.add_typer(tui_app, name="tui")
 app.add_typer(web_app, name="web")
+app.add_typer(cache_app, name="cache")
 
 @app.command()
 def ask(
@@ -47,10 +50,19 @@ def ask(
     evaluate: bool = typer.Option(False, "--evaluate", "-e", help="Evaluate answer quality and confidence"),
     source_dir: str = typer.Option(None, "--source-dir", "-d", help="Source directory for documents"),
     output_json: bool = typer.Option(False, "--json", "-j", help="Output results as JSON"),
-    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show verbose output")
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show verbose output"),
+    no_stream: bool = typer.Option(False, "--no-stream", help="Print the answer only once it is complete"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ask the LLM even if the response is cached")
 ):
     """Ask a question about your documents."""
     console = Console()
+    streamed = False
+    
+    def print_header():
+        print("\n[yellow]Question:[/yellow]")
+        print(f"{question}")
+        
+        print("\n[yellow]Answer:[/yellow]")
     
     with Progress(
         SpinnerColumn(),
@@ -59,13 +71,26 @@ def ask(
         console=console
     ) as progress:
         progress.add_task(description="Processing question...", total=None)
+        
+        def print_token(token: str) -> None:
+            # The spinner stays up until the first piece of the answer arrives
+            nonlocal streamed
+            if not streamed:
+                progress.stop()
+                print_header()
+                streamed = True
+            sys.stdout.write(token)
+            sys.stdout.flush()
+        
         result = ask_question(
             question=question, 
             model=model, 
             rebuild_kb=rebuild,
             template_name=template,
             evaluate=evaluate,
-            source_dir=source_dir
+            source_dir=source_dir,
+            on_token=None if output_json or no_stream else print_token,
+            use_cache=not no_cache
         )
     
     # Output as JSON if requested
@@ -77,11 +102,11 @@ def ask(
     answer = result["answer"]
     model_used = result["model"]
     
-    print("\n[yellow]Question:[/yellow]")
-    print(f"{question}")
-    
-    print("\n[yellow]Answer:[/yellow]")
-    print(f"{answer}")
+    if streamed:
+        sys.stdout.write("\n")
+    else:
+        print_header()
+        print(f"{answer}")
     
     # Print source information if verbose
     if verbose:
@@ -121,6 +146,65 @@ def ask(
     # Print model information
     print(f"\n[dim]Model: {model_used}[/dim]")
 
+@app.command()
+def ask_batch(
+    input_file: str = typer.Argument(..., help="JSONL file of questions, or - for stdin"),
+    output_file: str = typer.Option("-", "--output", "-o", help="JSONL file for the answers, or - for stdout"),
+    model: str = typer.Option(None, "--model", "-m", help="LLM model to use (openai, ollama, claude, gemini, groq)"),
+    template: str = typer.Option(None, "--template", "-t", help="Prompt template to use (isolation, complementary, supplementary)"),
+    source_dir: str = typer.Option(None, "--source-dir", "-d", help="Source directory for documents"),
+    concurrency: int = typer.Option(None, "--concurrency", "-c", help="Concurrent LLM requests (default: the provider's max_concurrency)"),
+    batch_size: int = typer.Option(None, "--batch-size", help="Questions retrieved together (default: query_batch_size)"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ask the LLM even if the response is cached")
+):
+    """Answer a JSONL file of questions, writing one JSON answer per line as each finishes.
+    
+    Each input line is an object with a "question" field (other fields, such
+    as an id, are copied to the output) or just a JSON string.
+    """
+    if input_file == "-":
+        lines = sys.stdin.readlines()
+    else:
+        with open(input_file, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    
+    records = []
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"[red]Error: line {line_number} is not valid JSON: {e}[/red]", file=sys.stderr)
+            raise typer.Exit(1)
+        if isinstance(record, str):
+            record = {"question": record}
+        if not isinstance(record, dict) or not isinstance(record.get("question"), str):
+            print(f"[red]Error: line {line_number} has no \"question\" string[/red]", file=sys.stderr)
+            raise typer.Exit(1)
+        records.append(record)
+    
+    results = ask_many(
+        [record["question"] for record in records],
+        model=model,
+        template_name=template,
+        source_dir=source_dir,
+        use_cache=not no_cache,
+        max_concurrency=concurrency,
+        batch_size=batch_size
+    )
+    
+    out = sys.stdout if output_file == "-" else open(output_file, "w", encoding="utf-8")
+    try:
+        for count, result in enumerate(results, 1):
+            out.write(json.dumps({**records[result["index"]], **result}) + "\n")
+            out.flush()
+            if out is not sys.stdout:
+                print(f"[dim]Answered {count}/{len(records)}[/dim]", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
 @app.command()
 def list_models():
     """List available LLM models."""
@@ -134,7 +218,7 @@ def list_models():
     table.add_column("API Key Set", style="green")
     
     for provider, provider_config in config["llm"].items():
-        if provider == "default_model":
+        if not isinstance(provider_config, dict):
             continue
             
         # Check if this provider has an API key configured
@@ -160,6 +244,7 @@ def preview(
     question: str,
     top_n: int = typer.Option(4, "--top", "-n", help="Number of top matches to return"),
     source_dir: str = typer.Option(None, "--source-dir", "-d", help="Source directory for documents"),
+    mode: str = typer.Option(None, "--mode", help="Retrieval mode (semantic, lexical, hybrid)"),
     output_json: bool = typer.Option(False, "--json", "-j", help="Output results as JSON")
 ):
     """Preview the top matching documents for a question."""
@@ -169,7 +254,7 @@ def preview(
         transient=True,
     ) as progress:
         progress.add_task(description="Finding matches...", total=None)
-        matches = preview_matches(question, top_n, source_dir)
+        matches = preview_matches(question, top_n, source_dir, mode=mode)
     
     # Output as JSON if requested
     if output_json:
@@ -198,14 +283,19 @@ def build_kb(
     embedding_model: str = typer.Option(None, "--embedding-model", "-m", 
                                        help="Embedding model to use for semantic search"),
     force: bool = typer.Option(False, "--force", "-f", 
-                              help="Force rebuild even if no changes detected"),
+                              help="Force a full rebuild instead of updating only changed files"),
     source_dir: str = typer.Option(None, "--source-dir", "-d",
-                                   help="Source directory for documents")
+                                   help="Source directory for documents"),
+    jobs: int = typer.Option(None, "--jobs", "-j",
+                             help="Number of processes used to compute embeddings"),
+    watch: bool = typer.Option(False, "--watch", "-w",
+                               help="Keep running and update the knowledge base as documents change")
 ):
     """Build or rebuild the knowledge base.
     
     This command processes all documents in your source directory, 
     splits them into chunks, and optionally computes embeddings for semantic search.
+    With --watch it then keeps the knowledge base up to date until interrupted.
     """
     console = Console()
     config = get_rag_config()
@@ -236,13 +326,18 @@ def build_kb(
         progress.console.print(f"  Embedding model: {embedding_model}")
         progress.console.print("")
         
+        def report_progress(done, total):
+            progress.update(task, description=f"Processing documents ({done}/{total} files)...")
+        
         num_chunks = build_or_rebuild_kb(
             save_embeddings=save_embeddings,
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             embedding_model=embedding_model,
             force=force,
-            source_dir=source_dir
+            source_dir=source_dir,
+            progress=report_progress,
+            jobs=jobs
         )
         
         progress.update(task, description="Knowledge base built successfully!")
@@ -258,7 +353,21 @@ def build_kb(
     # Print path info
     kb_dir = config.get("kb_dir", ".kb")
     print(f"\n[yellow]Knowledge base location:[/yellow]")
-    print(f"{source_dir}/{kb_dir}/knowledge_base.json")
+    print(f"{source_dir}/{kb_dir}/")
+    
+    if watch:
+        from ask_docs.core.watcher import SourceWatcher
+        
+        watcher = SourceWatcher(source_dir)
+        watcher.start()
+        print("[cyan]Press Ctrl+C to stop watching.[/cyan]")
+        try:
+            watcher.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.stop()
+        print(f"[green]Stopped watching after {watcher.updates} updates.[/green]")
 
 @app.command()
 def check_embedding_libs():
@@ -365,6 +474,17 @@ def kb_info(
             embedding_model = metadata.get("embedding_model")
             if embedding_model:
                 table.add_row("Embedding Model", embedding_model)
+                storage = metadata.get("embedding_dtype", "float32")
+                if metadata.get("embedding_rescore"):
+                    storage += " (rescored at full precision)"
+                table.add_row("Embedding Storage", storage)
+                projection = metadata.get("embedding_projection")
+                if projection:
+                    dimensions = f"{projection['input_dim']} -> {projection['dim']} ({projection['method']}"
+                    if projection.get("recall_at_k") is not None:
+                        dimensions += (f", recall@{projection['recall_k']} {projection['recall_at_k']:.2f}"
+                                       f" on {projection['recall_queries']} held-out chunks")
+                    table.add_row("Embedding Dimensions", dimensions + ")")
             else:
                 table.add_row("Embedding Model", "[yellow]None (using lexical search)[/yellow]")
                 
@@ -403,6 +523,7 @@ def config_info(
     table.add_column("Value")
     
     table.add_row("Default Model", config["llm"]["default_model"])
+    table.add_row("Connection Pool Size", str(config["llm"].get("pool_size")))
     for provider, provider_config in config["llm"].items():
         if provider == "default_model":
             continue
@@ -456,10 +577,63 @@ def config_info(
     
     print("Environment: Environment variables take precedence")
 
+@cache_app.command("stats")
+def cache_stats(
+    output_json: bool = typer.Option(False, "--json", "-j", help="Output as JSON")
+):
+    """Show LLM response cache statistics."""
+    from ask_docs.llm.response_cache import get_response_cache
+    
+    cache = get_response_cache()
+    if cache is None:
+        print("[yellow]The response cache is disabled (cache.enabled in config.json).[/yellow]")
+        return
+    
+    stats = cache.stats()
+    if output_json:
+        print(json.dumps(stats, indent=2))
+        return
+    
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+    ttl = f"{stats['ttl'] / 3600:g} hours" if stats["ttl"] > 0 else "never expires"
+    
+    table = Table(title="LLM Response Cache")
+    table.add_column("Property", style="cyan")
+    table.add_column("Value")
+    
+    table.add_row("Path", stats["path"])
+    table.add_row("Entries", str(stats["entries"]))
+    table.add_row("Size", f"{stats['size_bytes'] / (1024 * 1024):.2f} MB of {stats['max_size_mb']:g} MB")
+    table.add_row("Hits", str(stats["hits"]))
+    table.add_row("Misses", str(stats["misses"]))
+    table.add_row("Hit Rate", hit_rate)
+    table.add_row("Evictions", str(stats["evictions"]))
+    table.add_row("TTL", ttl)
+    for provider, count in sorted(stats["providers"].items()):
+        table.add_row(f"{provider.title()} Entries", str(count))
+    
+    Console().print(table)
+
+@cache_app.command("clear")
+def cache_clear():
+    """Remove all cached LLM responses."""
+    from ask_docs.llm.response_cache import get_response_cache
+    
+    cache = get_response_cache()
+    if cache is None:
+        print("[yellow]The response cache is disabled (cache.enabled in config.json).[/yellow]")
+        return
+    
+    removed = cache.clear()
+    print(f"[green]Removed {removed} cached responses.[/green]")
+
 # TUI subcommand
 @tui_app.callback(invoke_without_command=True)
 def tui_main(
     ctx: typer.Context,
+    watch: bool = typer.Option(False, "--watch", "-w",
+                               help="Update the knowledge base as documents change"),
 ):
     """Launch the Terminal User Interface for AskDocs."""
     # Only continue if this is the command being invoked
@@ -468,7 +642,7 @@ def tui_main(
             # Import the run_app function from the TUI module
             from ask_docs.tui.app import run_app
             # Run the TUI app
-            run_app()
+            run_app(watch=watch)
         except ImportError:
             print("[red]Error: Textual library is required for the TUI.[/red]")
             print("Install it with: [bold]pip install textual>=0.52.1[/bold]")
@@ -484,6 +658,9 @@ def web_main(
     ctx: typer.Context,
     host: str = typer.Option(None, "--host", "-h", help="Host to bind to"),
     port: int = typer.Option(None, "--port", "-p", help="Port to listen on"),
+    watch: Optional[bool] = typer.Option(None, "--watch/--no-watch", "-w",
+                                         help="Update the knowledge base as documents change "
+                                              "(defaults to the web.watch setting)"),
 ):
     """Launch the Web Interface for AskDocs."""
     # Only continue if this is the command being invoked
@@ -492,7 +669,7 @@ def web_main(
             # Import the serve_app function from the web module
             from ask_docs.web.app import serve_app
             # Run the web app
-            serve_app(host=host, port=port)
+            serve_app(host=host, port=port, watch=watch)
         except ImportError:
             print("[red]Error: FastHTML is required for the web interface.[/red]")
             print("Install it with: [bold]pip install python-fasthtml[/bold]")
@@ -17,6 +17,9 @@ DEFAULT_CONFIG = {
     # LLM Provider settings
     "llm": {
         "default_model": "openai",  # Default LLM provider to use
+        "pool_size": 10,  # Idle HTTP connections kept open per provider
+        "keepalive_expiry": 30.0,  # Seconds an idle provider connection is kept open
+        "max_concurrency": 4,  # Concurrent requests per provider in batch runs (a provider's own setting wins)
         "openai": {
             "model": "gpt-3.5-turbo"
         },
@@ -42,6 +45,44 @@ DEFAULT_CONFIG = {
         "chunk_overlap": 200,  # Overlap between chunks in characters
         "embedding_model": "all-MiniLM-L6-v2",  # Default embedding model
         "kb_dir": ".kb",       # Subdirectory name for knowledge base files
+        "include_patterns": [],  # Only load files matching these globs (empty = all)
+        "exclude_patterns": [],  # Skip files and directories matching these globs
+        "exclude_dirs": ["node_modules", "__pycache__"],  # Directory names never crawled
+        "respect_gitignore": True,  # Skip paths ignored by .gitignore files
+        "load_workers": 0,     # Threads reading documents (0 = automatic)
+        "ingest_batch_size": 512,  # Chunks embedded and written per batch during builds
+        "embedding_batch_size": 32,  # Texts per embedding model batch
+        "embedding_jobs": 1,   # Processes computing embeddings during builds
+        "embedding_dtype": "float32",  # Stored embedding precision: float32, float16 or int8
+        "embedding_rescore_factor": 0,  # Rescore top_n * this many candidates at full precision (0 = off; keeps a float32 copy)
+        "embedding_dim": 0,    # Project stored embeddings down to this many dimensions (0 = keep all)
+        "embedding_reduction": "pca",  # How to reduce dimensions: pca or truncate (Matryoshka models)
+        "max_loaded_models": 2,  # Embedding models kept in memory at once
+        "query_cache_size": 1024,  # Query embeddings cached in memory (0 = off)
+        "retrieval_cache_size": 256,  # Query rankings cached per KB version (0 = off)
+        "kb_memory_budget_mb": 1024,  # Loaded knowledge bases kept in memory, across source dirs
+        "watch_backend": "auto",  # File change events for --watch: auto, watchdog or poll
+        "watch_debounce": 1.0,    # Seconds without changes before a watched KB is updated
+        "watch_poll_interval": 2.0,  # Seconds between scans when polling for changes
+        "query_batch_size": 64,  # Questions retrieved together by ask_many / ask-batch
+        "retrieval_mode": "semantic",  # semantic, lexical or hybrid
+        "hybrid_candidates": 50,  # Candidates each side contributes in hybrid mode
+        "rrf_k": 60,             # Reciprocal-rank fusion constant for hybrid mode
+        "ann_backend": "auto",     # ANN index: auto, hnswlib, faiss, ivf or none
+        "ann_min_chunks": 50000,   # Use the ANN index at or above this many chunks
+        "ann_nlist": 0,            # IVF lists (0 = choose from the number of chunks)
+        "ann_nprobe": 16,          # IVF lists searched per query (higher = better recall)
+        "ann_hnsw_m": 16,          # HNSW graph degree
+        "ann_ef_construction": 200,  # HNSW build-time search breadth
+        "ann_ef_search": 64,       # HNSW query-time search breadth (higher = better recall)
+    },
+    
+    # LLM response cache settings
+    "cache": {
+        "enabled": False,  # Opt in to answering repeated prompts from the on-disk response cache
+        "path": "~/.docbuddy/response_cache.sqlite3",  # SQLite database shared by the CLI, TUI and web interface
+        "ttl": 604800,  # Seconds a cached response stays valid (0 = never expires)
+        "max_size_mb": 100  # Least recently used responses are evicted beyond this size
     },
     
     # Prompt templates
@@ -84,7 +125,10 @@ Answer:
         "title": "AskDocs",
         "host": "0.0.0.0",
         "port": 8000,
-        "debug": True
+        "debug": True,
+        "watch": False,  # Update the knowledge base as documents change (like web --watch)
+        "retrieval_workers": 8,  # Threads running retrieval for web requests
+        "max_concurrent_questions": 256  # Questions answered at once; further requests wait
     },
     
     # CLI settings
@@ -7,21 +7,51 @@ from ask_docs.core.document_retrieval import (
 )
 from ask_docs.core.query_processor import (
     process_query,
+    process_query_async,
     ask_question,
+    ask_question_async,
+    ask_many,
+    stream_question,
+    stream_question_async,
     preview_matches,
+    get_matches,
     build_or_rebuild_kb,
     get_kb_info
 )
 from ask_docs.core.prompt_builder import build_prompt
+from ask_docs.core.embeddings import (
+    get_embedding_model,
+    warmup_embedding_models,
+    query_cache_stats
+)
+from ask_docs.core.retrieval_cache import retrieval_cache_stats
+from ask_docs.core.knowledge_base import (
+    KnowledgeBase,
+    get_knowledge_base,
+    loaded_knowledge_bases
+)
 
 __all__ = [
     "build_knowledge_base",
     "get_matching_documents",
     "process_query",
+    "process_query_async",
     "ask_question",
+    "ask_question_async",
+    "ask_many",
+    "stream_question",
+    "stream_question_async",
     "preview_matches",
+    "get_matches",
     "build_or_rebuild_kb",
     "get_kb_info",
     "build_prompt",
-    "kb_info"
+    "kb_info",
+    "get_embedding_model",
+    "warmup_embedding_models",
+    "query_cache_stats",
+    "retrieval_cache_stats",
+    "KnowledgeBase",
+    "get_knowledge_base",
+    "loaded_knowledge_bases"
 ]
\ No newline at end of file
@@ -0,0 +1,394 @@
+"""Approximate nearest-neighbour indexes for large AskDocs knowledge bases.
+
+Exact search scores every chunk, so its cost grows linearly with the size of
+the knowledge base. Above a configurable number of chunks, retrieval switches
+to an approximate index built alongside the knowledge base:
+
+- ``hnswlib``: HNSW graph, used when hnswlib is installed
+- ``faiss``: IVF-flat index, used when faiss is installed
+- ``ivf``: IVF-flat index implemented with NumPy, always available
+
+All indexes work on the L2-normalized embedding matrix and rank by inner
+product, which equals cosine similarity for normalized vectors.
+"""
+import json
+import math
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ask_docs.config import get_rag_config
+from ask_docs.core.atomic_io import replace_atomic, save_json, save_npy
+from ask_docs.core.vector_search import normalize_rows, top_k_indices
+
+# Defaults for the ann_* settings in the rag config
+DEFAULT_ANN_BACKEND = "auto"
+DEFAULT_ANN_MIN_CHUNKS = 50000
+DEFAULT_ANN_NPROBE = 16
+DEFAULT_ANN_HNSW_M = 16
+DEFAULT_ANN_EF_CONSTRUCTION = 200
+DEFAULT_ANN_EF_SEARCH = 64
+
+ANN_META_FILE = "ann.json"
+IVF_CENTROIDS_FILE = "ann_ivf_centroids.npy"
+IVF_OFFSETS_FILE = "ann_ivf_offsets.npy"
+IVF_IDS_FILE = "ann_ivf_ids.npy"
+HNSW_FILE = "ann_hnsw.bin"
+FAISS_FILE = "ann_faiss.index"
+
+ANN_FILES = (ANN_META_FILE, IVF_CENTROIDS_FILE, IVF_OFFSETS_FILE, IVF_IDS_FILE, HNSW_FILE, FAISS_FILE)
+
+# Rows scored per block when assigning vectors to IVF lists
+_ASSIGN_BLOCK = 65536
+
+
+def _ann_setting(name: str, default: Any) -> Any:
+    """Read an ann_* setting from the rag config."""
+    return get_rag_config().get(name, default)
+
+
+def _default_nlist(num_vectors: int) -> int:
+    """Choose a number of IVF lists for a given number of vectors."""
+    return max(1, min(num_vectors, int(4 * math.sqrt(num_vectors))))
+
+
+def _resolve_backend(backend: str) -> Optional[str]:
+    """Resolve the configured backend name to an available backend, or None if disabled."""
+    if backend in (None, "none", "off"):
+        return None
+    if backend == "auto":
+        for candidate in ("hnswlib", "faiss"):
+            try:
+                __import__(candidate)
+                return candidate
+            except ImportError:
+                continue
+        return "ivf"
+    return backend
+
+
+class IVFFlatIndex:
+    """Inverted-file index with exact scoring inside the probed lists, built with NumPy."""
+
+    backend = "ivf"
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, ids: np.ndarray):
+        """Initialize the index.
+
+        Args:
+            centroids: Normalized list centroids, shape (nlist, dim)
+            offsets: Start of each list in ``ids`` (length nlist + 1)
+            ids: Row indices grouped by list
+        """
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, nlist: int = 0, iterations: int = 10,
+              seed: int = 0) -> "IVFFlatIndex":
+        """Cluster the embeddings with spherical k-means and build the lists.
+
+        Args:
+            embeddings: L2-normalized embedding matrix
+            nlist: Number of lists, or 0 to choose from the number of rows
+            iterations: Number of k-means iterations
+            seed: Random seed for centroid initialization
+
+        Returns:
+            A new IVFFlatIndex
+        """
+        n = embeddings.shape[0]
+        nlist = min(nlist or _default_nlist(n), n)
+        rng = np.random.default_rng(seed)
+
+        # Train on a sample so build time does not grow with nlist * n
+        sample_size = min(n, max(nlist * 64, 10000))
+        sample = np.asarray(embeddings[np.sort(rng.choice(n, sample_size, replace=False))])
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                # Restart empty lists from random sample points
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        assignment = np.empty(n, dtype=np.int32)
+        for start in range(0, n, _ASSIGN_BLOCK):
+            block = np.asarray(embeddings[start:start + _ASSIGN_BLOCK])
+            assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        ids = np.argsort(assignment, kind="stable").astype(np.int64)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignment, minlength=nlist))
+        return cls(centroids, offsets, ids)
+
+    def search(self, embeddings: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the rows most similar to a normalized query.
+
+        The number of lists probed is read from the ``ann_nprobe`` setting.
+
+        Args:
+            embeddings: The embedding matrix the index was built from
+            query: Normalized query embedding
+            k: Number of results
+
+        Returns:
+            Tuple of (row indices, scores), best first
+        """
+        nprobe = int(_ann_setting("ann_nprobe", DEFAULT_ANN_NPROBE))
+        lists = top_k_indices(self.centroids @ query, nprobe)
+        candidates = np.concatenate([self.ids[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+        if candidates.size == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+        candidates.sort()
+        scores = np.asarray(embeddings[candidates]) @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+    def update(self, keep: np.ndarray, embeddings: np.ndarray) -> "IVFFlatIndex":
+        """Get an index without some of the rows and with new rows after the rest.
+
+        New rows are assigned to the nearest existing centroid; the centroids
+        are not trained again.
+
+        Args:
+            keep: Boolean mask over the indexed rows of those to keep
+            embeddings: Normalized embeddings of the new rows, numbered after the kept rows
+
+        Returns:
+            A new IVFFlatIndex sharing this index's centroids
+        """
+        keep = np.asarray(keep, dtype=bool)
+        row_map = np.cumsum(keep) - 1
+        nlist = len(self.centroids)
+        ids = np.asarray(self.ids)
+        kept = keep[ids]
+        lists = np.repeat(np.arange(nlist), np.diff(self.offsets))[kept]
+
+        new_rows = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        num_kept = int(keep.sum())
+        assignment = np.concatenate([lists, np.argmax(new_rows @ self.centroids.T, axis=1)])
+        row_ids = np.concatenate([row_map[ids[kept]], np.arange(num_kept, num_kept + len(new_rows))])
+
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignment, minlength=nlist))
+        return IVFFlatIndex(self.centroids, offsets, row_ids[order].astype(np.int64))
+
+    def save(self, kb_path_dir: str) -> None:
+        """Save the index to a knowledge base directory."""
+        save_npy(os.path.join(kb_path_dir, IVF_CENTROIDS_FILE), self.centroids)
+        save_npy(os.path.join(kb_path_dir, IVF_OFFSETS_FILE), self.offsets)
+        save_npy(os.path.join(kb_path_dir, IVF_IDS_FILE), self.ids)
+
+    @classmethod
+    def load(cls, kb_path_dir: str, meta: Dict[str, Any]) -> "IVFFlatIndex":
+        """Load the index from a knowledge base directory."""
+        return cls(
+            np.load(os.path.join(kb_path_dir, IVF_CENTROIDS_FILE)),
+            np.load(os.path.join(kb_path_dir, IVF_OFFSETS_FILE)),
+            np.load(os.path.join(kb_path_dir, IVF_IDS_FILE), mmap_mode="r")
+        )
+
+
+class HNSWIndex:
+    """HNSW graph index backed by hnswlib."""
+
+    backend = "hnswlib"
+
+    def __init__(self, index: Any):
+        """Initialize the index.
+
+        Args:
+            index: A populated ``hnswlib.Index``
+        """
+        self.index = index
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, m: int = DEFAULT_ANN_HNSW_M,
+              ef_construction: int = DEFAULT_ANN_EF_CONSTRUCTION) -> "HNSWIndex":
+        """Build an HNSW graph over the embeddings."""
+        import hnswlib
+        n, dim = embeddings.shape
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.init_index(max_elements=n, ef_construction=ef_construction, M=m)
+        index.add_items(np.ascontiguousarray(embeddings, dtype=np.float32), np.arange(n))
+        return cls(index)
+
+    def search(self, embeddings: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the rows most similar to a normalized query.
+
+        The search breadth is read from the ``ann_ef_search`` setting.
+        """
+        k = min(k, self.index.get_current_count())
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        self.index.set_ef(max(k, int(_ann_setting("ann_ef_search", DEFAULT_ANN_EF_SEARCH))))
+        labels, distances = self.index.knn_query(query, k=k)
+        # hnswlib reports inner product distance as 1 - similarity
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def save(self, kb_path_dir: str) -> None:
+        """Save the index to a knowledge base directory."""
+        replace_atomic(os.path.join(kb_path_dir, HNSW_FILE), self.index.save_index)
+
+    @classmethod
+    def load(cls, kb_path_dir: str, meta: Dict[str, Any]) -> "HNSWIndex":
+        """Load the index from a knowledge base directory."""
+        import hnswlib
+        index = hnswlib.Index(space="ip", dim=meta["dim"])
+        index.load_index(os.path.join(kb_path_dir, HNSW_FILE), max_elements=meta["num_vectors"])
+        return cls(index)
+
+
+class FaissIVFIndex:
+    """IVF-flat index backed by faiss."""
+
+    backend = "faiss"
+
+    def __init__(self, index: Any):
+        """Initialize the index.
+
+        Args:
+            index: A trained and populated ``faiss.IndexIVFFlat``
+        """
+        self.index = index
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, nlist: int = 0) -> "FaissIVFIndex":
+        """Train an IVF-flat index on the embeddings and add them."""
+        import faiss
+        n, dim = embeddings.shape
+        nlist = min(nlist or _default_nlist(n), n)
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add(vectors)
+        return cls(index)
+
+    def search(self, embeddings: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the rows most similar to a normalized query.
+
+        The number of lists probed is read from the ``ann_nprobe`` setting.
+        """
+        self.index.nprobe = int(_ann_setting("ann_nprobe", DEFAULT_ANN_NPROBE))
+        scores, labels = self.index.search(query[None, :].astype(np.float32), k)
+        # faiss pads missing results with -1
+        found = labels[0] >= 0
+        return labels[0][found].astype(np.int64), scores[0][found]
+
+    def save(self, kb_path_dir: str) -> None:
+        """Save the index to a knowledge base directory."""
+        import faiss
+        replace_atomic(os.path.join(kb_path_dir, FAISS_FILE), lambda path: faiss.write_index(self.index, path))
+
+    @classmethod
+    def load(cls, kb_path_dir: str, meta: Dict[str, Any]) -> "FaissIVFIndex":
+        """Load the index from a knowledge base directory."""
+        import faiss
+        return cls(faiss.read_index(os.path.join(kb_path_dir, FAISS_FILE)))
+
+
+_BACKENDS = {cls.backend: cls for cls in (IVFFlatIndex, HNSWIndex, FaissIVFIndex)}
+
+
+def use_ann(num_chunks: int) -> bool:
+    """Check whether a knowledge base of this size should use an ANN index."""
+    return num_chunks >= int(_ann_setting("ann_min_chunks", DEFAULT_ANN_MIN_CHUNKS))
+
+
+def build_ann_index(embeddings: np.ndarray) -> Optional[Any]:
+    """Build an ANN index for an embedding matrix if it is large enough.
+
+    Args:
+        embeddings: L2-normalized embedding matrix
+
+    Returns:
+        The built index, or None if ANN search is disabled or the matrix is too small
+    """
+    backend = _resolve_backend(_ann_setting("ann_backend", DEFAULT_ANN_BACKEND))
+    if backend is None or embeddings is None or not use_ann(embeddings.shape[0]):
+        return None
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unsupported ANN backend: {backend}")
+
+    print(f"Building {backend} ANN index for {embeddings.shape[0]} chunks")
+    if backend == "hnswlib":
+        return HNSWIndex.build(
+            embeddings,
+            m=int(_ann_setting("ann_hnsw_m", DEFAULT_ANN_HNSW_M)),
+            ef_construction=int(_ann_setting("ann_ef_construction", DEFAULT_ANN_EF_CONSTRUCTION))
+        )
+    nlist = int(_ann_setting("ann_nlist", 0))
+    if backend == "faiss":
+        return FaissIVFIndex.build(embeddings, nlist=nlist)
+    return IVFFlatIndex.build(embeddings, nlist=nlist)
+
+
+def update_ann_index(index: Optional[Any], keep: np.ndarray, embeddings: np.ndarray) -> Optional[Any]:
+    """Carry an ANN index over to a table with some rows dropped and new rows appended.
+
+    IVF indexes are updated (see ``IVFFlatIndex.update``); hnswlib and faiss
+    indexes are dropped, so search is exact until an index is built again.
+
+    Args:
+        index: The table's current index, or None
+        keep: Boolean mask over the table's rows of those kept
+        embeddings: Normalized embeddings of the appended rows
+
+    Returns:
+        The updated index, or None
+    """
+    if isinstance(index, IVFFlatIndex):
+        return index.update(keep, embeddings)
+    return None
+
+
+def save_ann_index(kb_path_dir: str, index: Optional[Any], embeddings: Optional[np.ndarray]) -> None:
+    """Save an ANN index, or remove a stale one when ``index`` is None.
+
+    Args:
+        kb_path_dir: Knowledge base directory
+        index: Index to save, or None
+        embeddings: The embedding matrix the index was built from
+    """
+    for name in ANN_FILES:
+        path = os.path.join(kb_path_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    if index is None:
+        return
+
+    index.save(kb_path_dir)
+    meta = {
+        "backend": index.backend,
+        "num_vectors": int(embeddings.shape[0]),
+        "dim": int(embeddings.shape[1])
+    }
+    save_json(os.path.join(kb_path_dir, ANN_META_FILE), meta)
+
+
+def load_ann_index(kb_path_dir: str) -> Optional[Any]:
+    """Load the ANN index saved in a knowledge base directory.
+
+    Returns:
+        The loaded index, or None if there is none or its backend is not installed
+    """
+    meta_path = os.path.join(kb_path_dir, ANN_META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    try:
+        return _BACKENDS[meta["backend"]].load(kb_path_dir, meta)
+    except (ImportError, KeyError):
+        # Fall back to exact search if the backend is no longer available
+        return None
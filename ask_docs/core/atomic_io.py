@@ -0,0 +1,53 @@
+"""Atomic writes of knowledge base files.
+
+Loaded chunk tables memory-map their files, and a knowledge base may be saved
+again while they are still being searched (see ``ask_docs.core.watcher``).
+Writing a file in place would change, or truncate, the pages a live memory
+map reads. Every file is therefore written under a temporary name and moved
+into place with ``os.replace``, so readers keep the old file until they drop
+it.
+"""
+import json
+import os
+from typing import Any, BinaryIO, Callable
+
+import numpy as np
+
+
+def replace_atomic(path: str, write_to: Callable[[str], None]) -> None:
+    """Write a file through a temporary path, for writers that take a file name.
+
+    Args:
+        path: Final path of the file
+        write_to: Writes the file to the path it is given
+    """
+    tmp_path = path + ".tmp"
+    try:
+        write_to(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_atomic(path: str, write: Callable[[BinaryIO], Any]) -> None:
+    """Write a file through a temporary name so readers never see it half-written.
+
+    Args:
+        path: Final path of the file
+        write: Writes the contents to the binary file object it is given
+    """
+    def write_to(tmp_path):
+        with open(tmp_path, "wb") as f:
+            write(f)
+    replace_atomic(path, write_to)
+
+
+def save_npy(path: str, array: np.ndarray) -> None:
+    """Atomically save an array as an .npy file."""
+    write_atomic(path, lambda f: np.save(f, array))
+
+
+def save_json(path: str, data: Any) -> None:
+    """Atomically save JSON-serializable data."""
+    write_atomic(path, lambda f: f.write(json.dumps(data).encode("utf-8")))
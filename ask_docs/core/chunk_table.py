@@ -0,0 +1,540 @@
+"""Chunk storage for AskDocs knowledge bases.
+
+A ChunkTable keeps chunk metadata in parallel NumPy arrays alongside a single
+matrix of chunk embeddings, instead of one dictionary per chunk. Reading it
+yields ``ChunkRow`` views with the dictionary API, so it still behaves like a
+read-only sequence of chunk dictionaries for code that expects the old format,
+and filters and top-k selections run over whole columns at once.
+
+Chunk text is not copied per chunk: each chunk is a (document, start, end)
+byte range into one UTF-8 store (holding every document once for tables built
+from documents), and per-document fields (filename, path, type) live in a
+per-document table. Chunk text is only decoded when a chunk is actually read.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+class MappedTextColumn(Sequence):
+    """Read-only sequence of strings, each a byte range of a shared UTF-8 buffer."""
+
+    def __init__(self, buffer: Any, starts: Sequence[int], ends: Sequence[int]):
+        """Initialize the column.
+
+        Args:
+            buffer: Bytes-like object holding the texts, e.g. a memory map
+            starts: Byte offset where each text starts
+            ends: Byte offset where each text ends
+        """
+        self._buffer = buffer
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return bytes(self._buffer[self._starts[index]:self._ends[index]]).decode("utf-8")
+
+
+class AppendedTextStore:
+    """Text store made of a base buffer followed by appended UTF-8 bytes.
+
+    Lets documents be added to a loaded table without copying its (possibly
+    memory-mapped) text store. Every document is stored whole in one of the
+    two parts, so a byte range never spans both.
+    """
+
+    def __init__(self, base: Any, appended: bytes):
+        """Initialize the store.
+
+        Args:
+            base: Bytes-like buffer, or another AppendedTextStore to extend
+            appended: Bytes following the base
+        """
+        if isinstance(base, AppendedTextStore):
+            base, appended = base.base, base.appended + appended
+        self.base = base
+        self.appended = appended
+        self._base_length = len(base)
+
+    def __len__(self) -> int:
+        return self._base_length + len(self.appended)
+
+    def __getitem__(self, key: slice) -> bytes:
+        start, stop, _ = key.indices(len(self))
+        if start >= self._base_length:
+            return self.appended[start - self._base_length:stop - self._base_length]
+        return self.base[start:stop]
+
+
+class DocumentColumn(Sequence):
+    """Read-only per-chunk view of a per-document value."""
+
+    def __init__(self, doc_ids: Sequence[int], values: List[Any]):
+        """Initialize the column.
+
+        Args:
+            doc_ids: Document index of each chunk
+            values: Value for each document
+        """
+        self._doc_ids = doc_ids
+        self._values = values
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._values[self._doc_ids[index]]
+
+
+class ChunkRow(Mapping):
+    """Read-only view of one chunk that behaves like the old chunk dictionary.
+
+    Fields are read from the table's columns when accessed, either as
+    attributes (``row.content``) or with the dictionary API
+    (``row["content"]``, ``row.get(...)``, ``dict(row)``). The only per-row
+    storage is the table reference, the row index and the optional score.
+    """
+
+    __slots__ = ("table", "index", "similarity")
+
+    FIELDS = ("filename", "content", "chunk_id", "filepath", "file_type")
+
+    def __init__(self, table: "ChunkTable", index: int, similarity: Optional[float] = None):
+        """Initialize the view.
+
+        Args:
+            table: Table holding the chunk
+            index: Row index of the chunk
+            similarity: Optional score, exposed as the "similarity" key
+        """
+        self.table = table
+        self.index = index
+        self.similarity = similarity
+
+    @property
+    def doc_id(self) -> int:
+        return int(self.table.doc_ids[self.index])
+
+    @property
+    def filename(self) -> str:
+        return self.table.documents[self.doc_id]["filename"]
+
+    @property
+    def content(self) -> str:
+        return self.table.contents[self.index]
+
+    @property
+    def chunk_id(self) -> int:
+        return int(self.table.chunk_ids[self.index])
+
+    @property
+    def filepath(self) -> str:
+        return self.table.documents[self.doc_id].get("filepath", "")
+
+    @property
+    def file_type(self) -> str:
+        return self.table.documents[self.doc_id].get("file_type", "")
+
+    def _keys(self):
+        return self.FIELDS if self.similarity is None else self.FIELDS + ("similarity",)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"ChunkRow({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Copy the chunk into a plain dictionary."""
+        return {key: self[key] for key in self._keys()}
+
+
+class ChunkTable:
+    """Columnar table of document chunks with optional search indexes.
+
+    Each chunk is a row of small NumPy columns (document index, chunk index
+    and byte range in the text store) plus a row of the embedding matrix;
+    document-level fields are stored once per document. Reading the table
+    yields ``ChunkRow`` views, so it still behaves like a read-only list of
+    chunk dictionaries.
+    """
+
+    def __init__(
+        self,
+        documents: List[Dict[str, Any]],
+        text_store: Any,
+        doc_ids: Sequence[int],
+        chunk_ids: Sequence[int],
+        starts: Sequence[int],
+        ends: Sequence[int],
+        embeddings: Optional[Any] = None,
+        lexical_index: Optional[Any] = None,
+        ann_index: Optional[Any] = None,
+        version: Optional[str] = None,
+        projection: Optional[Any] = None
+    ):
+        """Initialize the chunk table.
+
+        Args:
+            documents: Per-document table with filename, filepath and file_type
+                (and, for stores of whole documents, the document's start and end)
+            text_store: Bytes-like UTF-8 buffer (or ``AppendedTextStore``) the chunk
+                offsets point into
+            doc_ids: Document index of each chunk
+            chunk_ids: Index of each chunk within its document
+            starts: Byte offset where each chunk starts
+            ends: Byte offset where each chunk ends
+            embeddings: L2-normalized float32 matrix with one row per chunk, or None
+            lexical_index: BM25 index over the chunk texts, or None
+            ann_index: Approximate nearest-neighbour index over the embeddings, or None
+            version: Identifies the knowledge base build the table was saved as, or
+                None for tables that only exist in memory
+            projection: ``EmbeddingProjection`` the embeddings were reduced with, to
+                apply to query embeddings, or None
+        """
+        self.documents = documents
+        self.text_store = text_store
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.chunk_ids = np.asarray(chunk_ids, dtype=np.int32)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.embeddings = embeddings
+        self.lexical_index = lexical_index
+        self.ann_index = ann_index
+        self.version = version
+        self.projection = projection
+
+        # Per-chunk views of the text store and the document table
+        self.contents = MappedTextColumn(text_store, self.starts, self.ends)
+        self.filenames = DocumentColumn(self.doc_ids, [d["filename"] for d in documents])
+        self.filepaths = DocumentColumn(self.doc_ids, [d.get("filepath", "") for d in documents])
+        self.file_types = DocumentColumn(self.doc_ids, [d.get("file_type", "") for d in documents])
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence[Dict[str, Any]]) -> "ChunkTable":
+        """Build a table from a list of chunk dictionaries.
+
+        Chunk texts are packed into one text store and document fields are
+        stored once per filename. Embeddings are taken from the chunks'
+        ``embedding`` keys when every chunk has one, and normalized into a
+        single matrix.
+
+        Args:
+            chunks: Chunk dictionaries as produced by ``create_document_chunks``
+
+        Returns:
+            A new ChunkTable
+        """
+        if isinstance(chunks, ChunkTable):
+            return chunks
+
+        embeddings = None
+        if chunks and all("embedding" in c for c in chunks):
+            from ask_docs.core.vector_search import normalize_rows
+            embeddings = normalize_rows(np.asarray([c["embedding"] for c in chunks]))
+
+        documents: List[Dict[str, Any]] = []
+        doc_index: Dict[str, int] = {}
+        doc_ids = np.empty(len(chunks), dtype=np.int32)
+        starts = np.empty(len(chunks), dtype=np.int64)
+        ends = np.empty(len(chunks), dtype=np.int64)
+        texts = []
+        offset = 0
+        for i, chunk in enumerate(chunks):
+            filename = chunk["filename"]
+            if filename not in doc_index:
+                doc_index[filename] = len(documents)
+                documents.append({
+                    "filename": filename,
+                    "filepath": chunk.get("filepath", ""),
+                    "file_type": chunk.get("file_type", "")
+                })
+            data = chunk["content"].encode("utf-8")
+            texts.append(data)
+            doc_ids[i] = doc_index[filename]
+            starts[i] = offset
+            ends[i] = offset + len(data)
+            offset += len(data)
+
+        return cls(
+            documents,
+            b"".join(texts),
+            doc_ids,
+            [c.get("chunk_id", 0) for c in chunks],
+            starts,
+            ends,
+            embeddings=embeddings
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __iter__(self) -> Iterator[ChunkRow]:
+        for i in range(len(self)):
+            yield ChunkRow(self, i)
+
+    def __getitem__(self, index: int) -> ChunkRow:
+        if isinstance(index, slice):
+            return [ChunkRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return ChunkRow(self, index)
+
+    def row(self, index: int, similarity: Optional[float] = None) -> ChunkRow:
+        """Get a view of one chunk.
+
+        Args:
+            index: Row index of the chunk
+            similarity: Optional similarity score to include in the result
+
+        Returns:
+            Row view with filename, content, chunk_id, filepath and file_type
+        """
+        return ChunkRow(self, index, similarity)
+
+    def rows(self, indices: Sequence[int], scores: Optional[Sequence[float]] = None) -> List[ChunkRow]:
+        """Get views of several chunks, optionally with their scores.
+
+        Args:
+            indices: Row indices of the chunks
+            scores: Similarity scores aligned with ``indices``
+
+        Returns:
+            List of row views
+        """
+        if scores is None:
+            return [ChunkRow(self, int(i)) for i in indices]
+        return [ChunkRow(self, int(i), float(s)) for i, s in zip(indices, scores)]
+
+    def document_mask(
+        self,
+        filenames: Optional[Iterable[str]] = None,
+        file_types: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """Get a boolean mask of the chunks whose document matches every given criterion.
+
+        Criteria are evaluated once per document and broadcast to the chunks.
+
+        Args:
+            filenames: Allowed filenames, or None for any
+            file_types: Allowed file extensions (e.g. ".md"), or None for any
+
+        Returns:
+            Boolean array with one entry per chunk
+        """
+        doc_mask = np.ones(len(self.documents), dtype=bool)
+        if filenames is not None:
+            doc_mask &= np.isin([d["filename"] for d in self.documents], list(filenames))
+        if file_types is not None:
+            doc_mask &= np.isin([d.get("file_type", "") for d in self.documents], list(file_types))
+        return doc_mask[self.doc_ids]
+
+    def take(self, indices: Sequence[int]) -> "ChunkTable":
+        """Get a table holding only the given rows, sharing this table's text store.
+
+        Search indexes are not carried over, since they refer to row numbers;
+        the embedding projection is.
+
+        Args:
+            indices: Row indices to keep, in order
+
+        Returns:
+            A new ChunkTable
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        return ChunkTable(
+            self.documents,
+            self.text_store,
+            self.doc_ids[indices],
+            self.chunk_ids[indices],
+            self.starts[indices],
+            self.ends[indices],
+            embeddings=None if self.embeddings is None else self.embeddings[indices],
+            projection=self.projection
+        )
+
+    def filter(
+        self,
+        mask: Optional[Sequence[bool]] = None,
+        filenames: Optional[Iterable[str]] = None,
+        file_types: Optional[Iterable[str]] = None
+    ) -> "ChunkTable":
+        """Get a table holding only the rows that match a mask and document criteria.
+
+        Args:
+            mask: Boolean mask with one entry per chunk, or None
+            filenames: Allowed filenames, or None for any
+            file_types: Allowed file extensions, or None for any
+
+        Returns:
+            A new ChunkTable (see ``take``)
+        """
+        keep = self.document_mask(filenames, file_types)
+        if mask is not None:
+            keep &= np.asarray(mask, dtype=bool)
+        return self.take(np.flatnonzero(keep))
+
+    def top_k(self, scores: Sequence[float], k: int, mask: Optional[Sequence[bool]] = None) -> List[ChunkRow]:
+        """Get the rows with the highest scores, best first.
+
+        Args:
+            scores: One score per chunk
+            k: Number of rows to return
+            mask: Boolean mask restricting which chunks may be returned, or None
+
+        Returns:
+            Row views carrying their score as "similarity"
+        """
+        from ask_docs.core.vector_search import top_k_indices
+
+        scores = np.asarray(scores, dtype=np.float64)
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            k = min(k, int(mask.sum()))
+            scores = np.where(mask, scores, -np.inf)
+        indices = top_k_indices(scores, k)
+        return self.rows(indices, scores[indices])
+
+    def to_chunks(self, include_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """Convert the table back into a list of chunk dictionaries.
+
+        Args:
+            include_embeddings: Whether to include each chunk's embedding as a list
+
+        Returns:
+            List of chunk dictionaries
+        """
+        chunks = [ChunkRow(self, i).to_dict() for i in range(len(self))]
+        if include_embeddings and self.embeddings is not None:
+            for chunk, embedding in zip(chunks, self.embeddings):
+                chunk["embedding"] = embedding.tolist()
+        return chunks
+
+
+class ChunkTableBuilder:
+    """Collect documents and chunk offsets in memory, batch by batch.
+
+    Has the same interface as ``kb_store.ChunkTableWriter`` so that builds
+    which are not saved to disk can use the same ingestion pipeline.
+    """
+
+    def __init__(self):
+        """Initialize an empty builder."""
+        self.documents: List[Dict[str, Any]] = []
+        self.text_store = bytearray()
+        self.doc_ids: List[int] = []
+        self.chunk_ids: List[int] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.embedding_batches: List[Any] = []
+        self.has_embeddings = True
+        self.projection = None
+        # Embeddings are collected as float32
+        self.stored_dtype = None
+        self.progress: Dict[str, Any] = {}
+        self.resumed = False
+
+    @property
+    def num_chunks(self) -> int:
+        """Number of chunks written so far."""
+        return len(self.starts)
+
+    def add_document(self, filename: str, filepath: str, file_type: str, data: bytes) -> int:
+        """Append a document's UTF-8 text to the store and return its index."""
+        start = len(self.text_store)
+        self.text_store += data
+        self.documents.append({
+            "filename": filename,
+            "filepath": filepath,
+            "file_type": file_type,
+            "start": start,
+            "end": len(self.text_store)
+        })
+        return len(self.documents) - 1
+
+    def write(
+        self,
+        doc_ids: Sequence[int],
+        chunk_ids: Sequence[int],
+        starts: Sequence[int],
+        ends: Sequence[int],
+        embeddings: Optional[Any] = None
+    ) -> None:
+        """Append a batch of chunk offsets and, until ``drop_embeddings``, their embeddings."""
+        self.doc_ids.extend(doc_ids)
+        self.chunk_ids.extend(chunk_ids)
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        if self.has_embeddings and len(starts):
+            self.embedding_batches.append(embeddings)
+
+    def drop_embeddings(self) -> None:
+        """Discard collected embeddings and continue without them."""
+        self.has_embeddings = False
+        self.embedding_batches = []
+
+    def checkpoint(self, progress: Dict[str, Any]) -> None:
+        """Record progress (an in-memory build cannot be resumed)."""
+        self.progress = progress
+
+    def abort(self) -> None:
+        """Nothing to clean up for an in-memory build."""
+
+    def finish(self, metadata: Optional[Dict[str, Any]] = None) -> ChunkTable:
+        """Assemble the collected chunks into a table with search indexes.
+
+        Unless ``projection`` was already applied to the written embeddings,
+        they are reduced as requested by the ``embedding_dim`` and
+        ``embedding_reduction`` metadata fields.
+
+        Args:
+            metadata: Build metadata, or None
+
+        Returns:
+            The finished ChunkTable
+        """
+        from ask_docs.core.ann_index import build_ann_index
+        from ask_docs.core.lexical_index import BM25Index
+        from ask_docs.core.projection import fit_projection
+
+        embeddings = None
+        projection = self.projection
+        if self.has_embeddings and self.embedding_batches:
+            embeddings = np.concatenate(self.embedding_batches).astype(np.float32)
+            if projection is None and metadata and metadata.get("embedding_dim"):
+                projection = fit_projection(embeddings, metadata.get("embedding_reduction", "pca"),
+                                            int(metadata["embedding_dim"]))
+                if projection is not None:
+                    embeddings = projection.transform(embeddings)
+
+        table = ChunkTable(
+            self.documents,
+            bytes(self.text_store),
+            self.doc_ids,
+            self.chunk_ids,
+            self.starts,
+            self.ends,
+            embeddings=embeddings,
+            projection=projection
+        )
+        table.lexical_index = BM25Index.build(table.contents)
+        table.ann_index = build_ann_index(embeddings)
+        return table
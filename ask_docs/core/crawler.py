@@ -0,0 +1,277 @@
+"""Document discovery for AskDocs.
+
+Walks a source directory with ``os.scandir``, pruning hidden, excluded and
+git-ignored directories before descending into them, and reads the files
+that survive on a thread pool. Binary files are recognised from their first
+few kilobytes, so large binaries are never read in full.
+"""
+import fnmatch
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bytes read from the start of a file to decide whether it is text
+SNIFF_BYTES = 8192
+
+# Directories never worth crawling for documentation
+DEFAULT_EXCLUDE_DIRS = ["node_modules", "__pycache__"]
+
+
+class IgnoreRules:
+    """Patterns from one .gitignore file.
+
+    Supports the common subset of the syntax: comments, blank lines, ``!``
+    negation, trailing ``/`` for directory-only patterns, leading ``/`` or an
+    inner ``/`` for patterns anchored to the .gitignore's directory, and
+    ``**/`` prefixes.
+    """
+
+    def __init__(self, base: str, lines: Sequence[str]):
+        """Initialize the rules.
+
+        Args:
+            base: Directory of the .gitignore, relative to the crawl root ("" for the root)
+            lines: Lines of the .gitignore file
+        """
+        self.base = base
+        self.rules: List[Tuple[str, bool, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line.startswith("**/"):
+                line = line[3:]
+                anchored = "/" in line
+            else:
+                anchored = "/" in line
+                line = line.lstrip("/")
+            if line:
+                self.rules.append((line, negate, dir_only, anchored))
+
+    @classmethod
+    def from_file(cls, path: str, base: str) -> Optional["IgnoreRules"]:
+        """Read a .gitignore file, or return None if it cannot be read."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(base, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """Check a path against the rules; the last matching rule wins.
+
+        Args:
+            rel_path: Path relative to the crawl root, with ``/`` separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if ignored, False if re-included by a negated rule, None if no rule matches
+        """
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        name = rel_path.rsplit("/", 1)[-1]
+
+        result = None
+        for pattern, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = rel_path if anchored else name
+            if fnmatch.fnmatchcase(target, pattern):
+                result = not negate
+        return result
+
+
+def _is_ignored(rules: Sequence[IgnoreRules], rel_path: str, is_dir: bool) -> bool:
+    """Apply .gitignore rules from the root down; deeper files override outer ones."""
+    ignored = False
+    for rule_set in rules:
+        result = rule_set.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def matches_any(rel_path: str, patterns: Sequence[str]) -> bool:
+    """Check a relative path against glob patterns.
+
+    Patterns without a ``/`` are matched against the file name as well as the
+    whole path, and a leading ``**/`` also matches at the top level.
+    """
+    name = rel_path.rsplit("/", 1)[-1]
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(rel_path, pattern):
+            return True
+        if "/" not in pattern and fnmatch.fnmatchcase(name, pattern):
+            return True
+        if pattern.startswith("**/") and fnmatch.fnmatchcase(rel_path, pattern[3:]):
+            return True
+    return False
+
+
+def crawl_files(
+    source_dir: str,
+    recursive: bool = True,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    exclude_dirs: Optional[Sequence[str]] = None,
+    respect_gitignore: bool = True
+) -> List[str]:
+    """List the candidate document files under a directory.
+
+    Hidden files and directories, directories named in ``exclude_dirs`` and
+    paths matching ``exclude`` or a .gitignore are skipped; directories are
+    pruned before they are entered.
+
+    Args:
+        source_dir: Directory to crawl
+        recursive: Whether to descend into subdirectories
+        include: Glob patterns a file must match, or None/empty for all files
+        exclude: Glob patterns of files and directories to skip
+        exclude_dirs: Directory names to skip at any depth
+        respect_gitignore: Whether to honour .gitignore files
+
+    Returns:
+        Sorted list of file paths relative to ``source_dir``, with ``/`` separators
+    """
+    include = list(include or [])
+    exclude = list(exclude or [])
+    exclude_dirs = set(DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else exclude_dirs)
+
+    files = []
+    stack: List[Tuple[str, str, List[IgnoreRules]]] = [(source_dir, "", [])]
+    while stack:
+        dir_path, dir_rel, rules = stack.pop()
+
+        if respect_gitignore:
+            gitignore = IgnoreRules.from_file(os.path.join(dir_path, ".gitignore"), dir_rel)
+            if gitignore is not None:
+                rules = rules + [gitignore]
+
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            rel_path = f"{dir_rel}/{entry.name}" if dir_rel else entry.name
+            try:
+                is_dir = entry.is_dir()
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+
+            if is_dir:
+                if (not recursive or entry.name in exclude_dirs or
+                        matches_any(rel_path, exclude) or
+                        _is_ignored(rules, rel_path, True)):
+                    continue
+                stack.append((entry.path, rel_path, rules))
+            elif is_file:
+                if include and not matches_any(rel_path, include):
+                    continue
+                if matches_any(rel_path, exclude) or _is_ignored(rules, rel_path, False):
+                    continue
+                files.append(rel_path)
+
+    files.sort()
+    return files
+
+
+def read_text_file(path: str) -> Optional[str]:
+    """Read a UTF-8 text file, returning None for binary or unreadable files.
+
+    The first ``SNIFF_BYTES`` are checked for NUL bytes before the rest of
+    the file is read.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            if b"\x00" in head:
+                return None
+            data = head + f.read()
+    except OSError:
+        return None
+
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def iter_texts(paths: Sequence[str], workers: int = 0) -> Iterator[Optional[str]]:
+    """Read text files on a thread pool, yielding their contents in order.
+
+    At most a few files per thread are read ahead of the consumer, so memory
+    use does not grow with the number of files.
+
+    Args:
+        paths: File paths to read
+        workers: Number of reader threads (0 chooses automatically)
+
+    Yields:
+        The text of each file, or None for binary or unreadable files
+    """
+    if workers <= 0:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    if len(paths) <= 1 or workers == 1:
+        for path in paths:
+            yield read_text_file(path)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        path_iter = iter(paths)
+        for path in path_iter:
+            pending.append(executor.submit(read_text_file, path))
+            if len(pending) >= workers * 4:
+                break
+        while pending:
+            text = pending.popleft().result()
+            next_path = next(path_iter, None)
+            if next_path is not None:
+                pending.append(executor.submit(read_text_file, next_path))
+            yield text
+
+
+def iter_documents(source_dir: str, rel_paths: Sequence[str], workers: int = 0) -> Iterator[Dict[str, str]]:
+    """Read files into document dictionaries, streaming them in order.
+
+    Args:
+        source_dir: Directory the paths are relative to
+        rel_paths: Relative file paths, as returned by ``crawl_files``
+        workers: Number of reader threads (0 chooses automatically)
+
+    Yields:
+        Dictionaries with filename, content, filepath and file_type, in the
+        order of ``rel_paths``; binary files are left out
+    """
+    full_paths = [full_path(source_dir, p) for p in rel_paths]
+    for rel_path, path, text in zip(rel_paths, full_paths, iter_texts(full_paths, workers)):
+        if text is None:
+            continue
+        yield {
+            "filename": os.path.normpath(rel_path),
+            "content": text,
+            "filepath": path,
+            "file_type": os.path.splitext(rel_path)[1].lower()
+        }
+
+
+def read_documents(source_dir: str, rel_paths: Sequence[str], workers: int = 0) -> List[Dict[str, str]]:
+    """Read files into a list of document dictionaries (see ``iter_documents``)."""
+    return list(iter_documents(source_dir, rel_paths, workers))
+
+
+def full_path(source_dir: str, rel_path: str) -> str:
+    """Join a ``/``-separated relative path from ``crawl_files`` onto its directory."""
+    return os.path.join(source_dir, *rel_path.split("/"))
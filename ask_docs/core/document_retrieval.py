@@ -4,29 +4,52 @@ This module provides functions for loading documents, chunking them, and retriev
 the most relevant chunks for a given query using semantic search when available,
 with fallback to lexical search.
 """
-import difflib
 import os
 import time
 import hashlib
 import json
-from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple, Union
 
 from ask_docs.config import get_rag_config
+from ask_docs.core import crawler, kb_store, retrieval_cache
+from ask_docs.core.ann_index import update_ann_index, use_ann
+from ask_docs.core.chunk_table import AppendedTextStore, ChunkTable, ChunkTableBuilder
+from ask_docs.core.embeddings import BatchEncoder, encode_queries, encode_query, get_embedding_model
+from ask_docs.core.lexical_index import BM25Index
+from ask_docs.core.projection import DEFAULT_PROJECTION_METHOD, PROJECTION_METHODS
+from ask_docs.core.quantization import (
+    DEFAULT_EMBEDDING_DTYPE, EMBEDDING_DTYPES, QuantizedEmbeddings, as_stored, embedding_rows,
+    full_precision_rows
+)
 
 # Default chunk size and overlap for text splitting
 DEFAULT_CHUNK_SIZE = 1000
 DEFAULT_CHUNK_OVERLAP = 200
 
+# Minimum number of chunks embedded and written together while building
+DEFAULT_INGEST_BATCH_SIZE = 512
+
+# Retrieval modes and hybrid search defaults
+RETRIEVAL_MODES = ("semantic", "lexical", "hybrid")
+DEFAULT_RETRIEVAL_MODE = "semantic"
+DEFAULT_HYBRID_CANDIDATES = 50
+DEFAULT_RRF_K = 60
+
 def load_documents(source_dir: Optional[str] = None, recursive: bool = True) -> List[Dict[str, str]]:
     """Load all documents from the source directory, including subdirectories.
     
+    Hidden directories, the knowledge base directory, ``exclude_dirs`` and
+    git-ignored directories are pruned without being walked. Files must match
+    ``include_patterns`` (when set) and must not match ``exclude_patterns``.
+    Binary files are detected from their first few kilobytes and skipped, and
+    the remaining files are read on a thread pool.
+    
     Args:
         source_dir: Directory containing the documents to load, or None to use configured dir
         recursive: Whether to recursively search subdirectories (default: True)
         
     Returns:
-        List of dictionaries with filename and content
+        List of dictionaries with filename and content, sorted by filename
     """
     config = get_rag_config()
     if source_dir is None:
@@ -35,35 +58,45 @@ def load_documents(source_dir: Optional[str] = None, recursive: bool = True) ->
     # Ensure the directory exists
     os.makedirs(source_dir, exist_ok=True)
     
-    docs = []
-    # Use ** for recursive glob if recursive=True, otherwise use *
-    glob_pattern = "**/*" if recursive else "*"
+    rel_paths = list_documents(source_dir, recursive)
+    return crawler.read_documents(source_dir, rel_paths, int(config.get("load_workers", 0)))
+
+def list_documents(source_dir: Optional[str] = None, recursive: bool = True) -> List[str]:
+    """List the document files a build would load, without reading them.
     
-    for path in Path(source_dir).glob(glob_pattern):
-        if path.is_file():
-            try:
-                # Get relative path from source_dir for better identification
-                rel_path = path.relative_to(source_dir)
-                
-                # Skip hidden files and directories
-                if any(part.startswith('.') for part in path.parts):
-                    continue
-                
-                text = path.read_text(encoding="utf-8")
-                docs.append({
-                    "filename": str(rel_path),
-                    "content": text,
-                    "filepath": str(path),
-                    "file_type": path.suffix.lower()
-                })
-            except UnicodeDecodeError:
-                # Skip binary files
-                pass
-    return docs
+    Uses the same crawl settings as ``load_documents``: the knowledge base
+    directory, ``exclude_dirs``, ``include_patterns``, ``exclude_patterns``
+    and ``respect_gitignore``. Binary files are only detected when read, so
+    they are still listed.
+    
+    Args:
+        source_dir: Directory containing the documents, or None to use configured dir
+        recursive: Whether to recursively search subdirectories (default: True)
+        
+    Returns:
+        Sorted ``/``-separated paths relative to the source directory
+    """
+    config = get_rag_config()
+    if source_dir is None:
+        source_dir = config["source_dir"]
+    exclude_dirs = list(config.get("exclude_dirs", crawler.DEFAULT_EXCLUDE_DIRS))
+    exclude_dirs.append(config.get("kb_dir", ".kb"))
+    
+    return crawler.crawl_files(
+        source_dir,
+        recursive=recursive,
+        include=config.get("include_patterns"),
+        exclude=config.get("exclude_patterns"),
+        exclude_dirs=exclude_dirs,
+        respect_gitignore=config.get("respect_gitignore", True)
+    )
 
-def split_text_into_chunks(text: str, chunk_size: int = None, 
-                          chunk_overlap: int = None) -> List[str]:
-    """Split text into overlapping chunks of specified size.
+def split_text_into_spans(text: str, chunk_size: int = None, 
+                          chunk_overlap: int = None) -> List[Tuple[int, int]]:
+    """Find the character ranges of overlapping chunks of specified size.
+    
+    Chunks end at a sentence break near ``chunk_size`` characters when there
+    is one in the second half of the chunk.
     
     Args:
         text: Text to split
@@ -71,7 +104,7 @@ def split_text_into_chunks(text: str, chunk_size: int = None,
         chunk_overlap: Overlap between chunks
         
     Returns:
-        List of text chunks
+        List of (start, end) character offsets, one per chunk
     """
     # Get from config if not specified
     config = get_rag_config()
@@ -81,9 +114,9 @@ def split_text_into_chunks(text: str, chunk_size: int = None,
         chunk_overlap = config.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)
     
     if len(text) <= chunk_size:
-        return [text]
+        return [(0, len(text))]
     
-    chunks = []
+    spans = []
     start = 0
     
     while start < len(text):
@@ -101,12 +134,40 @@ def split_text_into_chunks(text: str, chunk_size: int = None,
             if sentence_break != -1 and sentence_break > start + chunk_size // 2:
                 end = sentence_break + 1
         
-        chunks.append(text[start:end])
+        spans.append((start, end))
         
         # Move start to account for overlap
         start = start + chunk_size - chunk_overlap
     
-    return chunks
+    return spans
+
+def split_text_into_chunks(text: str, chunk_size: int = None, 
+                          chunk_overlap: int = None) -> List[str]:
+    """Split text into overlapping chunks of specified size.
+    
+    Args:
+        text: Text to split
+        chunk_size: Maximum size of each chunk
+        chunk_overlap: Overlap between chunks
+        
+    Returns:
+        List of text chunks
+    """
+    return [text[start:end] for start, end in split_text_into_spans(text, chunk_size, chunk_overlap)]
+
+def _byte_spans(text: str, data: bytes, spans: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """Convert character offsets in ``text`` into byte offsets in its UTF-8 ``data``."""
+    if len(data) == len(text):
+        # ASCII: characters and bytes line up
+        return [start for start, _ in spans], [end for _, end in spans]
+    
+    byte_offsets = {}
+    char_pos = byte_pos = 0
+    for pos in sorted(set(p for span in spans for p in span)):
+        byte_pos += len(text[char_pos:pos].encode("utf-8"))
+        char_pos = pos
+        byte_offsets[pos] = byte_pos
+    return [byte_offsets[start] for start, _ in spans], [byte_offsets[end] for _, end in spans]
 
 def create_document_chunks(docs: List[Dict[str, str]], 
                           chunk_size: Optional[int] = None,
@@ -138,114 +199,646 @@ def create_document_chunks(docs: List[Dict[str, str]],
     
     return chunked_docs
 
-def get_best_chunks_lexical(docs: List[Dict[str, str]], query: str, top_n: int = 4) -> List[Dict[str, Any]]:
+def chunk_documents(docs: List[Dict[str, str]], 
+                    chunk_size: Optional[int] = None,
+                    chunk_overlap: Optional[int] = None) -> ChunkTable:
+    """Split documents into an offset-based chunk table.
+    
+    Unlike ``create_document_chunks``, chunk text is not copied: every
+    document is stored once and each chunk is a byte range of it.
+    
+    Args:
+        docs: List of document dictionaries
+        chunk_size: Size of document chunks
+        chunk_overlap: Overlap between chunks
+        
+    Returns:
+        ChunkTable without embeddings
+    """
+    builder = ChunkTableBuilder()
+    builder.drop_embeddings()
+    
+    for doc in docs:
+        text = doc["content"]
+        data = text.encode("utf-8")
+        doc_id = builder.add_document(doc["filename"], doc.get("filepath", ""), doc.get("file_type", ""), data)
+        spans = split_text_into_spans(text, chunk_size, chunk_overlap)
+        starts, ends = _byte_spans(text, data, spans)
+        doc_start = builder.documents[doc_id]["start"]
+        builder.write(
+            [doc_id] * len(spans),
+            list(range(len(spans))),
+            [doc_start + start for start in starts],
+            [doc_start + end for end in ends]
+        )
+    
+    return builder.finish()
+
+def _as_chunk_table(docs: Union[List[Dict[str, str]], ChunkTable]) -> ChunkTable:
+    """Convert documents or chunk dictionaries into a chunk table."""
+    if isinstance(docs, ChunkTable):
+        return docs
+    # Check if documents are already chunked
+    if not any("chunk_id" in doc for doc in docs):
+        return chunk_documents(docs)
+    return ChunkTable.from_chunks(docs)
+
+def _lexical_search(table: ChunkTable, query: str, top_n: int) -> Tuple[Any, Any]:
+    """Rank chunks with BM25, building the table's inverted index if it has none.
+    
+    Returns:
+        Tuple of (chunk indices, scores), best first
+    """
+    if table.lexical_index is None:
+        table.lexical_index = BM25Index.build(table.contents)
+    return table.lexical_index.search(query, top_n)
+
+def _semantic_search(table: ChunkTable, query: str, top_n: int, embedding_model: str) -> Tuple[Any, Any]:
+    """Rank chunks by cosine similarity to the query embedding.
+    
+    Uses the table's ANN index for large tables and exact search otherwise.
+    Quantized embeddings are searched as they are; if the knowledge base kept
+    a full-precision copy, the best ``top_n * embedding_rescore_factor``
+    candidates are then rescored with it.
+    
+    Returns:
+        Tuple of (chunk indices, scores), best first
+        
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    from ask_docs.core.vector_search import cosine_top_k, normalize_rows
+    
+    # Try to use SentenceTransformers if available
+    model = get_embedding_model(embedding_model)
+    # Normalize before projecting, as the stored rows were
+    query_embedding = normalize_rows(encode_query(model, embedding_model, query))
+    if table.projection is not None:
+        query_embedding = table.projection.transform(query_embedding)
+    
+    embeddings, rescore, k = _prepare_semantic_search(table, model, top_n)
+    
+    if table.ann_index is not None and use_ann(len(table)):
+        indices, scores = table.ann_index.search(embeddings, query_embedding, k)
+    else:
+        indices, scores = cosine_top_k(embeddings, query_embedding, k)
+    if rescore:
+        return embeddings.rescore(query_embedding, indices, top_n)
+    return indices, scores
+
+def _prepare_semantic_search(table: ChunkTable, model: Any, top_n: int) -> Tuple[Any, bool, int]:
+    """Get the table's embeddings and decide whether candidates will be rescored.
+    
+    Returns:
+        Tuple of (embeddings, whether to rescore, number of candidates to search for)
+    """
+    from ask_docs.core.vector_search import normalize_rows
+    
+    # Compute embeddings for all chunks once if the table has none yet
+    if table.embeddings is None:
+        table.embeddings = normalize_rows(model.encode(list(table.contents)))
+    
+    embeddings = table.embeddings
+    rescore_factor = int(get_rag_config().get("embedding_rescore_factor", 0))
+    rescore = (isinstance(embeddings, QuantizedEmbeddings) and embeddings.full is not None and
+               rescore_factor > 0)
+    return embeddings, rescore, top_n * rescore_factor if rescore else top_n
+
+def _semantic_search_many(
+    table: ChunkTable, 
+    queries: List[str], 
+    top_n: int, 
+    embedding_model: str
+) -> List[Tuple[Any, Any]]:
+    """Rank chunks for several queries at once.
+    
+    The queries are embedded in one batch and, for exact search, scored with
+    one matrix product; otherwise this behaves like ``_semantic_search``.
+    
+    Returns:
+        One tuple of (chunk indices, scores) per query, best first
+        
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    import numpy as np
+    from ask_docs.core.vector_search import cosine_top_k_many, normalize_rows
+    
+    model = get_embedding_model(embedding_model)
+    # Normalize before projecting, as the stored rows were
+    query_embeddings = normalize_rows(np.vstack(encode_queries(model, embedding_model, queries)))
+    if table.projection is not None:
+        query_embeddings = table.projection.transform(query_embeddings)
+    
+    embeddings, rescore, k = _prepare_semantic_search(table, model, top_n)
+    
+    if table.ann_index is not None and use_ann(len(table)):
+        results = [table.ann_index.search(embeddings, query, k) for query in query_embeddings]
+    else:
+        results = cosine_top_k_many(embeddings, query_embeddings, k)
+    if rescore:
+        return [embeddings.rescore(query, indices, top_n)
+                for query, (indices, _) in zip(query_embeddings, results)]
+    return results
+
+def get_best_chunks_lexical(
+    docs: Union[List[Dict[str, str]], ChunkTable], 
+    query: str, 
+    top_n: int = 4
+) -> List[Dict[str, Any]]:
     """Get the best matching chunks from the documents based on lexical similarity.
     
+    Chunks are ranked with BM25 using the table's inverted index, so only
+    chunks containing a query term are scored. If fewer than ``top_n`` chunks
+    match, the remaining places are filled with other chunks in document order.
+    
     Args:
-        docs: List of documents to search
+        docs: Chunk table or list of documents to search
         query: Query string to match against
         top_n: Number of top matches to return
         
     Returns:
         List of the top matching documents
     """
-    # Use difflib's SequenceMatcher for lexical similarity
-    return sorted(
-        docs, 
-        key=lambda d: difflib.SequenceMatcher(None, query.lower(), d["content"].lower()).ratio(), 
-        reverse=True
-    )[:top_n]
+    table = _as_chunk_table(docs)
+    return table.rows(_rank_lexical(table, query, top_n))
 
-def get_best_chunks(
-    docs: List[Dict[str, str]], 
+def _rank_lexical(table: ChunkTable, query: str, top_n: int) -> List[int]:
+    """Rank chunks with BM25, padding with unmatched chunks up to ``top_n``."""
+    indices, _ = _lexical_search(table, query, top_n)
+    indices = [int(i) for i in indices]
+    
+    if len(indices) < top_n:
+        matched = set(indices)
+        for i in range(len(table)):
+            if len(indices) >= top_n:
+                break
+            if i not in matched:
+                indices.append(i)
+    
+    return indices
+
+def get_best_chunks_hybrid(
+    docs: Union[List[Dict[str, str]], ChunkTable], 
     query: str, 
     top_n: int = 4,
     embedding_model: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Get the best matching chunks by fusing lexical and semantic rankings.
+    
+    Each side only ranks its own top ``hybrid_candidates`` chunks, and the two
+    rankings are combined with reciprocal-rank fusion. Falls back to lexical
+    search if the embedding library is missing.
+    
+    Args:
+        docs: Chunk table or list of documents to search
+        query: Query string to match against
+        top_n: Number of top matches to return
+        embedding_model: Name of the embedding model to use
+        
+    Returns:
+        List of the top matching chunks, each with its fused score as "similarity"
+    """
+    table = _as_chunk_table(docs)
+    if embedding_model is None:
+        embedding_model = get_rag_config().get("embedding_model", "all-MiniLM-L6-v2")
+    return table.rows(*_rank(table, query, top_n, embedding_model, "hybrid"))
+
+def _rank(
+    table: ChunkTable, 
+    query: str, 
+    top_n: int, 
+    embedding_model: str, 
+    mode: str
+) -> Tuple[Any, Optional[Any]]:
+    """Rank chunks for a query with the given retrieval mode.
+    
+    Semantic and hybrid ranking fall back to lexical ranking if the embedding
+    library is missing.
+    
+    Returns:
+        Tuple of (chunk indices, scores or None for lexical ranking), best first
+    """
+    from ask_docs.core.vector_search import reciprocal_rank_fusion
+    
+    if mode == "lexical":
+        return _rank_lexical(table, query, top_n), None
+    
+    config = get_rag_config()
+    try:
+        if mode == "semantic":
+            return _semantic_search(table, query, top_n, embedding_model)
+        
+        candidates = max(top_n, int(config.get("hybrid_candidates", DEFAULT_HYBRID_CANDIDATES)))
+        semantic, _ = _semantic_search(table, query, candidates, embedding_model)
+    except ImportError:
+        # Fall back to lexical search if the embedding library is missing
+        return _rank_lexical(table, query, top_n), None
+    lexical, _ = _lexical_search(table, query, candidates)
+    
+    return reciprocal_rank_fusion(
+        [semantic, lexical], top_n, int(config.get("rrf_k", DEFAULT_RRF_K))
+    )
+
+def get_best_chunks(
+    docs: Union[List[Dict[str, str]], ChunkTable], 
+    query: str, 
+    top_n: int = 4,
+    embedding_model: Optional[str] = None,
+    mode: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """Get the best matching chunks from the documents for a given query.
     
-    This is the main retrieval function that attempts to use semantic search 
-    if possible, falling back to lexical search if not.
+    This is the main retrieval function. The retrieval mode is one of:
+    
+    - ``semantic``: cosine similarity against the table's normalized embedding
+      matrix (one matrix-vector product plus a partial sort), falling back to
+      lexical search if the embedding library is missing. Knowledge bases with
+      at least ``ann_min_chunks`` chunks use their approximate
+      nearest-neighbour index instead, when one was built.
+    - ``lexical``: BM25 over the inverted index.
+    - ``hybrid``: both, combined with reciprocal-rank fusion.
+    
+    Rankings for tables loaded from (or saved to) disk are cached per
+    knowledge base version, so repeated queries skip scoring entirely until
+    the knowledge base is rebuilt.
     
     Args:
-        docs: List of documents to search
+        docs: Chunk table or list of documents to search
         query: Query string to match against
         top_n: Number of top matches to return
         embedding_model: Name of the embedding model to use
+        mode: Retrieval mode, or None for the configured ``retrieval_mode``
         
     Returns:
-        List of the top matching documents
+        List of the top matching chunks, each with a "similarity" score when
+        semantic or hybrid search was used
     """
     # If docs is empty, return empty list
     if not docs:
         return []
     
-    # Check if documents are already chunked
-    if not any("chunk_id" in doc for doc in docs):
-        docs = create_document_chunks(docs)
+    docs = _as_chunk_table(docs)
+    
+    config = get_rag_config()
+    if mode is None:
+        mode = config.get("retrieval_mode", DEFAULT_RETRIEVAL_MODE)
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unsupported retrieval mode: {mode}")
     
     # Get embedding model from config if not specified
     if embedding_model is None:
-        config = get_rag_config()
         embedding_model = config.get("embedding_model", "all-MiniLM-L6-v2")
     
-    try:
-        # Try to use semantic search if embeddings libraries are available
-        import numpy as np
+    # Reuse an earlier ranking of the same query against the same knowledge base
+    cache_key = None
+    if docs.version is not None:
+        cache_key = retrieval_cache.make_key(docs.version, query, top_n, mode, embedding_model)
+        cached = retrieval_cache.get_ranking(cache_key)
+        if cached is not None:
+            return docs.rows(*cached)
+    
+    indices, scores = _rank(docs, query, top_n, embedding_model, mode)
+    
+    if cache_key is not None:
+        retrieval_cache.store_ranking(cache_key, indices, scores)
+    return docs.rows(indices, scores)
+    
+def get_best_chunks_many(
+    docs: Union[List[Dict[str, str]], ChunkTable], 
+    queries: List[str], 
+    top_n: int = 4,
+    embedding_model: Optional[str] = None,
+    mode: Optional[str] = None
+) -> List[List[Dict[str, Any]]]:
+    """Get the best matching chunks for each of several queries.
+    
+    Gives the same results as calling ``get_best_chunks`` per query, but
+    queries missing from the retrieval cache are embedded in one batch and
+    scored against the embedding matrix together.
+    
+    Args:
+        docs: Chunk table or list of documents to search
+        queries: Query strings to match against
+        top_n: Number of top matches to return per query
+        embedding_model: Name of the embedding model to use
+        mode: Retrieval mode, or None for the configured ``retrieval_mode``
         
+    Returns:
+        One list of top matching chunks per query, in the order of ``queries``
+    """
+    if not docs:
+        return [[] for _ in queries]
+    
+    docs = _as_chunk_table(docs)
+    
+    config = get_rag_config()
+    if mode is None:
+        mode = config.get("retrieval_mode", DEFAULT_RETRIEVAL_MODE)
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unsupported retrieval mode: {mode}")
+    if embedding_model is None:
+        embedding_model = config.get("embedding_model", "all-MiniLM-L6-v2")
+    
+    rankings: List[Optional[Tuple[Any, Any]]] = [None] * len(queries)
+    cache_keys: List[Optional[Tuple]] = [None] * len(queries)
+    if docs.version is not None:
+        for i, query in enumerate(queries):
+            cache_keys[i] = retrieval_cache.make_key(docs.version, query, top_n, mode, embedding_model)
+            rankings[i] = retrieval_cache.get_ranking(cache_keys[i])
+    
+    todo = [i for i, ranking in enumerate(rankings) if ranking is None]
+    candidates = top_n
+    if mode == "hybrid":
+        candidates = max(top_n, int(config.get("hybrid_candidates", DEFAULT_HYBRID_CANDIDATES)))
+    semantic = None
+    if todo and mode != "lexical":
         try:
-            # Try to use SentenceTransformers if available
-            from sentence_transformers import SentenceTransformer
-            
-            model = SentenceTransformer(embedding_model)
-            query_embedding = model.encode(query)
-            
-            # Compute embeddings for all docs if not already embedded
-            if not any("embedding" in doc for doc in docs):
-                contents = [doc["content"] for doc in docs]
-                embeddings = model.encode(contents)
-                for i, doc in enumerate(docs):
-                    doc["embedding"] = embeddings[i]
-            
-            # Compute cosine similarity
-            for doc in docs:
-                doc_embedding = doc["embedding"]
-                similarity = np.dot(query_embedding, doc_embedding) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(doc_embedding)
-                )
-                doc["similarity"] = float(similarity)  # Convert to float for JSON serialization
-            
-            # Sort by similarity
-            return sorted(docs, key=lambda d: d["similarity"], reverse=True)[:top_n]
-            
+            semantic = _semantic_search_many(docs, [queries[i] for i in todo], candidates, embedding_model)
         except ImportError:
-            # Fall back to lexical search if no embedding library
-            return get_best_chunks_lexical(docs, query, top_n)
+            # Fall back to lexical search if the embedding library is missing
+            semantic = None
     
-    except ImportError:
-        # Fall back to lexical search if numpy is not available
-        return get_best_chunks_lexical(docs, query, top_n)
+    for position, i in enumerate(todo):
+        if semantic is None:
+            rankings[i] = _rank_lexical(docs, queries[i], top_n), None
+        elif mode == "semantic":
+            rankings[i] = semantic[position]
+        else:
+            from ask_docs.core.vector_search import reciprocal_rank_fusion
+            lexical, _ = _lexical_search(docs, queries[i], candidates)
+            rankings[i] = reciprocal_rank_fusion(
+                [semantic[position][0], lexical], top_n, int(config.get("rrf_k", DEFAULT_RRF_K))
+            )
+        if cache_keys[i] is not None:
+            retrieval_cache.store_ranking(cache_keys[i], *rankings[i])
     
+    return [docs.rows(*ranking) for ranking in rankings]
+    
+def _file_hash(doc: Dict[str, str]) -> str:
+    """Compute a hash of a single document's contents."""
+    return hashlib.md5(doc["content"].encode()).hexdigest()
+
+def _scan_documents(source_dir: str, config: Dict[str, Any]) -> Tuple[List[Dict[str, str]], str]:
+    """Hash every document in the source directory without keeping its content.
+    
+    Args:
+        source_dir: Directory containing the documents
+        config: RAG configuration
+        
+    Returns:
+        Tuple of (filename, filepath, file_type and content hash of each
+        document, combined hash of all document names and contents)
+    """
+    docs_hash = hashlib.md5()
+    entries = []
+    rel_paths = list_documents(source_dir)
+    for doc in crawler.iter_documents(source_dir, rel_paths, int(config.get("load_workers", 0))):
+        docs_hash.update(doc["content"].encode())
+        docs_hash.update(doc["filename"].encode())
+        entries.append({
+            "filename": doc["filename"],
+            "filepath": doc["filepath"],
+            "file_type": doc["file_type"],
+            "hash": _file_hash(doc)
+        })
+    return entries, docs_hash.hexdigest()
+
+def _ingest(
+    entries: List[Dict[str, str]],
+    sink: Any,
+    chunk_size: int,
+    chunk_overlap: int,
+    embedding_model: Optional[str],
+    previous: Optional[ChunkTable] = None,
+    previous_files: Optional[Dict[str, Dict[str, Any]]] = None,
+    batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+    workers: int = 0,
+    progress: Optional[Callable[[int, int], None]] = None,
+    jobs: Optional[int] = None
+) -> Tuple[Dict[str, Dict[str, Any]], Optional[str]]:
+    """Stream documents through chunking and embedding into a sink.
+    
+    Documents are read one at a time (with a few read ahead on a thread pool),
+    chunked, and collected until at least ``batch_size`` chunks are pending.
+    The batch is then embedded (see ``BatchEncoder``), written to the sink
+    and checkpointed, so memory use is bounded by the batch rather than the
+    corpus. Chunks of files whose content hash matches ``previous_files`` are
+    copied from ``previous`` instead of being re-chunked and re-embedded.
+    
+    If the sink holds a checkpoint of an interrupted build whose finished
+    files are still unchanged, those files are skipped.
+    
+    Args:
+        entries: Documents to ingest, as returned by ``_scan_documents``
+        sink: ``kb_store.ChunkTableWriter`` or ``ChunkTableBuilder`` receiving the chunks
+        chunk_size: Size of document chunks
+        chunk_overlap: Overlap between chunks
+        embedding_model: Name of the embedding model to use
+        previous: Previously built table, or None for a full build
+        previous_files: Per-file manifest of the previous build
+        batch_size: Minimum number of chunks per batch
+        workers: Number of file reader threads (0 chooses automatically)
+        progress: Called with (files processed, total files) after each batch
+        jobs: Number of embedding processes, or None for ``embedding_jobs``
+        
+    Returns:
+        Tuple of (per-file manifest, embedding model used or None)
+    """
+    import numpy as np
+    
+    # Unchanged files are copied from the previous build's document store
+    previous_files = previous_files or {}
+    previous_docs = {}
+    if previous is not None and previous.documents is not None:
+        previous_docs = {d["filename"]: d for d in previous.documents if "start" in d}
+    # Resume an interrupted build if the files it finished are unchanged
+    files = dict(sink.progress.get("files", {}))
+    order = list(sink.progress.get("order", []))
+    if sink.resumed:
+        if [[e["filename"], e["hash"]] for e in entries[:len(order)]] == order:
+            print(f"Resuming interrupted build: {len(order)} of {len(entries)} files already processed")
+        else:
+            sink.reset()
+            files, order = {}, []
+    if previous is not None:
+        # Reused embeddings are already projected, so new ones must be projected the same way
+        # (set after a reset, which clears the sink's projection)
+        sink.projection = previous.projection
+    if not sink.has_embeddings:
+        embedding_model = None
+    remaining = entries[len(order):]
+    
+    def reusable(entry):
+        previous_entry = previous_files.get(entry["filename"])
+        return (previous_entry is not None and previous_entry.get("hash") == entry["hash"] and
+                entry["filename"] in previous_docs)
+    
+    changed = [e for e in remaining if not reusable(e)]
+    if previous is not None:
+        deleted_files = len(set(previous_files) - set(e["filename"] for e in entries))
+        print(f"Updating knowledge base: {len(changed)} new or modified files, "
+              f"{len(entries) - len(changed)} unchanged, {deleted_files} deleted")
+    texts = crawler.iter_texts([e["filepath"] for e in changed], workers)
+    
+    encoder = None
+    # Per document: (doc_id, chunk ids, chunk starts, chunk ends,
+    # chunk texts to embed or None, reused embeddings or None)
+    pending = []
+    pending_chunks = 0
+    
+    def flush():
+        nonlocal encoder, embedding_model, pending_chunks
+        if not pending:
+            return
+        embeddings = None
+        if sink.has_embeddings:
+            try:
+                from ask_docs.core.vector_search import normalize_rows
+                
+                new_texts = [t for segment in pending if segment[4] is not None for t in segment[4]]
+                encoded, offset = None, 0
+                if new_texts:
+                    if encoder is None:
+                        encoder = BatchEncoder(get_embedding_model(embedding_model), jobs=jobs)
+                        encoder.start()
+                    encoded = normalize_rows(encoder.encode(new_texts))
+                    if sink.projection is not None:
+                        encoded = sink.projection.transform(encoded)
+                segments = []
+                for _, _, _, _, segment_texts, segment_embeddings in pending:
+                    if segment_texts:
+                        segment_embeddings = encoded[offset:offset + len(segment_texts)]
+                        offset += len(segment_texts)
+                    if segment_embeddings is not None:
+                        segments.append(segment_embeddings)
+                if not segments:
+                    embeddings = None
+                elif sink.stored_dtype is not None:
+                    embeddings = QuantizedEmbeddings.concatenate(
+                        as_stored(segment, sink.stored_dtype) for segment in segments)
+                else:
+                    embeddings = np.concatenate(segments)
+            except ImportError:
+                # Continue without embeddings if libraries not available
+                print("Warning: sentence-transformers not installed. Using lexical search only.")
+                sink.drop_embeddings()
+                embedding_model = None
+        
+        sink.write(
+            np.concatenate([np.full(len(segment[1]), segment[0]) for segment in pending]),
+            np.concatenate([segment[1] for segment in pending]),
+            np.concatenate([segment[2] for segment in pending]),
+            np.concatenate([segment[3] for segment in pending]),
+            embeddings
+        )
+        sink.checkpoint({"files": files, "order": order})
+        pending.clear()
+        pending_chunks = 0
+        if progress is not None:
+            progress(len(order), len(entries))
+    
+    try:
+        for entry in remaining:
+            order.append([entry["filename"], entry["hash"]])
+            if reusable(entry):
+                # Unchanged file: copy its text, chunk offsets and embeddings
+                previous_entry = previous_files[entry["filename"]]
+                previous_doc = previous_docs[entry["filename"]]
+                rows = slice(previous_entry["chunk_start"], previous_entry["chunk_end"])
+                data = bytes(previous.text_store[previous_doc["start"]:previous_doc["end"]])
+                doc_id = sink.add_document(entry["filename"], entry["filepath"], entry["file_type"], data)
+                shift = sink.documents[doc_id]["start"] - previous_doc["start"]
+                starts = np.asarray(previous.starts[rows], dtype=np.int64) + shift
+                ends = np.asarray(previous.ends[rows], dtype=np.int64) + shift
+                ids = np.asarray(previous.chunk_ids[rows], dtype=np.int32)
+                chunk_texts = None
+                embeddings = None
+                if sink.has_embeddings and previous.embeddings is not None:
+                    if sink.stored_dtype is not None:
+                        # Copy stored rows as they are rather than dequantizing and quantizing again
+                        embeddings = embedding_rows(previous.embeddings, rows)
+                    else:
+                        embeddings = full_precision_rows(previous.embeddings, rows)
+                file_hash = entry["hash"]
+            else:
+                # New or modified file: chunk it again
+                content = next(texts)
+                if content is None:
+                    # Became unreadable since it was scanned
+                    continue
+                file_hash = _file_hash({"content": content})
+                data = content.encode("utf-8")
+                doc_id = sink.add_document(entry["filename"], entry["filepath"], entry["file_type"], data)
+                doc_start = sink.documents[doc_id]["start"]
+                spans = split_text_into_spans(content, chunk_size, chunk_overlap)
+                byte_starts, byte_ends = _byte_spans(content, data, spans)
+                starts = np.asarray(byte_starts, dtype=np.int64) + doc_start
+                ends = np.asarray(byte_ends, dtype=np.int64) + doc_start
+                ids = np.arange(len(spans), dtype=np.int32)
+                chunk_texts = [content[start:end] for start, end in spans]
+                embeddings = None
+            
+            start = sink.num_chunks + pending_chunks
+            files[entry["filename"]] = {
+                "hash": file_hash,
+                "chunk_start": start,
+                "chunk_end": start + len(ids)
+            }
+            pending.append((doc_id, ids, starts, ends, chunk_texts, embeddings))
+            pending_chunks += len(ids)
+            
+            if pending_chunks >= batch_size:
+                flush()
+        
+        flush()
+    finally:
+        if encoder is not None:
+            encoder.close()
+    
+    if encoder is not None and encoder.num_encoded:
+        print(f"Embedded {encoder.num_encoded} chunks in {encoder.seconds:.1f}s "
+              f"({encoder.chunks_per_second:.1f} chunks/sec)")
+    return files, embedding_model
+
 def build_knowledge_base(
     source_dir: Optional[str] = None, 
     save_embeddings: bool = True, 
     embedding_model: Optional[str] = None,
     chunk_size: Optional[int] = None,
     chunk_overlap: Optional[int] = None,
-    force: bool = False
-) -> Dict[str, Any]:
+    force: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+    jobs: Optional[int] = None
+) -> ChunkTable:
     """Build a knowledge base from documents in the source directory.
     
+    Documents are streamed through chunking and embedding in batches and
+    written to the knowledge base as they are processed (see ``_ingest``), so
+    memory use stays bounded for large corpora. Each batch is checkpointed; if
+    a build is interrupted, the next build with the same parameters resumes
+    from the last checkpoint. Chunk embeddings are L2-normalized before they
+    are stored, optionally projected down to ``embedding_dim`` dimensions (see
+    ``ask_docs.core.projection``), and the result is saved in the binary format
+    described in ``ask_docs.core.kb_store``.
+    
+    metadata.json records a content hash and chunk range for every file. When
+    an existing knowledge base was built with the same parameters, only added
+    or modified files are re-chunked and re-embedded, and chunks of deleted
+    files are dropped.
+    
     Args:
         source_dir: Directory containing the documents to load
         save_embeddings: Whether to save embeddings for future use
         embedding_model: Name of the sentence-transformers model to use
         chunk_size: Size of document chunks
         chunk_overlap: Overlap between chunks
-        force: Force rebuild even if no changes detected
+        force: Force a full rebuild even if no changes detected
+        progress: Called with (files processed, total files) as the build advances
+        jobs: Number of embedding processes, or None for ``embedding_jobs``
         
     Returns:
-        List of document chunk dictionaries
+        ChunkTable holding the chunks and their embedding matrix
     """
     # Get configuration
     config = get_rag_config()
@@ -258,6 +851,17 @@ def build_knowledge_base(
     if chunk_overlap is None:
         chunk_overlap = config.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)
     kb_dir = config.get("kb_dir", ".kb")
+    embedding_dtype = config.get("embedding_dtype", DEFAULT_EMBEDDING_DTYPE)
+    if embedding_dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {embedding_dtype}. "
+                         f"Choose from: {', '.join(EMBEDDING_DTYPES)}")
+    embedding_rescore = (embedding_dtype != "float32" and
+                         int(config.get("embedding_rescore_factor", 0)) > 0)
+    embedding_dim = int(config.get("embedding_dim", 0))
+    embedding_reduction = config.get("embedding_reduction", DEFAULT_PROJECTION_METHOD)
+    if embedding_reduction not in PROJECTION_METHODS:
+        raise ValueError(f"Unsupported embedding reduction: {embedding_reduction}. "
+                         f"Choose from: {', '.join(PROJECTION_METHODS)}")
     
     # Ensure the source directory exists
     os.makedirs(source_dir, exist_ok=True)
@@ -266,125 +870,263 @@ def build_knowledge_base(
     kb_path_dir = os.path.join(source_dir, kb_dir)
     os.makedirs(kb_path_dir, exist_ok=True)
     
-    # File paths
-    kb_path = os.path.join(kb_path_dir, "knowledge_base.json")
-    metadata_path = os.path.join(kb_path_dir, "metadata.json")
+    build_start = time.perf_counter()
     
-    # Load documents
-    docs = load_documents(source_dir, recursive=True)
+    # Hash the documents without keeping their contents in memory
+    entries, current_hash = _scan_documents(source_dir, config)
     
-    # Check if we need to rebuild by comparing hashes of document contents
-    if not force and os.path.exists(kb_path) and os.path.exists(metadata_path):
-        try:
-            with open(metadata_path, "r") as f:
-                metadata = json.load(f)
+    # Check whether the existing knowledge base can be reused or updated
+    previous = None
+    previous_files = None
+    if not force and kb_store.kb_exists(kb_path_dir):
+        metadata = kb_store.read_metadata(kb_path_dir)
+        
+        # Only a knowledge base built with the same parameters can be reused
+        if (metadata is not None and
+            metadata.get("embedding_model") == embedding_model and
+            metadata.get("chunk_size") == chunk_size and
+            metadata.get("chunk_overlap") == chunk_overlap and
+            metadata.get("embedding_dtype", DEFAULT_EMBEDDING_DTYPE) == embedding_dtype and
+            metadata.get("embedding_rescore", False) == embedding_rescore and
+            metadata.get("embedding_dim", 0) == embedding_dim and
+            (not embedding_dim or metadata.get("embedding_reduction") == embedding_reduction)):
             
-            # Compute new hash of all documents
-            doc_hash = hashlib.md5()
-            for doc in docs:
-                doc_hash.update(doc["content"].encode())
-                doc_hash.update(doc["filename"].encode())
-            current_hash = doc_hash.hexdigest()
+            try:
+                previous = kb_store.load_chunk_table(kb_path_dir)
+            except (OSError, ValueError, KeyError, json.JSONDecodeError):
+                # If any error occurs, rebuild the knowledge base
+                previous = None
+            if previous is not None and previous.embeddings is None:
+                previous = None
             
-            # If hash matches and parameters match, we can reuse existing KB
-            if (metadata.get("hash") == current_hash and 
-                metadata.get("embedding_model") == embedding_model and
-                metadata.get("chunk_size") == chunk_size and
-                metadata.get("chunk_overlap") == chunk_overlap):
-                
+            if previous is not None and metadata.get("hash") == current_hash:
                 print(f"No changes detected in documents. Using existing knowledge base.")
-                with open(kb_path, "r") as f:
-                    return json.load(f)
-                
-        except (json.JSONDecodeError, KeyError, FileNotFoundError):
-            # If any error occurs, rebuild the knowledge base
-            pass
+                return previous
+            
+            previous_files = metadata.get("files")
+            if previous_files is None:
+                # Older knowledge bases have no per-file manifest
+                previous = None
     
-    # Create document chunks
-    chunked_docs = create_document_chunks(docs, chunk_size, chunk_overlap)
+    if save_embeddings:
+        params = {
+            "embedding_model": embedding_model,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "embedding_dtype": embedding_dtype,
+            "embedding_rescore": embedding_rescore,
+            "embedding_dim": embedding_dim,
+            "embedding_reduction": embedding_reduction,
+            "projection": previous.projection.info if previous is not None and previous.projection else None
+        }
+        sink = kb_store.ChunkTableWriter(kb_path_dir, params)
+    else:
+        sink = ChunkTableBuilder()
     
-    # Try to compute embeddings if available
     try:
-        from sentence_transformers import SentenceTransformer
-        import numpy as np
-        
-        print(f"Computing embeddings using model: {embedding_model}")
-        model = SentenceTransformer(embedding_model)
-        
-        # Compute embeddings for all chunks
-        contents = [doc["content"] for doc in chunked_docs]
-        embeddings = model.encode(contents)
-        
-        for i, doc in enumerate(chunked_docs):
-            doc["embedding"] = embeddings[i].tolist()  # Convert to list for serialization
-        
-        # Save embeddings if requested
-        if save_embeddings:
-            # Save knowledge base
-            with open(kb_path, "w") as f:
-                json.dump(chunked_docs, f)
-            
-            # Compute hash of all documents for change detection
-            doc_hash = hashlib.md5()
-            for doc in docs:
-                doc_hash.update(doc["content"].encode())
-                doc_hash.update(doc["filename"].encode())
-            
-            # Save metadata
-            metadata = {
-                "hash": doc_hash.hexdigest(),
-                "created_at": time.time(),
-                "embedding_model": embedding_model,
-                "chunk_size": chunk_size,
-                "chunk_overlap": chunk_overlap,
-                "num_docs": len(docs),
-                "num_chunks": len(chunked_docs),
-                "source_dir": source_dir
-            }
-            
-            with open(metadata_path, "w") as f:
-                json.dump(metadata, f)
+        files, embedding_model = _ingest(
+            entries, sink, chunk_size, chunk_overlap, embedding_model, previous, previous_files,
+            batch_size=int(config.get("ingest_batch_size", DEFAULT_INGEST_BATCH_SIZE)),
+            workers=int(config.get("load_workers", 0)),
+            progress=progress,
+            jobs=jobs
+        )
+    except BaseException:
+        # Keep what was checkpointed so the next build can resume
+        sink.abort()
+        raise
     
-    except ImportError:
-        # Continue without embeddings if libraries not available
-        print("Warning: sentence-transformers not installed. Using lexical search only.")
+    metadata = {
+        "hash": current_hash,
+        "created_at": time.time(),
+        "embedding_model": embedding_model,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_dtype": embedding_dtype,
+        "embedding_rescore": embedding_rescore,
+        "embedding_dim": embedding_dim,
+        "embedding_reduction": embedding_reduction,
+        "num_docs": len(entries),
+        "num_chunks": sum(f["chunk_end"] - f["chunk_start"] for f in files.values()),
+        "source_dir": source_dir,
+        "files": files
+    }
+    table = sink.finish(metadata)
+    
+    elapsed = time.perf_counter() - build_start
+    print(f"Built knowledge base with {len(table)} chunks in {elapsed:.1f}s "
+          f"({len(table) / max(elapsed, 1e-9):.1f} chunks/sec)")
+    return table
+
+def _under(filename: str, path: str) -> bool:
+    """Check whether a document filename is, or is inside, a relative path ("." for everything)."""
+    return path == "." or filename == path or filename.startswith(path + os.sep)
+
+def update_documents(
+    table: ChunkTable,
+    metadata: Dict[str, Any],
+    source_dir: str,
+    paths: Iterable[str]
+) -> Optional[Tuple[ChunkTable, Dict[str, Any]]]:
+    """Apply changes to individual files to a loaded knowledge base, in memory.
+    
+    ``paths`` are the files or directories reported as created, modified or
+    deleted. Documents under them that the crawler no longer lists (or can no
+    longer read) are dropped; new and modified ones are chunked and embedded
+    with the knowledge base's own parameters and appended after the others.
+    The chunks, embeddings and index entries of every other document are kept
+    as they are: the BM25 index is updated rather than rebuilt (see
+    ``BM25Index.update``) and so is an IVF index, while other ANN indexes are
+    dropped (see ``update_ann_index``).
+    
+    Nothing is written to disk; save the result with ``kb_store.save_chunk_table``.
+    The combined hash of all documents cannot be updated without reading every
+    one of them, so it is cleared, and the next ``build_knowledge_base`` checks
+    each file against its own hash instead.
+    
+    Args:
+        table: Knowledge base as loaded or built, with whole documents in its text store
+        metadata: The knowledge base's metadata, including its per-file manifest
+        source_dir: Directory containing the documents
+        paths: Changed paths, absolute or relative to ``source_dir``
         
-        # Still save the chunked documents if requested
-        if save_embeddings:
-            with open(kb_path, "w") as f:
-                json.dump(chunked_docs, f)
-            
-            # Compute hash for change detection
-            doc_hash = hashlib.md5()
-            for doc in docs:
-                doc_hash.update(doc["content"].encode())
-                doc_hash.update(doc["filename"].encode())
-            
-            # Save metadata without embedding info
-            metadata = {
-                "hash": doc_hash.hexdigest(),
-                "created_at": time.time(),
-                "embedding_model": None,  # No embedding model used
-                "chunk_size": chunk_size,
-                "chunk_overlap": chunk_overlap,
-                "num_docs": len(docs),
-                "num_chunks": len(chunked_docs),
-                "source_dir": source_dir
-            }
-            
-            with open(metadata_path, "w") as f:
-                json.dump(metadata, f)
+    Returns:
+        Tuple of (updated table, updated metadata), or None if no document changed
+    """
+    import numpy as np
+    from ask_docs.core.vector_search import normalize_rows
     
-    return chunked_docs
+    files = metadata.get("files") or {}
+    changed = set()
+    for path in paths:
+        rel_path = os.path.relpath(os.path.join(source_dir, path), source_dir)
+        if rel_path != ".." and not rel_path.startswith(".." + os.sep):
+            changed.add(rel_path)
+    
+    crawled = {os.path.normpath(p): p for p in list_documents(source_dir)}
+    doc_index = {d["filename"]: i for i, d in enumerate(table.documents)}
+    affected = sorted(name for name in set(crawled) | set(doc_index)
+                      if any(_under(name, path) for path in changed))
+    
+    removed = set()
+    added = []
+    readable = crawler.iter_documents(source_dir, [crawled[name] for name in affected if name in crawled])
+    for doc in readable:
+        name = doc["filename"]
+        file_hash = _file_hash(doc)
+        if name in doc_index and files.get(name, {}).get("hash") == file_hash:
+            # Touched but unchanged
+            affected.remove(name)
+            continue
+        added.append((doc, file_hash))
+    for name in affected:
+        if name in doc_index:
+            removed.add(doc_index[name])
+    if not removed and not added:
+        return None
+    
+    chunk_size = metadata.get("chunk_size", DEFAULT_CHUNK_SIZE)
+    chunk_overlap = metadata.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)
+    
+    keep_docs = np.ones(len(table.documents), dtype=bool)
+    keep_docs[list(removed)] = False
+    keep = keep_docs[table.doc_ids]
+    documents = [d for d, kept in zip(table.documents, keep_docs) if kept]
+    hashes = [files.get(d["filename"], {}).get("hash") for d in documents]
+    
+    # New and modified documents go after the kept ones, in a store appended to the current one
+    appended = bytearray()
+    doc_ids, chunk_ids, starts, ends, texts = [], [], [], [], []
+    for doc, file_hash in added:
+        data = doc["content"].encode("utf-8")
+        doc_start = len(table.text_store) + len(appended)
+        appended += data
+        spans = split_text_into_spans(doc["content"], chunk_size, chunk_overlap)
+        byte_starts, byte_ends = _byte_spans(doc["content"], data, spans)
+        doc_ids.extend([len(documents)] * len(spans))
+        chunk_ids.extend(range(len(spans)))
+        starts.extend(doc_start + start for start in byte_starts)
+        ends.extend(doc_start + end for end in byte_ends)
+        texts.extend(doc["content"][start:end] for start, end in spans)
+        documents.append({
+            "filename": doc["filename"],
+            "filepath": doc["filepath"],
+            "file_type": doc["file_type"],
+            "start": doc_start,
+            "end": doc_start + len(data)
+        })
+        hashes.append(file_hash)
+    
+    embeddings = table.embeddings
+    new_embeddings = None
+    if embeddings is not None:
+        new_embeddings = np.empty((0, embeddings.shape[1]), dtype=np.float32)
+        if texts:
+            model = get_embedding_model(metadata.get("embedding_model"))
+            new_embeddings = normalize_rows(BatchEncoder(model, jobs=1).encode(texts))
+            if table.projection is not None:
+                new_embeddings = table.projection.transform(new_embeddings)
+        if isinstance(embeddings, QuantizedEmbeddings):
+            embeddings = QuantizedEmbeddings.concatenate([
+                embeddings.take(keep), as_stored(new_embeddings, embeddings.storage_dtype)])
+        else:
+            embeddings = np.concatenate([full_precision_rows(embeddings, keep), new_embeddings])
+    
+    row_doc_ids = np.concatenate([(np.cumsum(keep_docs) - 1)[table.doc_ids[keep]],
+                                  np.asarray(doc_ids, dtype=np.int32)])
+    updated = ChunkTable(
+        documents,
+        AppendedTextStore(table.text_store, bytes(appended)) if appended else table.text_store,
+        row_doc_ids,
+        np.concatenate([table.chunk_ids[keep], np.asarray(chunk_ids, dtype=np.int32)]),
+        np.concatenate([table.starts[keep], np.asarray(starts, dtype=np.int64)]),
+        np.concatenate([table.ends[keep], np.asarray(ends, dtype=np.int64)]),
+        embeddings=embeddings,
+        projection=table.projection
+    )
+    if table.lexical_index is not None:
+        updated.lexical_index = table.lexical_index.update(keep, texts)
+    else:
+        updated.lexical_index = BM25Index.build(updated.contents)
+    if new_embeddings is not None:
+        updated.ann_index = update_ann_index(table.ann_index, keep, new_embeddings)
+    
+    # Each document's chunks are contiguous, so the manifest is rebuilt from the row counts
+    counts = np.bincount(row_doc_ids, minlength=len(documents))
+    chunk_ends = np.cumsum(counts)
+    manifest = {
+        d["filename"]: {
+            "hash": file_hash,
+            "chunk_start": int(chunk_end - count),
+            "chunk_end": int(chunk_end)
+        }
+        for d, file_hash, count, chunk_end in zip(documents, hashes, counts, chunk_ends)
+    }
+    metadata = dict(
+        metadata,
+        hash=None,
+        created_at=time.time(),
+        num_docs=len(documents),
+        num_chunks=len(updated),
+        files=manifest
+    )
+    updated.version = kb_store.kb_version(metadata)
+    modified = sum(1 for doc, _ in added if doc["filename"] in doc_index)
+    print(f"Updated knowledge base in memory: {len(added) - modified} new, {modified} modified, "
+          f"{len(removed) - modified} deleted files")
+    return updated, metadata
 
-def load_knowledge_base(source_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+def load_knowledge_base(source_dir: Optional[str] = None) -> ChunkTable:
     """Load a pre-built knowledge base if available, or build one if not.
     
+    Embeddings and chunk texts are memory-mapped from disk. Knowledge bases
+    saved in the older ``knowledge_base.json`` format are converted on first load.
+    
     Args:
         source_dir: Directory containing the documents
         
     Returns:
-        List of document chunk dictionaries
+        ChunkTable holding the chunks and their normalized embedding matrix
     """
     # Get configuration
     config = get_rag_config()
@@ -395,23 +1137,17 @@ def load_knowledge_base(source_dir: Optional[str] = None) -> List[Dict[str, Any]
     # Ensure the source directory exists
     os.makedirs(source_dir, exist_ok=True)
         
-    kb_path = os.path.join(source_dir, kb_dir, "knowledge_base.json")
-    metadata_path = os.path.join(source_dir, kb_dir, "metadata.json")
+    kb_path_dir = os.path.join(source_dir, kb_dir)
     
-    if os.path.exists(kb_path):
+    if kb_store.kb_exists(kb_path_dir):
         try:
-            import json
-            import numpy as np
-            
             # Load the knowledge base
-            with open(kb_path, "r") as f:
-                chunked_docs = json.load(f)
+            chunk_table = kb_store.load_chunk_table(kb_path_dir)
             
             # Load metadata if available
-            if os.path.exists(metadata_path):
-                with open(metadata_path, "r") as f:
-                    metadata = json.load(f)
-                print(f"Using knowledge base with {metadata.get('num_chunks', len(chunked_docs))} chunks")
+            metadata = kb_store.read_metadata(kb_path_dir)
+            if metadata is not None:
+                print(f"Using knowledge base with {metadata.get('num_chunks', len(chunk_table))} chunks")
                 print(f"Created at: {time.ctime(metadata.get('created_at', 0))}")
                 
                 if metadata.get('embedding_model'):
@@ -419,21 +1155,12 @@ def load_knowledge_base(source_dir: Optional[str] = None) -> List[Dict[str, Any]
                 else:
                     print("No embeddings - using lexical search only")
             
-            # Convert embedding lists back to numpy arrays if needed
-            try:
-                from sentence_transformers import SentenceTransformer
-                for doc in chunked_docs:
-                    if "embedding" in doc:
-                        doc["embedding"] = np.array(doc["embedding"])
-            except ImportError:
-                pass
-            
-            return chunked_docs
+            return chunk_table
             
         except Exception as e:
             print(f"Error loading knowledge base: {e}")
             # Fall back to building knowledge base if loading fails
-            return build_knowledge_base(source_dir)
+            return build_knowledge_base(source_dir, force=True)
     else:
         print("No existing knowledge base found. Building...")
         # Build knowledge base if not found
@@ -457,8 +1184,8 @@ def kb_info(source_dir: Optional[str] = None) -> Dict[str, Any]:
     # Ensure the source directory exists
     os.makedirs(source_dir, exist_ok=True)
         
-    kb_path = os.path.join(source_dir, kb_dir, "knowledge_base.json")
-    metadata_path = os.path.join(source_dir, kb_dir, "metadata.json")
+    kb_path_dir = os.path.join(source_dir, kb_dir)
+    metadata_path = os.path.join(kb_path_dir, kb_store.METADATA_FILE)
     
     # Check for docs in the source directory
     docs = load_documents(source_dir, recursive=True)
@@ -470,38 +1197,41 @@ def kb_info(source_dir: Optional[str] = None) -> Dict[str, Any]:
         "source_dir": source_dir,
         "doc_count": len(docs),
         "sample_docs": sample_docs,
-        "kb_exists": os.path.exists(kb_path),
+        "kb_exists": kb_store.kb_exists(kb_path_dir),
         "metadata_exists": os.path.exists(metadata_path)
     }
     
     # Add metadata if available
-    if os.path.exists(metadata_path):
-        try:
-            with open(metadata_path, "r") as f:
-                metadata = json.load(f)
-            result["metadata"] = metadata
-            result["kb_size_mb"] = os.path.getsize(kb_path) / (1024 * 1024)
-        except (json.JSONDecodeError, FileNotFoundError):
-            pass
+    metadata = kb_store.read_metadata(kb_path_dir)
+    if metadata is not None:
+        result["metadata"] = metadata
+        result["kb_size_mb"] = kb_store.kb_size_bytes(kb_path_dir) / (1024 * 1024)
     
     return result
 
-def get_matching_documents(query: str, top_n: int = 3, source_dir: Optional[str] = None) -> List[Tuple[str, str]]:
+def get_matching_documents(
+    query: str, 
+    top_n: int = 3, 
+    source_dir: Optional[str] = None,
+    mode: Optional[str] = None
+) -> List[Tuple[str, str]]:
     """Get matching documents for a query.
     
     Args:
         query: The query to match against documents
         top_n: Number of top matches to return
         source_dir: Directory containing the documents (optional)
+        mode: Retrieval mode (semantic, lexical or hybrid), or None for the configured mode
         
     Returns:
         List of (filename, snippet) tuples
     """
-    # Load the knowledge base
-    chunks = load_knowledge_base(source_dir)
+    # Use the loaded knowledge base of this directory, if it is still current
+    from ask_docs.core.knowledge_base import get_knowledge_base
+    chunks = get_knowledge_base(source_dir).table
     
     # Get the best matching chunks
-    best_chunks = get_best_chunks(chunks, query, top_n)
+    best_chunks = get_best_chunks(chunks, query, top_n, mode=mode)
     
     # Return the best matches as (filename, content) tuples
     return [(chunk["filename"], chunk["content"]) for chunk in best_chunks]
\ No newline at end of file
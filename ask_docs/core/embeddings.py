@@ -0,0 +1,340 @@
+"""Embedding model management for AskDocs.
+
+This module keeps a process-wide registry of loaded sentence-transformers models
+so that retrieval and knowledge base builds share a single copy of each model
+instead of reloading the weights from disk on every call. It also caches query
+embeddings, since the same questions tend to be asked again and again.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ask_docs.config import get_rag_config
+
+# Default embedding model and number of models kept in memory
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_MAX_LOADED_MODELS = 2
+DEFAULT_QUERY_CACHE_SIZE = 1024
+DEFAULT_EMBEDDING_BATCH_SIZE = 32
+
+# Loaded models, most recently used last
+_model_registry: "OrderedDict[str, Any]" = OrderedDict()
+# Guards the registry itself
+_registry_lock = threading.Lock()
+# One lock per model name so that concurrent first requests load it only once
+_loading_locks: Dict[str, threading.Lock] = {}
+
+# Query embeddings keyed by (model name, normalized query), most recently used last
+_query_cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+_query_cache_hits = 0
+_query_cache_misses = 0
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _get_max_loaded_models() -> int:
+    """Get the maximum number of embedding models to keep in memory."""
+    config = get_rag_config()
+    return max(1, int(config.get("max_loaded_models", DEFAULT_MAX_LOADED_MODELS)))
+
+
+def _resolve_model_name(model_name: Optional[str]) -> str:
+    """Resolve the embedding model name, falling back to the configured default."""
+    if model_name is None:
+        model_name = get_rag_config().get("embedding_model", DEFAULT_EMBEDDING_MODEL)
+    return model_name
+
+
+def _load_model(model_name: str) -> Any:
+    """Load a sentence-transformers model from disk (or the model hub).
+
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def get_embedding_model(model_name: Optional[str] = None) -> Any:
+    """Get a shared embedding model, loading it on first use.
+
+    Loading is safe to call from several threads at once: only the first caller
+    for a given model loads it, the others wait and then reuse the same instance.
+    When more than ``max_loaded_models`` models are loaded, the least recently
+    used one is evicted.
+
+    Args:
+        model_name: Name of the sentence-transformers model, or None for the configured model
+
+    Returns:
+        The loaded SentenceTransformer model
+
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    model_name = _resolve_model_name(model_name)
+
+    with _registry_lock:
+        model = _model_registry.get(model_name)
+        if model is not None:
+            _model_registry.move_to_end(model_name)
+            return model
+        loading_lock = _loading_locks.setdefault(model_name, threading.Lock())
+
+    with loading_lock:
+        # Another thread may have finished loading while we were waiting
+        with _registry_lock:
+            model = _model_registry.get(model_name)
+            if model is not None:
+                _model_registry.move_to_end(model_name)
+                return model
+
+        model = _load_model(model_name)
+
+        with _registry_lock:
+            _model_registry[model_name] = model
+            _model_registry.move_to_end(model_name)
+            max_models = _get_max_loaded_models()
+            while len(_model_registry) > max_models:
+                _model_registry.popitem(last=False)
+
+    return model
+
+
+def warmup_embedding_models(model_names: Optional[Iterable[str]] = None) -> List[str]:
+    """Load embedding models ahead of the first query.
+
+    Args:
+        model_names: Models to load, or None for the configured embedding model
+
+    Returns:
+        List of model names that were loaded successfully
+    """
+    if model_names is None:
+        model_names = [_resolve_model_name(None)]
+
+    loaded = []
+    for model_name in model_names:
+        try:
+            get_embedding_model(model_name)
+            loaded.append(model_name)
+        except ImportError:
+            # Nothing to warm up without sentence-transformers
+            break
+    return loaded
+
+
+def unload_embedding_model(model_name: str) -> bool:
+    """Remove a model from the registry.
+
+    Args:
+        model_name: Name of the model to unload
+
+    Returns:
+        True if the model was loaded and has been removed
+    """
+    with _registry_lock:
+        return _model_registry.pop(model_name, None) is not None
+
+
+def clear_embedding_models() -> None:
+    """Remove all models from the registry."""
+    with _registry_lock:
+        _model_registry.clear()
+
+
+def loaded_embedding_models() -> List[str]:
+    """Get the names of the loaded models, least recently used first."""
+    with _registry_lock:
+        return list(_model_registry.keys())
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for use as a cache key.
+
+    Surrounding whitespace is stripped and internal runs of whitespace are
+    collapsed; case is preserved since it can change the embedding.
+    """
+    return _WHITESPACE_RE.sub(" ", query).strip()
+
+
+def encode_query(model: Any, model_name: str, query: str) -> Any:
+    """Encode a query, reusing the embedding of an identical earlier query.
+
+    The cache holds up to ``query_cache_size`` embeddings (0 disables it) and
+    evicts the least recently used entry when full.
+
+    Args:
+        model: The loaded embedding model
+        model_name: Name of the model, used as part of the cache key
+        query: Query text
+
+    Returns:
+        The query embedding as a read-only array
+    """
+    global _query_cache_hits, _query_cache_misses
+
+    max_size = int(get_rag_config().get("query_cache_size", DEFAULT_QUERY_CACHE_SIZE))
+    key = (model_name, normalize_query(query))
+
+    with _query_cache_lock:
+        embedding = _query_cache.get(key)
+        if embedding is not None:
+            _query_cache.move_to_end(key)
+            _query_cache_hits += 1
+            return embedding
+        _query_cache_misses += 1
+
+    embedding = model.encode(key[1])
+    if hasattr(embedding, "setflags"):
+        # Cached arrays are shared between callers
+        embedding.setflags(write=False)
+
+    if max_size > 0:
+        with _query_cache_lock:
+            _query_cache[key] = embedding
+            _query_cache.move_to_end(key)
+            while len(_query_cache) > max_size:
+                _query_cache.popitem(last=False)
+
+    return embedding
+
+
+def encode_queries(model: Any, model_name: str, queries: List[str]) -> List[Any]:
+    """Encode several queries, reusing cached embeddings and batching the rest.
+    
+    Queries missing from the cache are encoded with a single model call, so a
+    batch of questions costs one forward pass instead of one per question.
+    
+    Args:
+        model: The loaded embedding model
+        model_name: Name of the model, used as part of the cache key
+        queries: Query texts
+        
+    Returns:
+        One read-only query embedding per query, in order
+    """
+    global _query_cache_hits, _query_cache_misses
+    
+    max_size = int(get_rag_config().get("query_cache_size", DEFAULT_QUERY_CACHE_SIZE))
+    keys = [(model_name, normalize_query(query)) for query in queries]
+    found: Dict[Tuple[str, str], Any] = {}
+    
+    with _query_cache_lock:
+        for key in keys:
+            embedding = _query_cache.get(key)
+            if embedding is not None:
+                _query_cache.move_to_end(key)
+                _query_cache_hits += 1
+                found[key] = embedding
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        _query_cache_misses += len(missing)
+    
+    if missing:
+        encoded = model.encode([key[1] for key in missing])
+        for key, embedding in zip(missing, encoded):
+            if hasattr(embedding, "setflags"):
+                embedding.setflags(write=False)
+            found[key] = embedding
+        
+        if max_size > 0:
+            with _query_cache_lock:
+                for key in missing:
+                    _query_cache[key] = found[key]
+                    _query_cache.move_to_end(key)
+                while len(_query_cache) > max_size:
+                    _query_cache.popitem(last=False)
+    
+    return [found[key] for key in keys]
+
+
+def query_cache_stats() -> Dict[str, int]:
+    """Get hit/miss counters and the current size of the query embedding cache."""
+    with _query_cache_lock:
+        return {
+            "hits": _query_cache_hits,
+            "misses": _query_cache_misses,
+            "size": len(_query_cache)
+        }
+
+
+def clear_query_cache() -> None:
+    """Empty the query embedding cache and reset its counters."""
+    global _query_cache_hits, _query_cache_misses
+    with _query_cache_lock:
+        _query_cache.clear()
+        _query_cache_hits = 0
+        _query_cache_misses = 0
+
+
+class BatchEncoder:
+    """Encode many texts in length-sorted batches, optionally across processes.
+
+    Texts are sorted by length before encoding so that each batch holds texts
+    of similar length and wastes little work on padding; results are returned
+    in the original order. With ``jobs`` > 1 a sentence-transformers
+    multi-process pool spreads the batches over that many CPU processes.
+
+    Use as a context manager (or call ``start`` and ``close``) so the pool is
+    shut down afterwards.
+    """
+
+    def __init__(self, model: Any, batch_size: Optional[int] = None, jobs: Optional[int] = None):
+        """Initialize the encoder.
+
+        Args:
+            model: The loaded embedding model
+            batch_size: Texts per model batch, or None for ``embedding_batch_size``
+            jobs: Number of encoding processes, or None for ``embedding_jobs``
+        """
+        config = get_rag_config()
+        self.model = model
+        self.batch_size = int(batch_size or config.get("embedding_batch_size", DEFAULT_EMBEDDING_BATCH_SIZE))
+        self.jobs = int(jobs or config.get("embedding_jobs", 1))
+        self.pool = None
+        self.num_encoded = 0
+        self.seconds = 0.0
+
+    def __enter__(self) -> "BatchEncoder":
+        self.start()
+        return self
+
+    def start(self) -> None:
+        """Start the multi-process pool when more than one job was requested."""
+        if self.jobs > 1 and self.pool is None and hasattr(self.model, "start_multi_process_pool"):
+            self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.jobs)
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the multi-process pool, if one was started."""
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+    def encode(self, texts: List[str]) -> Any:
+        """Encode texts, returning one embedding row per text in the original order."""
+        import numpy as np
+
+        start = time.perf_counter()
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        sorted_texts = [texts[i] for i in order]
+        if self.pool is not None:
+            encoded = self.model.encode_multi_process(sorted_texts, self.pool, batch_size=self.batch_size)
+        else:
+            encoded = self.model.encode(sorted_texts, batch_size=self.batch_size)
+
+        embeddings = np.empty_like(np.asarray(encoded))
+        embeddings[order] = encoded
+        self.num_encoded += len(texts)
+        self.seconds += time.perf_counter() - start
+        return embeddings
+
+    @property
+    def chunks_per_second(self) -> float:
+        """Encoding throughput so far."""
+        return self.num_encoded / self.seconds if self.seconds > 0 else 0.0
@@ -0,0 +1,700 @@
+"""On-disk storage for AskDocs knowledge bases.
+
+A knowledge base directory (``.kb`` by default) holds:
+
+- ``embeddings.npy``: matrix of L2-normalized chunk embeddings, memory-mapped on load;
+  float32, or float16/int8 depending on ``embedding_dtype`` (see ``ask_docs.core.quantization``)
+- ``embedding_scales.npy``: per-row scales of int8 embeddings
+- ``embeddings_full.npy``: float32 copy of quantized embeddings, kept for rescoring
+- ``projection.npz``: projection the embeddings were reduced with, if ``embedding_dim`` is set
+  (see ``ask_docs.core.projection``)
+- ``chunks.npy``: one fixed-size record per chunk (document index, chunk index and
+  byte range of the chunk text in ``texts.bin``)
+- ``texts.bin``: UTF-8 text of each source document, concatenated, memory-mapped on
+  load; overlapping chunks share the same bytes
+- ``documents.json``: filename, path, type and byte range in ``texts.bin`` of each
+  source document
+- ``bm25_*``: inverted index for lexical search (see ``ask_docs.core.lexical_index``)
+- ``ann*``: optional approximate nearest-neighbour index (see ``ask_docs.core.ann_index``)
+- ``metadata.json``: build parameters and change-detection hashes
+- ``staging/``: only present while a build is running or after one was interrupted
+
+Only the small JSON files (documents, metadata and the BM25 vocabulary) are
+parsed when a knowledge base is loaded, so load time and memory use stay nearly constant as the number of
+chunks grows. Knowledge bases in the older single-file ``knowledge_base.json``
+format are converted the first time they are loaded.
+"""
+import json
+import mmap
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ask_docs.core.ann_index import ANN_FILES, build_ann_index, load_ann_index, save_ann_index
+from ask_docs.core.atomic_io import write_atomic
+from ask_docs.core.chunk_table import AppendedTextStore, ChunkTable
+from ask_docs.core.lexical_index import INDEX_FILES, BM25Index
+from ask_docs.core.projection import (
+    DEFAULT_PROJECTION_METHOD, PROJECTION_FILE, EmbeddingProjection, fit_projection
+)
+from ask_docs.core.quantization import (
+    DEFAULT_EMBEDDING_DTYPE, QuantizedEmbeddings, as_stored, full_precision_rows, quantize
+)
+
+# Version of the on-disk layout, recorded in metadata.json. Version 3 stores
+# whole documents in texts.bin; version 2 stored each chunk's text separately.
+KB_FORMAT_VERSION = 3
+
+EMBEDDINGS_FILE = "embeddings.npy"
+EMBEDDING_SCALES_FILE = "embedding_scales.npy"
+FULL_EMBEDDINGS_FILE = "embeddings_full.npy"
+CHUNKS_FILE = "chunks.npy"
+TEXTS_FILE = "texts.bin"
+DOCUMENTS_FILE = "documents.json"
+METADATA_FILE = "metadata.json"
+LEGACY_KB_FILE = "knowledge_base.json"
+
+# Files of an in-progress build, see ChunkTableWriter
+STAGING_DIR = "staging"
+BUILD_STATE_FILE = "build_state.json"
+STAGED_CHUNKS_FILE = "chunks.bin"
+STAGED_EMBEDDINGS_FILE = "embeddings.f32"
+STAGED_STORED_FILE = "embeddings.stored"
+STAGED_SCALES_FILE = "embedding_scales.f32"
+
+KB_FILES = (EMBEDDINGS_FILE, EMBEDDING_SCALES_FILE, FULL_EMBEDDINGS_FILE,
+            PROJECTION_FILE, CHUNKS_FILE, TEXTS_FILE, DOCUMENTS_FILE, METADATA_FILE)
+EMBEDDING_FILES = (EMBEDDINGS_FILE, EMBEDDING_SCALES_FILE, FULL_EMBEDDINGS_FILE)
+
+# Rows projected and quantized at a time when finishing a staged build
+_QUANTIZE_BLOCK = 65536
+
+# Record layout of chunks.npy
+CHUNK_DTYPE = np.dtype([
+    ("doc_id", np.int32),
+    ("chunk_id", np.int32),
+    ("start", np.int64),
+    ("end", np.int64),
+])
+
+
+def kb_exists(kb_path_dir: str) -> bool:
+    """Check whether a knowledge base (in either format) exists in a directory."""
+    return (os.path.exists(os.path.join(kb_path_dir, CHUNKS_FILE)) or
+            os.path.exists(os.path.join(kb_path_dir, LEGACY_KB_FILE)))
+
+
+def kb_size_bytes(kb_path_dir: str) -> int:
+    """Get the total size of the knowledge base files in a directory."""
+    total = 0
+    for name in KB_FILES + INDEX_FILES + ANN_FILES + (LEGACY_KB_FILE,):
+        path = os.path.join(kb_path_dir, name)
+        if os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def read_metadata(kb_path_dir: str) -> Optional[Dict[str, Any]]:
+    """Read metadata.json from a knowledge base directory, or None if missing or invalid."""
+    try:
+        with open(os.path.join(kb_path_dir, METADATA_FILE), "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return None
+
+
+def kb_version(metadata: Dict[str, Any]) -> str:
+    """Get a string identifying one build of a knowledge base.
+
+    Combines the document content hash with the build time, so the version
+    also changes when the same documents are rebuilt with other parameters.
+    """
+    return f"{metadata.get('hash', '')}-{metadata.get('created_at', 0)}"
+
+
+def write_metadata(kb_path_dir: str, metadata: Dict[str, Any]) -> None:
+    """Atomically write metadata.json to a knowledge base directory."""
+    write_atomic(os.path.join(kb_path_dir, METADATA_FILE),
+                  lambda f: f.write(json.dumps(metadata).encode("utf-8")))
+
+
+def save_chunk_table(kb_path_dir: str, table: ChunkTable, metadata: Dict[str, Any]) -> None:
+    """Save a chunk table in the binary knowledge base format.
+
+    Metadata is written last, so an interrupted save leaves the previous
+    metadata (and therefore a failed change check) rather than a half-valid KB.
+    The table's ``version`` is updated to match the saved build. Embeddings are
+    stored at the precision named by the ``embedding_dtype`` metadata field,
+    with a full-precision copy if ``embedding_rescore`` is set.
+
+    Args:
+        kb_path_dir: Knowledge base directory
+        table: Chunks to save
+        metadata: Metadata to store in metadata.json
+    """
+    os.makedirs(kb_path_dir, exist_ok=True)
+
+    records = np.empty(len(table), dtype=CHUNK_DTYPE)
+    if table.text_store is not None and all("start" in d for d in table.documents):
+        # Offset-based table: save the document store and chunk offsets
+        documents, shifts, write_texts = _document_store_writer(table)
+        records["doc_id"] = table.doc_ids
+        records["chunk_id"] = table.chunk_ids
+        records["start"] = table.starts + shifts[table.doc_ids]
+        records["end"] = table.ends + shifts[table.doc_ids]
+    else:
+        # Chunks with their own texts (e.g. from a legacy knowledge base): store
+        # each chunk's text, grouped by source document in order of first appearance
+        documents, write_texts = _chunk_texts_writer(table, records)
+
+    write_atomic(os.path.join(kb_path_dir, TEXTS_FILE), write_texts)
+    write_atomic(os.path.join(kb_path_dir, CHUNKS_FILE), lambda f: np.save(f, records))
+    write_atomic(os.path.join(kb_path_dir, DOCUMENTS_FILE),
+                  lambda f: f.write(json.dumps(documents).encode("utf-8")))
+
+    _remove_files(kb_path_dir, EMBEDDING_FILES)
+    if table.embeddings is not None:
+        dtype, keep_full = _embedding_storage(metadata)
+        if dtype == "float32":
+            values, scales = np.ascontiguousarray(full_precision_rows(table.embeddings, slice(None))), None
+        else:
+            # Rows already stored at this precision are saved as they are
+            stored = as_stored(table.embeddings, dtype)
+            values, scales = stored.values, stored.scales
+        write_atomic(os.path.join(kb_path_dir, EMBEDDINGS_FILE), lambda f: np.save(f, values))
+        if scales is not None:
+            write_atomic(os.path.join(kb_path_dir, EMBEDDING_SCALES_FILE), lambda f: np.save(f, scales))
+        if keep_full:
+            full = full_precision_rows(table.embeddings, slice(None))
+            write_atomic(os.path.join(kb_path_dir, FULL_EMBEDDINGS_FILE), lambda f: np.save(f, full))
+
+    _save_indexes_and_metadata(kb_path_dir, table, metadata)
+
+
+def _embedding_storage(metadata: Dict[str, Any]) -> Tuple[str, bool]:
+    """Get the embedding precision and whether to keep a full-precision copy from metadata."""
+    dtype = metadata.get("embedding_dtype", DEFAULT_EMBEDDING_DTYPE)
+    return dtype, dtype != "float32" and bool(metadata.get("embedding_rescore", False))
+
+
+def _remove_files(kb_path_dir: str, names: Sequence[str]) -> None:
+    """Remove files from a knowledge base directory if they exist."""
+    for name in names:
+        path = os.path.join(kb_path_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _document_store_writer(table: ChunkTable) -> Tuple[List[Dict[str, Any]], np.ndarray, Any]:
+    """Prepare to store each document's text once, in document order.
+
+    A table updated in memory (see ``document_retrieval.update_documents``)
+    can still hold the text of documents it dropped; only the text of its
+    current documents is written, and chunk offsets move with it.
+
+    Returns:
+        Tuple of (document table, shift of each document's chunk offsets,
+        function writing texts.bin)
+    """
+    old_starts = np.array([d["start"] for d in table.documents], dtype=np.int64)
+    lengths = np.array([d["end"] - d["start"] for d in table.documents], dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+    documents = [dict(d, start=int(start), end=int(start + length))
+                 for d, start, length in zip(table.documents, starts, lengths)]
+    shifts = starts - old_starts
+
+    if isinstance(table.text_store, AppendedTextStore) or shifts.any() or lengths.sum() != len(table.text_store):
+        def write_texts(f):
+            for d in table.documents:
+                f.write(table.text_store[d["start"]:d["end"]])
+    else:
+        def write_texts(f):
+            f.write(table.text_store)
+
+    return documents, shifts, write_texts
+
+
+def _chunk_texts_writer(table: ChunkTable, records: np.ndarray) -> Tuple[List[Dict[str, str]], Any]:
+    """Prepare to store every chunk's text separately.
+
+    Returns:
+        Tuple of (document table, function writing texts.bin and filling ``records``)
+    """
+    documents: List[Dict[str, str]] = []
+    doc_index: Dict[str, int] = {}
+    offset = 0
+
+    def write_texts(f):
+        nonlocal offset
+        for i in range(len(table)):
+            filename = table.filenames[i]
+            if filename not in doc_index:
+                doc_index[filename] = len(documents)
+                documents.append({
+                    "filename": filename,
+                    "filepath": table.filepaths[i],
+                    "file_type": table.file_types[i]
+                })
+            data = table.contents[i].encode("utf-8")
+            f.write(data)
+            records[i] = (doc_index[filename], table.chunk_ids[i], offset, offset + len(data))
+            offset += len(data)
+
+    return documents, write_texts
+
+
+def _save_indexes_and_metadata(kb_path_dir: str, table: ChunkTable, metadata: Dict[str, Any]) -> None:
+    """Save the table's search indexes, then metadata.json, completing a save."""
+    if table.lexical_index is not None:
+        table.lexical_index.save(kb_path_dir)
+    else:
+        _remove_files(kb_path_dir, INDEX_FILES)
+
+    save_ann_index(kb_path_dir, table.ann_index, table.embeddings)
+
+    metadata = dict(metadata)
+    metadata.pop("embedding_projection", None)
+    if table.projection is not None:
+        table.projection.save(kb_path_dir)
+        metadata["embedding_projection"] = table.projection.info
+    else:
+        _remove_files(kb_path_dir, (PROJECTION_FILE,))
+
+    legacy_path = os.path.join(kb_path_dir, LEGACY_KB_FILE)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+    metadata = dict(metadata, format_version=KB_FORMAT_VERSION)
+    write_metadata(kb_path_dir, metadata)
+    table.version = kb_version(metadata)
+
+
+def load_chunk_table(kb_path_dir: str, load_indexes: bool = True) -> Optional[ChunkTable]:
+    """Load a knowledge base from a directory.
+
+    Embeddings and chunk texts are memory-mapped rather than read into memory;
+    float16 and int8 embeddings are returned as ``QuantizedEmbeddings``.
+    A legacy ``knowledge_base.json`` is converted to the binary format first.
+
+    Args:
+        kb_path_dir: Knowledge base directory
+        load_indexes: Whether to load the BM25 and ANN indexes
+
+    Returns:
+        The loaded ChunkTable, or None if the directory holds no knowledge base
+    """
+    chunks_path = os.path.join(kb_path_dir, CHUNKS_FILE)
+    if not os.path.exists(chunks_path):
+        if not migrate_legacy_kb(kb_path_dir):
+            return None
+
+    records = _load_array(chunks_path)
+    with open(os.path.join(kb_path_dir, DOCUMENTS_FILE), "r") as f:
+        documents = json.load(f)
+
+    texts_path = os.path.join(kb_path_dir, TEXTS_FILE)
+    if os.path.getsize(texts_path) > 0:
+        with open(texts_path, "rb") as f:
+            texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        texts = b""
+
+    embeddings = None
+    embeddings_path = os.path.join(kb_path_dir, EMBEDDINGS_FILE)
+    if os.path.exists(embeddings_path):
+        embeddings = _load_array(embeddings_path)
+        if embeddings.dtype != np.float32:
+            scales_path = os.path.join(kb_path_dir, EMBEDDING_SCALES_FILE)
+            full_path = os.path.join(kb_path_dir, FULL_EMBEDDINGS_FILE)
+            embeddings = QuantizedEmbeddings(
+                embeddings,
+                scales=_load_array(scales_path) if os.path.exists(scales_path) else None,
+                full=_load_array(full_path) if os.path.exists(full_path) else None
+            )
+
+    metadata = read_metadata(kb_path_dir) or {}
+    return ChunkTable(
+        documents,
+        texts,
+        records["doc_id"],
+        records["chunk_id"],
+        records["start"],
+        records["end"],
+        embeddings=embeddings,
+        lexical_index=BM25Index.load(kb_path_dir) if load_indexes else None,
+        ann_index=load_ann_index(kb_path_dir) if load_indexes and embeddings is not None else None,
+        version=kb_version(metadata),
+        projection=EmbeddingProjection.load(kb_path_dir) if embeddings is not None else None
+    )
+
+
+def _load_array(path: str) -> np.ndarray:
+    """Load an .npy file memory-mapped, falling back to a normal load for empty arrays."""
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Zero-length arrays cannot be memory-mapped
+        return np.load(path)
+
+
+def migrate_legacy_kb(kb_path_dir: str) -> bool:
+    """Convert a legacy knowledge_base.json into the binary format.
+
+    Args:
+        kb_path_dir: Knowledge base directory
+
+    Returns:
+        True if a legacy knowledge base was found and converted
+    """
+    legacy_path = os.path.join(kb_path_dir, LEGACY_KB_FILE)
+    if not os.path.exists(legacy_path):
+        return False
+
+    print("Converting knowledge base to the binary format...")
+    with open(legacy_path, "r") as f:
+        table = ChunkTable.from_chunks(json.load(f))
+    table.lexical_index = BM25Index.build(table.contents)
+    table.ann_index = build_ann_index(table.embeddings)
+
+    metadata = read_metadata(kb_path_dir) or {}
+    metadata.setdefault("num_chunks", len(table))
+    save_chunk_table(kb_path_dir, table, metadata)
+    return True
+
+
+class ChunkTableWriter:
+    """Write a knowledge base incrementally, with checkpoints for resuming.
+
+    Documents and chunk offsets are appended to raw files in ``staging/``
+    inside the knowledge base directory, so memory use does not grow with the
+    size of the corpus. Embeddings are staged as float32 unless they are
+    stored quantized and need no projection fitted at the end; those are
+    staged at their storage precision (see ``stored_dtype``), so rows copied
+    from a previous build keep their stored values.
+    ``checkpoint`` makes everything written so far durable and records the
+    caller's progress; if the build is interrupted, a new writer with the same
+    build parameters continues from the last checkpoint. ``finish`` converts
+    the staged files to the normal layout, builds the search indexes and moves
+    everything into place.
+    """
+
+    def __init__(self, kb_path_dir: str, params: Dict[str, Any]):
+        """Open a writer, resuming an interrupted build with the same parameters.
+
+        Args:
+            kb_path_dir: Knowledge base directory
+            params: Build parameters; staged data is only reused if they match
+        """
+        self.kb_path_dir = kb_path_dir
+        self.staging_dir = os.path.join(kb_path_dir, STAGING_DIR)
+        self.params = params
+        self.documents: List[Dict[str, str]] = []
+        self.num_chunks = 0
+        self.text_bytes = 0
+        self.dim: Optional[int] = None
+        self.has_embeddings = True
+        # Set by the caller when the embeddings it writes are already projected
+        self.projection: Optional[EmbeddingProjection] = None
+        dtype = params.get("embedding_dtype", DEFAULT_EMBEDDING_DTYPE)
+        fits_projection = bool(params.get("embedding_dim")) and params.get("projection") is None
+        # Precision embeddings are staged at, or None to stage float32
+        self.stored_dtype: Optional[str] = dtype if dtype != "float32" and not fits_projection else None
+        # Float32 rows are still needed for a full-precision copy
+        self._stages_raw = self.stored_dtype is None or bool(params.get("embedding_rescore", False))
+        self.progress: Dict[str, Any] = {}
+        self.resumed = False
+
+        try:
+            with open(os.path.join(self.staging_dir, BUILD_STATE_FILE), "r") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            state = None
+
+        if state is not None and state.get("params") == params:
+            self.documents = state["documents"]
+            self.num_chunks = state["num_chunks"]
+            self.text_bytes = state["text_bytes"]
+            self.dim = state["dim"]
+            self.has_embeddings = state["has_embeddings"]
+            self.progress = state["progress"]
+            self.resumed = True
+        else:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+        # Anything written after the last checkpoint is discarded
+        self._texts = self._open_truncated(TEXTS_FILE, self.text_bytes)
+        self._chunks = self._open_truncated(STAGED_CHUNKS_FILE, self.num_chunks * CHUNK_DTYPE.itemsize)
+        self._embeddings = self._open_truncated(
+            STAGED_EMBEDDINGS_FILE, self.num_chunks * (self.dim or 0) * 4 if self._stages_raw else 0
+        )
+        stored_itemsize = np.dtype(self.stored_dtype).itemsize if self.stored_dtype else 0
+        self._stored = self._open_truncated(STAGED_STORED_FILE, self.num_chunks * (self.dim or 0) * stored_itemsize)
+        self._scales = self._open_truncated(
+            STAGED_SCALES_FILE, self.num_chunks * 4 if self.stored_dtype == "int8" else 0
+        )
+
+    def reset(self) -> None:
+        """Discard everything staged so far, including resumed data."""
+        self.documents = []
+        self.num_chunks = 0
+        self.text_bytes = 0
+        self.dim = None
+        self.has_embeddings = True
+        self.projection = None
+        self.progress = {}
+        self.resumed = False
+        for f in self._staged_files():
+            f.truncate(0)
+            f.seek(0)
+
+    def _staged_files(self) -> tuple:
+        """The open staged files, in the order they are written."""
+        return (self._texts, self._chunks, self._embeddings, self._stored, self._scales)
+
+    def _open_truncated(self, name: str, size: int):
+        """Open a staged file for appending after truncating it to ``size`` bytes."""
+        path = os.path.join(self.staging_dir, name)
+        f = open(path, "r+b" if os.path.exists(path) else "w+b")
+        f.truncate(size)
+        f.seek(size)
+        return f
+
+    def add_document(self, filename: str, filepath: str, file_type: str, data: bytes) -> int:
+        """Append a source document to the text store.
+
+        Args:
+            filename: Filename relative to the source directory
+            filepath: Full path of the file
+            file_type: File extension
+            data: UTF-8 text of the document
+
+        Returns:
+            The document index to pass to ``write``; the document's byte range
+            is recorded in ``documents``
+        """
+        self._texts.write(data)
+        self.documents.append({
+            "filename": filename,
+            "filepath": filepath,
+            "file_type": file_type,
+            "start": self.text_bytes,
+            "end": self.text_bytes + len(data)
+        })
+        self.text_bytes += len(data)
+        return len(self.documents) - 1
+
+    def write(
+        self,
+        doc_ids: Sequence[int],
+        chunk_ids: Sequence[int],
+        starts: Sequence[int],
+        ends: Sequence[int],
+        embeddings: Optional[np.ndarray] = None
+    ) -> None:
+        """Append a batch of chunks.
+
+        Args:
+            doc_ids: Document index of each chunk, from ``add_document``
+            chunk_ids: Index of each chunk within its document
+            starts: Byte offset in the text store where each chunk starts
+            ends: Byte offset in the text store where each chunk ends
+            embeddings: L2-normalized embeddings of the chunks, either a float
+                matrix or ``QuantizedEmbeddings`` copied from another knowledge
+                base; required until ``drop_embeddings`` is called
+
+        Raises:
+            ValueError: If embeddings are missing or have the wrong dimension
+        """
+        if not len(starts):
+            return
+
+        records = np.empty(len(starts), dtype=CHUNK_DTYPE)
+        records["doc_id"] = doc_ids
+        records["chunk_id"] = chunk_ids
+        records["start"] = starts
+        records["end"] = ends
+        self._chunks.write(records.tobytes())
+
+        if self.has_embeddings:
+            if embeddings is None:
+                raise ValueError("Embeddings are required until drop_embeddings() is called")
+            if not isinstance(embeddings, QuantizedEmbeddings):
+                embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            if self.dim is not None and embeddings.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional embeddings, got {embeddings.shape[1]}")
+            self.dim = embeddings.shape[1]
+            if self.stored_dtype is not None:
+                stored = as_stored(embeddings, self.stored_dtype)
+                self._stored.write(np.ascontiguousarray(stored.values).tobytes())
+                if stored.scales is not None:
+                    self._scales.write(np.ascontiguousarray(stored.scales, dtype=np.float32).tobytes())
+                embeddings = stored.full_precision(slice(None)) if self._stages_raw else None
+            if embeddings is not None:
+                self._embeddings.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+
+        self.num_chunks += len(starts)
+
+    def drop_embeddings(self) -> None:
+        """Discard staged embeddings and write the rest of the build without them."""
+        self.has_embeddings = False
+        self.dim = None
+        for f in (self._embeddings, self._stored, self._scales):
+            f.truncate(0)
+            f.seek(0)
+
+    def checkpoint(self, progress: Dict[str, Any]) -> None:
+        """Make the chunks written so far durable and record the caller's progress.
+
+        Args:
+            progress: JSON-serializable state that a resumed build will see as ``progress``
+        """
+        for f in self._staged_files():
+            f.flush()
+            os.fsync(f.fileno())
+        self.progress = progress
+        state = {
+            "params": self.params,
+            "documents": self.documents,
+            "num_chunks": self.num_chunks,
+            "text_bytes": self.text_bytes,
+            "dim": self.dim,
+            "has_embeddings": self.has_embeddings,
+            "progress": progress
+        }
+        write_atomic(os.path.join(self.staging_dir, BUILD_STATE_FILE),
+                      lambda f: f.write(json.dumps(state).encode("utf-8")))
+
+    def finish(self, metadata: Dict[str, Any]) -> ChunkTable:
+        """Move the staged knowledge base into place and build its search indexes.
+
+        Unless ``projection`` was already applied to the staged embeddings,
+        they are reduced as requested by the ``embedding_dim`` and
+        ``embedding_reduction`` metadata fields, then stored at the precision
+        named by ``embedding_dtype``.
+
+        Args:
+            metadata: Metadata to store in metadata.json
+
+        Returns:
+            The finished knowledge base, memory-mapped from disk
+        """
+        for f in self._staged_files():
+            f.close()
+
+        has_embeddings = self.has_embeddings and self.dim is not None
+
+        def staged(name):
+            return os.path.join(self.staging_dir, name)
+
+        def final(name):
+            return os.path.join(self.kb_path_dir, name)
+
+        _write_npy(staged(CHUNKS_FILE), staged(STAGED_CHUNKS_FILE), CHUNK_DTYPE, (self.num_chunks,))
+        embedding_files = []
+        projection = self.projection if has_embeddings else None
+        if has_embeddings:
+            shape = (self.num_chunks, self.dim)
+            raw_path = staged(STAGED_EMBEDDINGS_FILE)
+            dtype, keep_full = _embedding_storage(metadata)
+            transform = None
+            if projection is None and metadata.get("embedding_dim") and self.stored_dtype is None:
+                projection = transform = fit_projection(
+                    _map_raw(raw_path, shape),
+                    metadata.get("embedding_reduction", DEFAULT_PROJECTION_METHOD),
+                    int(metadata["embedding_dim"])
+                )
+
+            if self.stored_dtype is not None:
+                # Already at storage precision, and projected if need be
+                _write_npy(staged(EMBEDDINGS_FILE), staged(STAGED_STORED_FILE), np.dtype(self.stored_dtype), shape)
+                embedding_files.append(EMBEDDINGS_FILE)
+                if self.stored_dtype == "int8":
+                    _write_npy(staged(EMBEDDING_SCALES_FILE), staged(STAGED_SCALES_FILE),
+                               np.dtype(np.float32), (self.num_chunks,))
+                    embedding_files.append(EMBEDDING_SCALES_FILE)
+            elif dtype == "float32" and transform is None:
+                _write_npy(staged(EMBEDDINGS_FILE), raw_path, np.dtype(np.float32), shape)
+                embedding_files.append(EMBEDDINGS_FILE)
+            else:
+                embedding_files += _write_embeddings(self.staging_dir, EMBEDDINGS_FILE, raw_path,
+                                                     shape, dtype, transform)
+            if keep_full:
+                if transform is None:
+                    _write_npy(staged(FULL_EMBEDDINGS_FILE), raw_path, np.dtype(np.float32), shape)
+                else:
+                    _write_embeddings(self.staging_dir, FULL_EMBEDDINGS_FILE, raw_path,
+                                      shape, "float32", transform)
+                embedding_files.append(FULL_EMBEDDINGS_FILE)
+
+        os.replace(staged(TEXTS_FILE), final(TEXTS_FILE))
+        os.replace(staged(CHUNKS_FILE), final(CHUNKS_FILE))
+        write_atomic(final(DOCUMENTS_FILE), lambda f: f.write(json.dumps(self.documents).encode("utf-8")))
+        _remove_files(self.kb_path_dir, EMBEDDING_FILES)
+        for name in embedding_files:
+            os.replace(staged(name), final(name))
+
+        table = load_chunk_table(self.kb_path_dir, load_indexes=False)
+        table.projection = projection
+        table.lexical_index = BM25Index.build(table.contents)
+        table.ann_index = build_ann_index(table.embeddings)
+        _save_indexes_and_metadata(self.kb_path_dir, table, metadata)
+
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        return table
+
+    def abort(self) -> None:
+        """Close the staged files, keeping them for a later resume."""
+        for f in self._staged_files():
+            f.close()
+
+
+def _write_npy(path: str, raw_path: str, dtype: np.dtype, shape: tuple) -> None:
+    """Wrap a file of raw array data in an .npy header without loading it."""
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape}
+    with open(path, "wb") as out, open(raw_path, "rb") as raw:
+        np.lib.format.write_array_header_1_0(out, header)
+        shutil.copyfileobj(raw, out)
+
+
+def _map_raw(raw_path: str, shape: tuple) -> np.ndarray:
+    """Memory-map a file of raw float32 embeddings (zero-length files cannot be mapped)."""
+    if not shape[0]:
+        return np.empty(shape, dtype=np.float32)
+    return np.memmap(raw_path, dtype=np.float32, mode="r", shape=shape)
+
+
+def _write_embeddings(staging_dir: str, name: str, raw_path: str, shape: tuple, dtype: str,
+                      projection: Optional[EmbeddingProjection] = None) -> List[str]:
+    """Convert a file of raw float32 embeddings block by block into an .npy file.
+
+    Each block is projected (if ``projection`` is given) and then quantized
+    to ``dtype``; int8 scales are written to ``embedding_scales.npy``.
+
+    Returns:
+        Names of the files written to ``staging_dir``
+    """
+    raw = _map_raw(raw_path, shape)
+    dim = projection.dim if projection is not None else shape[1]
+    scales = []
+    with open(os.path.join(staging_dir, name), "wb") as out:
+        header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False,
+                  "shape": (shape[0], dim)}
+        np.lib.format.write_array_header_1_0(out, header)
+        for start in range(0, shape[0], _QUANTIZE_BLOCK):
+            block = raw[start:start + _QUANTIZE_BLOCK]
+            if projection is not None:
+                block = projection.transform(block)
+            values, block_scales = quantize(block, dtype)
+            out.write(values.tobytes())
+            if block_scales is not None:
+                scales.append(block_scales)
+    del raw
+
+    if dtype != "int8":
+        return [name]
+    scales = np.concatenate(scales) if scales else np.empty(0, dtype=np.float32)
+    np.save(os.path.join(staging_dir, EMBEDDING_SCALES_FILE), scales)
+    return [name, EMBEDDING_SCALES_FILE]
@@ -0,0 +1,292 @@
+"""Loaded knowledge bases for AskDocs.
+
+A ``KnowledgeBase`` holds everything loaded for one source directory: the
+chunk table (chunk texts, embeddings and search indexes) and the metadata it
+was built with. This module keeps a process-wide registry of them keyed by
+the resolved source directory, so asking about any directory loads its
+knowledge base once rather than on every question.
+
+Each entry remembers the modification time and size of its metadata.json,
+which every save writes last, and is reloaded when it changes on disk, e.g.
+after ``build-kb`` ran in another process. A build that is still replacing
+the other files is therefore never loaded half-written. When the registry
+holds more than ``kb_memory_budget_mb`` of knowledge bases, the least
+recently used ones are dropped.
+
+A knowledge base kept up to date in memory by a ``SourceWatcher`` is
+registered as live: the watcher replaces it as documents change and saves
+it in the background, so it is not reloaded when its files change.
+"""
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ask_docs.config import get_rag_config
+from ask_docs.core import kb_store
+from ask_docs.core.chunk_table import AppendedTextStore, ChunkTable
+from ask_docs.core.document_retrieval import chunk_documents, load_documents, load_knowledge_base
+
+DEFAULT_KB_MEMORY_BUDGET_MB = 1024
+
+# Files that complete a save; their changes invalidate a loaded knowledge base
+_WATCHED_FILES = (kb_store.METADATA_FILE, kb_store.LEGACY_KB_FILE)
+
+# Loaded knowledge bases by resolved source directory, most recently used last
+_registry: "OrderedDict[str, KnowledgeBase]" = OrderedDict()
+# Guards the registry itself
+_registry_lock = threading.Lock()
+# One lock per source directory so that concurrent first requests load it only once
+_loading_locks: Dict[str, threading.Lock] = {}
+
+
+def resolve_source_dir(source_dir: Optional[str] = None) -> str:
+    """Resolve a source directory (or the configured one) to its canonical path."""
+    if source_dir is None:
+        source_dir = get_rag_config()["source_dir"]
+    return os.path.realpath(source_dir)
+
+
+def kb_path_for(source_dir: str) -> str:
+    """Get the knowledge base directory of a source directory."""
+    return os.path.join(source_dir, get_rag_config().get("kb_dir", ".kb"))
+
+
+def kb_signature(kb_path_dir: str) -> Tuple[Tuple[str, int, int], ...]:
+    """Snapshot the modification time and size of the files that complete a knowledge base save."""
+    signature = []
+    for name in _WATCHED_FILES:
+        try:
+            stat = os.stat(os.path.join(kb_path_dir, name))
+        except OSError:
+            continue
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _nbytes(obj: Any) -> int:
+    """Estimate the bytes held by an array, buffer or object of array attributes."""
+    if obj is None:
+        return 0
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, memoryview, mmap.mmap, AppendedTextStore)):
+        return len(obj)
+    return sum(value.nbytes for value in getattr(obj, "__dict__", {}).values()
+               if isinstance(value, np.ndarray))
+
+
+class KnowledgeBase:
+    """The chunks, embeddings, indexes and metadata loaded for one source directory."""
+
+    def __init__(self, source_dir: str, table: ChunkTable, metadata: Optional[Dict[str, Any]] = None,
+                 live: bool = False):
+        """Initialize the knowledge base and snapshot its files on disk.
+
+        Args:
+            source_dir: Resolved source directory
+            table: Loaded chunk table
+            metadata: Contents of metadata.json, or None if the table was not loaded from disk
+            live: Whether the table is kept up to date in memory rather than read from disk
+        """
+        self.source_dir = source_dir
+        self.kb_path_dir = kb_path_for(source_dir)
+        self.table = table
+        self.metadata = metadata or {}
+        self.live = live
+        self.signature = kb_signature(self.kb_path_dir)
+        self.loaded_at = time.time()
+        self.nbytes = self._estimate_nbytes()
+
+    @classmethod
+    def load(cls, source_dir: str) -> "KnowledgeBase":
+        """Load the knowledge base of a source directory, building it if there is none.
+
+        If loading and building both fail, the documents are chunked in
+        memory without embeddings.
+
+        Args:
+            source_dir: Resolved source directory
+
+        Returns:
+            The loaded knowledge base
+        """
+        try:
+            table = load_knowledge_base(source_dir)
+        except Exception:
+            # Fall back to chunking the documents on the fly
+            table = chunk_documents(load_documents(source_dir))
+        return cls(source_dir, table, kb_store.read_metadata(kb_path_for(source_dir)))
+
+    @property
+    def chunks(self) -> ChunkTable:
+        """The chunk table, for passing to the retrieval functions."""
+        return self.table
+
+    @property
+    def embeddings(self) -> Optional[Any]:
+        """The chunk embedding matrix, or None for a lexical-only knowledge base."""
+        return self.table.embeddings
+
+    @property
+    def lexical_index(self) -> Optional[Any]:
+        """The BM25 index over the chunk texts, or None."""
+        return self.table.lexical_index
+
+    @property
+    def ann_index(self) -> Optional[Any]:
+        """The approximate nearest-neighbour index over the embeddings, or None."""
+        return self.table.ann_index
+
+    @property
+    def version(self) -> Optional[str]:
+        """The build the chunk table was saved as."""
+        return self.table.version
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def _estimate_nbytes(self) -> int:
+        """Estimate the memory the knowledge base can occupy.
+
+        Memory-mapped embeddings and texts are counted at their full size,
+        since searching touches every page of them.
+        """
+        table = self.table
+        total = _nbytes(table.text_store) + _nbytes(table)
+        total += _nbytes(table.embeddings) + _nbytes(table.lexical_index) + _nbytes(table.ann_index)
+        if table.projection is not None:
+            total += _nbytes(table.projection)
+        return total
+
+    def is_stale(self) -> bool:
+        """Check whether the knowledge base was saved again since it was loaded (never for live ones)."""
+        return not self.live and kb_signature(self.kb_path_dir) != self.signature
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the loaded knowledge base.
+
+        Returns:
+            Dictionary with ``source_dir``, ``num_chunks``, ``version``,
+            ``memory_mb`` and ``loaded_at``
+        """
+        return {
+            "source_dir": self.source_dir,
+            "num_chunks": len(self.table),
+            "version": self.table.version,
+            "memory_mb": self.nbytes / (1024 * 1024),
+            "loaded_at": self.loaded_at
+        }
+
+
+def _get_memory_budget() -> int:
+    """Get the memory budget for loaded knowledge bases, in bytes."""
+    budget_mb = get_rag_config().get("kb_memory_budget_mb", DEFAULT_KB_MEMORY_BUDGET_MB)
+    return int(float(budget_mb) * 1024 * 1024)
+
+
+def _store(key: str, kb: KnowledgeBase) -> None:
+    """Add a knowledge base to the registry and evict down to the memory budget.
+
+    The caller must hold ``_registry_lock``.
+    """
+    _registry[key] = kb
+    _registry.move_to_end(key)
+    budget = _get_memory_budget()
+    total = sum(entry.nbytes for entry in _registry.values())
+    # The knowledge base just stored is kept even if it alone exceeds the budget
+    while total > budget and len(_registry) > 1:
+        _, evicted = _registry.popitem(last=False)
+        total -= evicted.nbytes
+
+
+def get_knowledge_base(source_dir: Optional[str] = None, reload: bool = False) -> KnowledgeBase:
+    """Get the knowledge base of a source directory, loading it on first use.
+
+    A loaded knowledge base is reused until its files change on disk. Loading
+    is safe to call from several threads at once: only the first caller for a
+    directory loads it, the others wait and then reuse the same instance.
+
+    Args:
+        source_dir: Directory containing the documents, or None for the configured one
+        reload: Load the knowledge base from disk even if it is unchanged
+
+    Returns:
+        The loaded knowledge base
+    """
+    key = resolve_source_dir(source_dir)
+
+    with _registry_lock:
+        kb = _registry.get(key)
+        if kb is not None and not reload and not kb.is_stale():
+            _registry.move_to_end(key)
+            return kb
+        loading_lock = _loading_locks.setdefault(key, threading.Lock())
+
+    with loading_lock:
+        # Another thread may have finished loading while we were waiting
+        with _registry_lock:
+            current = _registry.get(key)
+            if current is not None and current is not kb and not current.is_stale():
+                _registry.move_to_end(key)
+                return current
+
+        kb = KnowledgeBase.load(key)
+
+        with _registry_lock:
+            _store(key, kb)
+
+    return kb
+
+
+def register_knowledge_base(
+    table: ChunkTable,
+    source_dir: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    live: bool = False
+) -> KnowledgeBase:
+    """Register a freshly built chunk table as the knowledge base of a source directory.
+
+    Args:
+        table: The chunk table, as returned by ``build_knowledge_base``
+        source_dir: Directory containing the documents, or None for the configured one
+        metadata: The table's metadata, or None to read metadata.json
+        live: Keep the table until it is registered again, even if the files on disk change
+
+    Returns:
+        The registered knowledge base
+    """
+    key = resolve_source_dir(source_dir)
+    if metadata is None:
+        metadata = kb_store.read_metadata(kb_path_for(key))
+    kb = KnowledgeBase(key, table, metadata, live)
+    with _registry_lock:
+        _store(key, kb)
+    return kb
+
+
+def invalidate_knowledge_base(source_dir: Optional[str] = None) -> bool:
+    """Drop the loaded knowledge base of a source directory.
+
+    Returns:
+        True if a knowledge base was loaded, False otherwise
+    """
+    key = resolve_source_dir(source_dir)
+    with _registry_lock:
+        return _registry.pop(key, None) is not None
+
+
+def clear_knowledge_bases() -> None:
+    """Drop all loaded knowledge bases."""
+    with _registry_lock:
+        _registry.clear()
+
+
+def loaded_knowledge_bases() -> List[Dict[str, Any]]:
+    """Describe the loaded knowledge bases, least recently used first."""
+    with _registry_lock:
+        return [kb.info() for kb in _registry.values()]
@@ -0,0 +1,241 @@
+"""BM25 lexical index for AskDocs.
+
+The index is an inverted index from terms to the chunks that contain them. A
+query is scored only over the postings of its own terms, so lexical search
+cost depends on how common the query terms are rather than on corpus size.
+The index is built alongside the knowledge base and saved in the ``.kb``
+directory.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ask_docs.core.atomic_io import save_json, save_npy
+from ask_docs.core.vector_search import top_k_indices
+
+# Standard BM25 parameters
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+
+VOCAB_FILE = "bm25_vocab.json"
+OFFSETS_FILE = "bm25_offsets.npy"
+DOCS_FILE = "bm25_docs.npy"
+FREQS_FILE = "bm25_freqs.npy"
+LENGTHS_FILE = "bm25_lengths.npy"
+
+INDEX_FILES = (VOCAB_FILE, OFFSETS_FILE, DOCS_FILE, FREQS_FILE, LENGTHS_FILE)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase index terms.
+
+    Trailing plural "s" is folded on longer words ("missiles" matches "missile").
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms in text order
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index with BM25 scoring."""
+
+    def __init__(
+        self,
+        terms: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B
+    ):
+        """Initialize the index.
+
+        Args:
+            terms: Mapping from term to term id
+            offsets: Start of each term's postings in ``doc_ids``/``freqs`` (length terms + 1)
+            doc_ids: Chunk index of each posting, grouped by term
+            freqs: Term frequency of each posting
+            doc_lengths: Number of terms in each chunk
+            k1: BM25 term frequency saturation parameter
+            b: BM25 length normalization parameter
+        """
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.freqs = freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(doc_lengths)
+        self.avg_doc_length = float(doc_lengths.mean()) if self.num_docs else 0.0
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> "BM25Index":
+        """Build an index over a sequence of texts.
+
+        Args:
+            texts: Text of each chunk, in chunk order
+            k1: BM25 term frequency saturation parameter
+            b: BM25 length normalization parameter
+
+        Returns:
+            A new BM25Index
+        """
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, freq))
+
+        terms = {}
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        for term_id, (term, term_postings) in enumerate(postings.items()):
+            terms[term] = term_id
+            offsets[term_id + 1] = offsets[term_id] + len(term_postings)
+
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        freqs = np.empty(offsets[-1], dtype=np.float32)
+        for term_id, term_postings in enumerate(postings.values()):
+            start = offsets[term_id]
+            doc_ids[start:start + len(term_postings)] = [p[0] for p in term_postings]
+            freqs[start:start + len(term_postings)] = [p[1] for p in term_postings]
+
+        return cls(terms, offsets, doc_ids, freqs, np.asarray(doc_lengths, dtype=np.float32), k1, b)
+
+    def update(self, keep: np.ndarray, texts: Iterable[str]) -> "BM25Index":
+        """Get an index without some of the chunks and with new chunks after the rest.
+
+        Postings of the kept chunks are renumbered rather than tokenized again,
+        so only the new texts are read.
+
+        Args:
+            keep: Boolean mask over the indexed chunks of those to keep
+            texts: Text of each new chunk, numbered after the kept chunks
+
+        Returns:
+            A new BM25Index, equivalent to one built over the kept and new texts
+        """
+        keep = np.asarray(keep, dtype=bool)
+        row_map = np.cumsum(keep) - 1
+        old_docs = np.asarray(self.doc_ids)
+        old_terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        kept = keep[old_docs]
+
+        added = BM25Index.build(texts, self.k1, self.b)
+        terms = dict(self.terms)
+        added_ids = np.empty(len(added.terms), dtype=np.int64)
+        for term, term_id in added.terms.items():
+            added_ids[term_id] = terms.setdefault(term, len(terms))
+        added_terms = added_ids[np.repeat(np.arange(len(added.terms)), np.diff(added.offsets))]
+
+        term_ids = np.concatenate([old_terms[kept], added_terms])
+        doc_ids = np.concatenate([row_map[old_docs[kept]], added.doc_ids + int(keep.sum())])
+        freqs = np.concatenate([np.asarray(self.freqs)[kept], added.freqs])
+        # Group postings by term, keeping them in chunk order within each term
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(term_ids, minlength=len(terms)))
+        doc_lengths = np.concatenate([np.asarray(self.doc_lengths)[keep], added.doc_lengths])
+        return BM25Index(terms, offsets, doc_ids[order].astype(np.int32), freqs[order].astype(np.float32),
+                         doc_lengths.astype(np.float32), self.k1, self.b)
+
+    def search(self, query: str, top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Score chunks against a query.
+
+        Only chunks that contain at least one query term are scored.
+
+        Args:
+            query: Query text
+            top_n: Maximum number of results
+
+        Returns:
+            Tuple of (chunk indices, scores), best first
+        """
+        doc_parts = []
+        score_parts = []
+        for term in set(tokenize(query)):
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = np.asarray(self.doc_ids[start:end])
+            freqs = np.asarray(self.freqs[start:end])
+            df = end - start
+            idf = math.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[docs] / max(self.avg_doc_length, 1e-9))
+            doc_parts.append(docs)
+            score_parts.append(idf * freqs * (self.k1 + 1.0) / (freqs + norm))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidates, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        best = top_k_indices(scores, top_n)
+        return candidates[best].astype(np.int64), scores[best]
+
+    def save(self, kb_path_dir: str) -> None:
+        """Save the index to a knowledge base directory.
+
+        Each file is replaced atomically, so an index loaded from the
+        previous files keeps reading them.
+
+        Args:
+            kb_path_dir: Knowledge base directory
+        """
+        os.makedirs(kb_path_dir, exist_ok=True)
+        for name, array in ((OFFSETS_FILE, self.offsets), (DOCS_FILE, self.doc_ids),
+                            (FREQS_FILE, self.freqs), (LENGTHS_FILE, self.doc_lengths)):
+            save_npy(os.path.join(kb_path_dir, name), array)
+
+        terms = sorted(self.terms, key=self.terms.get)
+        save_json(os.path.join(kb_path_dir, VOCAB_FILE), {"k1": self.k1, "b": self.b, "terms": terms})
+
+    @classmethod
+    def load(cls, kb_path_dir: str) -> Optional["BM25Index"]:
+        """Load an index from a knowledge base directory.
+
+        Postings are memory-mapped; only the vocabulary is read into memory.
+
+        Args:
+            kb_path_dir: Knowledge base directory
+
+        Returns:
+            The loaded index, or None if the directory has no index
+        """
+        if not all(os.path.exists(os.path.join(kb_path_dir, name)) for name in INDEX_FILES):
+            return None
+
+        with open(os.path.join(kb_path_dir, VOCAB_FILE), "r") as f:
+            vocab = json.load(f)
+
+        arrays = []
+        for name in (OFFSETS_FILE, DOCS_FILE, FREQS_FILE, LENGTHS_FILE):
+            path = os.path.join(kb_path_dir, name)
+            try:
+                arrays.append(np.load(path, mmap_mode="r"))
+            except ValueError:
+                # Zero-length arrays cannot be memory-mapped
+                arrays.append(np.load(path))
+
+        terms = {term: term_id for term_id, term in enumerate(vocab["terms"])}
+        return cls(terms, *arrays, k1=vocab.get("k1", DEFAULT_K1), b=vocab.get("b", DEFAULT_B))
@@ -0,0 +1,156 @@
+"""Dimensionality reduction of AskDocs chunk embeddings.
+
+A projection maps model embeddings to fewer dimensions before they are stored:
+
+- ``pca``: the principal components of a sample of the chunk embeddings
+- ``truncate``: the leading dimensions, for Matryoshka-trained models whose
+  embedding prefixes are embeddings in their own right
+
+The projection is saved with the knowledge base (``projection.npz``) and
+applied to query embeddings at search time. When it is fitted, its recall
+against the full embeddings is measured on a held-out sample of chunks.
+"""
+import json
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ask_docs.core.atomic_io import write_atomic
+from ask_docs.core.vector_search import normalize_rows
+
+PROJECTION_FILE = "projection.npz"
+PROJECTION_METHODS = ("pca", "truncate")
+DEFAULT_PROJECTION_METHOD = "pca"
+
+# Rows used to fit PCA
+_FIT_SAMPLE = 20000
+# Held-out queries, corpus size and cut-off used to measure recall
+_RECALL_QUERIES = 200
+_RECALL_CORPUS = 10000
+_RECALL_K = 10
+
+
+class EmbeddingProjection:
+    """Linear projection of normalized embeddings onto fewer dimensions."""
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, info: Dict[str, Any]):
+        """Initialize the projection.
+
+        Args:
+            mean: Vector subtracted before projecting, shape (input_dim,)
+            components: Projection matrix, shape (dim, input_dim)
+            info: Method, dimensions and measured recall, as stored in metadata.json
+        """
+        self.mean = mean
+        self.components = components
+        self.info = info
+
+    @property
+    def dim(self) -> int:
+        """Number of dimensions after projection."""
+        return self.components.shape[0]
+
+    @property
+    def input_dim(self) -> int:
+        """Number of dimensions of the model embeddings."""
+        return self.components.shape[1]
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        """Project embeddings (a matrix or a single vector) and L2-normalize the result."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        return normalize_rows((embeddings - self.mean) @ self.components.T)
+
+    def save(self, kb_path_dir: str) -> None:
+        """Atomically save the projection to a knowledge base directory."""
+        write_atomic(os.path.join(kb_path_dir, PROJECTION_FILE), lambda f: np.savez(
+            f, mean=self.mean, components=self.components, info=json.dumps(self.info)))
+
+    @classmethod
+    def load(cls, kb_path_dir: str) -> Optional["EmbeddingProjection"]:
+        """Load the projection saved in a knowledge base directory, or None if there is none."""
+        path = os.path.join(kb_path_dir, PROJECTION_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"], json.loads(str(data["info"])))
+
+
+def fit_projection(embeddings: np.ndarray, method: str, dim: int,
+                   seed: int = 0) -> Optional[EmbeddingProjection]:
+    """Fit a projection of an embedding matrix and measure its recall.
+
+    A random sample of rows is held out of fitting and used as queries to
+    compare top-k results before and after projection.
+
+    Args:
+        embeddings: L2-normalized embedding matrix, shape (n, input_dim); may be memory-mapped
+        method: One of ``PROJECTION_METHODS``
+        dim: Number of dimensions to keep
+        seed: Random seed for sampling
+
+    Returns:
+        The fitted projection, or None if ``dim`` would not reduce the embeddings
+
+    Raises:
+        ValueError: If the method is not supported
+    """
+    if method not in PROJECTION_METHODS:
+        raise ValueError(f"Unsupported projection method: {method}. "
+                         f"Choose from: {', '.join(PROJECTION_METHODS)}")
+    n, input_dim = embeddings.shape
+    if dim <= 0 or dim >= input_dim or n == 0:
+        return None
+
+    rng = np.random.default_rng(seed)
+    ids = rng.permutation(n)
+    held_out = np.sort(ids[:min(_RECALL_QUERIES, n // 10)])
+    rest = np.sort(ids[len(held_out):])
+
+    if method == "pca":
+        fit_ids = rest
+        if len(rest) > _FIT_SAMPLE:
+            fit_ids = np.sort(rng.choice(rest, _FIT_SAMPLE, replace=False))
+        sample = np.asarray(embeddings[fit_ids], dtype=np.float32)
+        mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        components = vt[:dim]
+    else:
+        mean = np.zeros(input_dim, dtype=np.float32)
+        components = np.eye(input_dim, dtype=np.float32)[:dim]
+
+    info = {"method": method, "input_dim": int(input_dim), "dim": int(components.shape[0])}
+    projection = EmbeddingProjection(mean.astype(np.float32), components.astype(np.float32), info)
+    info.update(measure_recall(embeddings, projection, held_out, rest, rng))
+    return projection
+
+
+def measure_recall(embeddings: np.ndarray, projection: EmbeddingProjection, query_ids: np.ndarray,
+                   corpus_ids: np.ndarray, rng: np.random.Generator) -> Dict[str, Any]:
+    """Measure how many of each query's top-k neighbours survive the projection.
+
+    Args:
+        embeddings: L2-normalized embedding matrix
+        projection: Projection to evaluate
+        query_ids: Rows used as queries
+        corpus_ids: Rows searched (a sample is taken if there are many)
+        rng: Random generator for sampling the corpus
+
+    Returns:
+        Dictionary with ``recall_at_k`` (None if there were no queries),
+        ``recall_k`` and ``recall_queries``
+    """
+    if len(corpus_ids) > _RECALL_CORPUS:
+        corpus_ids = np.sort(rng.choice(corpus_ids, _RECALL_CORPUS, replace=False))
+    k = min(_RECALL_K, len(corpus_ids))
+    result = {"recall_at_k": None, "recall_k": k, "recall_queries": int(len(query_ids))}
+    if len(query_ids) == 0 or k == 0:
+        return result
+
+    corpus = normalize_rows(np.asarray(embeddings[corpus_ids]))
+    queries = normalize_rows(np.asarray(embeddings[query_ids]))
+    exact = np.argpartition(-(queries @ corpus.T), k - 1, axis=1)[:, :k]
+    approx = np.argpartition(-(projection.transform(queries) @ projection.transform(corpus).T), k - 1, axis=1)[:, :k]
+    hits = [len(np.intersect1d(e, a)) for e, a in zip(exact, approx)]
+    result["recall_at_k"] = float(np.mean(hits) / k)
+    return result
@@ -0,0 +1,202 @@
+"""Reduced-precision storage for AskDocs chunk embeddings.
+
+Saved knowledge bases can store their L2-normalized embeddings as:
+
+- ``float32``: full precision, 4 bytes per dimension
+- ``float16``: half precision, 2 bytes per dimension
+- ``int8``: symmetric scalar quantization with one float32 scale per row,
+  1 byte per dimension
+
+``QuantizedEmbeddings`` wraps a stored matrix so it can be used wherever a
+float32 embedding matrix is expected: indexing returns dequantized float32
+rows and ``@`` scores a query block by block, so the whole matrix is never
+converted at once. When a full-precision copy is kept, the best candidates
+of the quantized search can be rescored exactly (see ``rescore``).
+"""
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from ask_docs.core.vector_search import top_k_indices
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+DEFAULT_EMBEDDING_DTYPE = "float32"
+
+# Rows dequantized at a time when scoring a query
+_SCORE_BLOCK = 65536
+
+
+def quantize(embeddings: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Convert a normalized embedding matrix to a storage precision.
+
+    Args:
+        embeddings: Float matrix of shape (n, dim)
+        dtype: One of ``EMBEDDING_DTYPES``
+
+    Returns:
+        Tuple of (stored values, per-row float32 scales); scales are only
+        returned for int8 and are None otherwise
+
+    Raises:
+        ValueError: If the dtype is not supported
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == "float32":
+        return np.ascontiguousarray(embeddings), None
+    if dtype == "float16":
+        return embeddings.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127.0 if embeddings.size else np.ones(len(embeddings))
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+
+class QuantizedEmbeddings:
+    """Embedding matrix stored at reduced precision, read as float32."""
+
+    # Rows behave like the float32 matrix they stand in for
+    dtype = np.dtype(np.float32)
+    ndim = 2
+
+    def __init__(self, values: np.ndarray, scales: Optional[np.ndarray] = None,
+                 full: Optional[np.ndarray] = None):
+        """Initialize the matrix.
+
+        Args:
+            values: Stored float16 or int8 values, shape (n, dim); may be memory-mapped
+            scales: Per-row scales for int8 values, or None
+            full: Optional float32 copy of the original embeddings used for rescoring
+        """
+        self.values = values
+        self.scales = scales
+        self.full = full
+
+    @property
+    def storage_dtype(self) -> str:
+        """Name of the stored precision, e.g. "int8"."""
+        return self.values.dtype.name
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the quantized values and scales (not the full-precision copy)."""
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        rows = np.asarray(self.values[key], dtype=np.float32)
+        if self.scales is not None:
+            scales = np.asarray(self.scales[key], dtype=np.float32)
+            rows = rows * (scales[..., None] if rows.ndim == 2 else scales)
+        return rows
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for start in range(0, len(self), _SCORE_BLOCK):
+            yield from self[start:start + _SCORE_BLOCK]
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        matrix = self[:]
+        return matrix if dtype is None else matrix.astype(dtype)
+
+    def __matmul__(self, query: np.ndarray) -> np.ndarray:
+        """Score every row against a query vector (or query columns), dequantizing one block at a time."""
+        scores = np.empty((len(self),) + np.shape(query)[1:], dtype=np.float32)
+        for start in range(0, len(self), _SCORE_BLOCK):
+            block = slice(start, start + _SCORE_BLOCK)
+            scores[block] = np.asarray(self.values[block], dtype=np.float32) @ query
+            if self.scales is not None:
+                scales = self.scales[block]
+                scores[block] *= scales if scores.ndim == 1 else scales[:, None]
+        return scores
+
+    def take(self, key: Any) -> "QuantizedEmbeddings":
+        """Get a subset of rows, still at their stored precision."""
+        return QuantizedEmbeddings(
+            np.asarray(self.values[key]),
+            None if self.scales is None else np.asarray(self.scales[key], dtype=np.float32),
+            None if self.full is None else np.asarray(self.full[key], dtype=np.float32)
+        )
+
+    @classmethod
+    def concatenate(cls, blocks: Iterable["QuantizedEmbeddings"]) -> "QuantizedEmbeddings":
+        """Join blocks of rows stored at the same precision.
+
+        The result only has a full-precision copy if every block has one.
+        """
+        blocks = list(blocks)
+        scales = None
+        if blocks[0].scales is not None:
+            scales = np.concatenate([block.scales for block in blocks])
+        full = None
+        if all(block.full is not None for block in blocks):
+            full = np.concatenate([block.full for block in blocks])
+        return cls(np.concatenate([block.values for block in blocks]), scales, full)
+
+    def full_precision(self, key: Any) -> np.ndarray:
+        """Get rows from the full-precision copy, or dequantized rows if there is none."""
+        if self.full is None:
+            return self[key]
+        return np.asarray(self.full[key], dtype=np.float32)
+
+    def rescore(self, query: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-rank candidate rows by their full-precision similarity to a query.
+
+        Args:
+            query: Normalized query embedding
+            candidates: Row indices found by the quantized search
+            k: Number of results to keep
+
+        Returns:
+            Tuple of (row indices, scores), best first
+        """
+        candidates = np.asarray(candidates, dtype=np.int64)
+        if candidates.size == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+        order = np.argsort(candidates)
+        scores = np.empty(len(candidates), dtype=np.float32)
+        # Sorted reads are kinder to a memory-mapped copy
+        scores[order] = self.full_precision(candidates[order]) @ query
+        best = top_k_indices(scores, k)
+        return candidates[best], scores[best]
+
+
+def full_precision_rows(embeddings: Any, key: Any) -> np.ndarray:
+    """Get embedding rows at the best precision available, for plain or quantized matrices."""
+    if isinstance(embeddings, QuantizedEmbeddings):
+        return embeddings.full_precision(key)
+    return np.asarray(embeddings[key], dtype=np.float32)
+
+
+def embedding_rows(embeddings: Any, key: Any) -> Any:
+    """Get embedding rows, keeping the rows of a quantized matrix at their stored precision."""
+    if isinstance(embeddings, QuantizedEmbeddings):
+        return embeddings.take(key)
+    return np.asarray(embeddings[key], dtype=np.float32)
+
+
+def as_stored(embeddings: Any, dtype: str) -> QuantizedEmbeddings:
+    """Get embedding rows at a storage precision.
+
+    Rows already stored at ``dtype`` are returned as they are rather than
+    dequantized and quantized again; other rows are quantized and keep their
+    float32 values as the full-precision copy.
+
+    Args:
+        embeddings: Float matrix or ``QuantizedEmbeddings``
+        dtype: ``float16`` or ``int8``
+
+    Returns:
+        The rows as ``QuantizedEmbeddings``
+    """
+    if isinstance(embeddings, QuantizedEmbeddings) and embeddings.storage_dtype == dtype:
+        return embeddings
+    full = full_precision_rows(embeddings, slice(None))
+    values, scales = quantize(full, dtype)
+    return QuantizedEmbeddings(values, scales, full)
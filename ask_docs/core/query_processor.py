@@ -1,43 +1,112 @@
 """Query processor for AskDocs."""
+import asyncio
 import os
 import json
 import time
-from typing import List, Tuple, Dict, Any, Optional
+import functools
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Tuple, Dict, Any, Optional
 
 from ask_docs.llm import get_llm
+from ask_docs.llm.response_cache import cached_ask, cached_ask_async, cached_stream, cached_stream_async
+from ask_docs.core import kb_store, knowledge_base
+from ask_docs.core.chunk_table import ChunkTable
 from ask_docs.core.document_retrieval import (
-    load_documents,
     get_best_chunks,
+    get_best_chunks_many,
     build_knowledge_base,
-    load_knowledge_base
+    list_documents
 )
 from ask_docs.core.prompt_builder import build_prompt, build_evaluation_prompt
-from ask_docs.config import get_default_model, get_source_dir, get_rag_config
+from ask_docs.config import get_config, get_default_model, get_model_config, get_source_dir, get_rag_config
 
-# Knowledge base cache to avoid reloading for multiple queries
-_knowledge_base_cache = None
-
-def get_knowledge_base(rebuild: bool = False) -> List[Dict[str, Any]]:
+def get_knowledge_base(rebuild: bool = False, source_dir: Optional[str] = None) -> ChunkTable:
     """Get the knowledge base, loading or building it if necessary.
     
+    Loaded knowledge bases are kept per source directory and reloaded when
+    their files change on disk (see ``ask_docs.core.knowledge_base``).
+    
     Args:
-        rebuild: Force rebuilding the knowledge base
+        rebuild: Force reloading the knowledge base from disk
+        source_dir: Override the source directory
         
     Returns:
-        The knowledge base as a list of document chunks
+        The knowledge base as a table of document chunks
     """
-    global _knowledge_base_cache
-    
-    if _knowledge_base_cache is None or rebuild:
-        try:
-            # Try to load pre-built knowledge base first
-            _knowledge_base_cache = load_knowledge_base()
-        except Exception:
-            # Fall back to building on the fly
-            docs = load_documents()
-            _knowledge_base_cache = get_best_chunks(docs, "")  # Empty query to just chunk documents
-    
-    return _knowledge_base_cache
+    return knowledge_base.get_knowledge_base(source_dir, reload=rebuild).table
+
+def _retrieve(
+    question: str,
+    rebuild_kb: bool = False,
+    template_name: Optional[str] = None,
+    source_dir: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], str]:
+    """Find the best chunks for a question and build the prompt.
+    
+    Returns:
+        Tuple of (chunks, prompt)
+    """
+    kb = get_knowledge_base(rebuild_kb, source_dir)
+    
+    # Get best chunks for this question
+    chunks = get_best_chunks(kb, question)
+    
+    # Build prompt with the best chunks
+    prompt = build_prompt(chunks, question, template_name)
+    return chunks, prompt
+
+async def _retrieve_async(
+    question: str,
+    rebuild_kb: bool = False,
+    template_name: Optional[str] = None,
+    source_dir: Optional[str] = None,
+    executor: Optional[Executor] = None
+) -> Tuple[List[Dict[str, Any]], str]:
+    """Run ``_retrieve`` on an executor, or in a worker thread if none is given."""
+    if executor is None:
+        return await asyncio.to_thread(_retrieve, question, rebuild_kb, template_name, source_dir)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(_retrieve, question, rebuild_kb, template_name, source_dir))
+
+def _snippet(content: str) -> str:
+    """Shorten chunk content for display."""
+    return content[:200] + ("..." if len(content) > 200 else "")
+
+def _match(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe a retrieved chunk for display, with its score when retrieval produced one."""
+    match = {"filename": chunk["filename"], "snippet": _snippet(chunk["content"])}
+    if "similarity" in chunk:
+        match["similarity"] = float(chunk["similarity"])
+    return match
+
+def _make_result(answer: str, model: str, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assemble the result dictionary returned by ``ask_question``."""
+    return {
+        "answer": answer,
+        "model": model,
+        "num_chunks": len(chunks),
+        "chunks": [_match(c) for c in chunks]
+    }
+
+def _parse_evaluation(eval_result: str) -> Dict[str, Any]:
+    """Parse the LLM's answer to the evaluation prompt."""
+    # Try to parse JSON response
+    try:
+        # Extract JSON part of the response
+        json_str = eval_result
+        if "```json" in eval_result:
+            json_str = eval_result.split("```json")[1].split("```")[0].strip()
+        elif "```" in eval_result:
+            json_str = eval_result.split("```")[1].strip()
+            
+        return json.loads(json_str)
+    except (json.JSONDecodeError, IndexError):
+        # If JSON parsing fails, include the raw evaluation
+        return {
+            "raw": eval_result,
+            "error": "Failed to parse evaluation as JSON"
+        }
 
 def ask_question(
     question: str, 
@@ -45,7 +114,9 @@ def ask_question(
     rebuild_kb: bool = False,
     template_name: Optional[str] = None,
     evaluate: bool = False,
-    source_dir: Optional[str] = None
+    source_dir: Optional[str] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    use_cache: bool = True
 ) -> Dict[str, Any]:
     """Ask a question using the document knowledge base.
     
@@ -56,74 +127,240 @@ def ask_question(
         template_name: Which prompt template to use
         evaluate: Whether to evaluate confidence and relevance
         source_dir: Override the source directory
+        on_token: If given, the answer is streamed from the LLM and this is
+            called with each piece as it arrives
+        use_cache: Whether to answer repeated prompts from the response cache
         
     Returns:
-        Dictionary with answer and optionally evaluation metrics
+        Dictionary with the answer, the model, the chunks the prompt was built
+        from (filename, snippet and, for semantic or hybrid retrieval, their
+        "similarity" score) and optionally evaluation metrics
     """
     # Use default model if not specified
     if model is None:
         model = get_default_model()
     
-    # Get knowledge base
-    global _knowledge_base_cache
-    if source_dir is not None:
-        # If source directory is specified, load from there
-        kb = load_knowledge_base(source_dir)
-    else:
-        # Otherwise use cached knowledge base
-        kb = get_knowledge_base(rebuild=rebuild_kb)
-    
-    # Get best chunks for this question
-    chunks = get_best_chunks(kb, question)
-    
-    # Build prompt with the best chunks
-    prompt = build_prompt(chunks, question, template_name)
+    chunks, prompt = _retrieve(question, rebuild_kb, template_name, source_dir)
     
     # Get LLM and ask the question
     llm = get_llm(model)
-    answer = llm.ask(prompt)
+    if on_token is None:
+        answer = cached_ask(llm, prompt, use_cache)
+    else:
+        pieces = []
+        for piece in cached_stream(llm, prompt, use_cache):
+            on_token(piece)
+            pieces.append(piece)
+        answer = "".join(pieces)
     
     # Prepare result
-    result = {
-        "answer": answer,
-        "model": model,
-        "num_chunks": len(chunks),
-        "chunks": [
-            {"filename": c["filename"], "snippet": c["content"][:200] + "..."} 
-            for c in chunks
-        ]
-    }
+    result = _make_result(answer, model, chunks)
     
     # Evaluate answer if requested
     if evaluate:
         # Use the same LLM to evaluate the answer
         eval_prompt = build_evaluation_prompt(question, answer, chunks)
-        eval_result = llm.ask(eval_prompt)
+        result["evaluation"] = _parse_evaluation(cached_ask(llm, eval_prompt, use_cache))
+    
+    return result
+
+def stream_question(
+    question: str, 
+    model: Optional[str] = None,
+    rebuild_kb: bool = False,
+    template_name: Optional[str] = None,
+    source_dir: Optional[str] = None,
+    use_cache: bool = True
+) -> Iterator[str]:
+    """Ask a question and yield the answer as the LLM generates it.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use
+        rebuild_kb: Whether to rebuild the knowledge base
+        template_name: Which prompt template to use
+        source_dir: Override the source directory
+        use_cache: Whether to answer repeated prompts from the response cache
+        
+    Yields:
+        Pieces of the answer, in order
+    """
+    if model is None:
+        model = get_default_model()
+    
+    _, prompt = _retrieve(question, rebuild_kb, template_name, source_dir)
+    yield from cached_stream(get_llm(model), prompt, use_cache)
+
+async def ask_question_async(
+    question: str, 
+    model: Optional[str] = None,
+    rebuild_kb: bool = False,
+    template_name: Optional[str] = None,
+    evaluate: bool = False,
+    source_dir: Optional[str] = None,
+    use_cache: bool = True,
+    executor: Optional[Executor] = None
+) -> Dict[str, Any]:
+    """Ask a question without blocking the event loop.
+    
+    Retrieval runs in a worker thread, since loading the knowledge base and
+    embedding the question are CPU- and disk-bound; the LLM is called through
+    its async client, so many questions can be in flight on one event loop.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use
+        rebuild_kb: Whether to rebuild the knowledge base
+        template_name: Which prompt template to use
+        evaluate: Whether to evaluate confidence and relevance
+        source_dir: Override the source directory
+        use_cache: Whether to answer repeated prompts from the response cache
+        executor: Bounded pool to run retrieval on, or None for a default worker thread
+        
+    Returns:
+        Dictionary with answer and optionally evaluation metrics, as ``ask_question``
+    """
+    if model is None:
+        model = get_default_model()
+    
+    chunks, prompt = await _retrieve_async(question, rebuild_kb, template_name, source_dir, executor)
+    
+    llm = get_llm(model)
+    answer = await cached_ask_async(llm, prompt, use_cache)
+    
+    result = _make_result(answer, model, chunks)
+    
+    if evaluate:
+        eval_prompt = build_evaluation_prompt(question, answer, chunks)
+        result["evaluation"] = _parse_evaluation(await cached_ask_async(llm, eval_prompt, use_cache))
+    
+    return result
+
+async def stream_question_async(
+    question: str, 
+    model: Optional[str] = None,
+    rebuild_kb: bool = False,
+    template_name: Optional[str] = None,
+    source_dir: Optional[str] = None,
+    use_cache: bool = True,
+    executor: Optional[Executor] = None
+) -> AsyncIterator[str]:
+    """Ask a question and yield the answer as the LLM generates it, without blocking the event loop.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use
+        rebuild_kb: Whether to rebuild the knowledge base
+        template_name: Which prompt template to use
+        source_dir: Override the source directory
+        use_cache: Whether to answer repeated prompts from the response cache
+        executor: Bounded pool to run retrieval on, or None for a default worker thread
         
-        # Try to parse JSON response
-        try:
-            # Extract JSON part of the response
-            json_str = eval_result
-            if "```json" in eval_result:
-                json_str = eval_result.split("```json")[1].split("```")[0].strip()
-            elif "```" in eval_result:
-                json_str = eval_result.split("```")[1].strip()
-                
-            evaluation = json.loads(json_str)
-            result["evaluation"] = evaluation
-        except (json.JSONDecodeError, IndexError):
-            # If JSON parsing fails, include the raw evaluation
-            result["evaluation"] = {
-                "raw": eval_result,
-                "error": "Failed to parse evaluation as JSON"
-            }
+    Yields:
+        Pieces of the answer, in order
+    """
+    if model is None:
+        model = get_default_model()
+    
+    _, prompt = await _retrieve_async(question, rebuild_kb, template_name, source_dir, executor)
+    async for piece in cached_stream_async(get_llm(model), prompt, use_cache):
+        yield piece
+
+def get_max_concurrency(model: str) -> int:
+    """Get how many requests may be sent to a provider at once in batch runs.
     
+    Args:
+        model: The LLM provider
+        
+    Returns:
+        The provider's ``max_concurrency``, or the ``llm`` section's default
+    """
+    default = get_config()["llm"].get("max_concurrency", 4)
+    return max(1, int(get_model_config(model).get("max_concurrency", default)))
+
+def _answer_one(llm: Any, model: str, index: int, question: str, prompt: str,
+                chunks: List[Dict[str, Any]], use_cache: bool) -> Dict[str, Any]:
+    """Ask the LLM one question of a batch and build its result."""
+    try:
+        answer = cached_ask(llm, prompt, use_cache)
+    except Exception as e:
+        # One failed question must not abort the rest of the batch
+        answer = f"Error: {str(e)}"
+    result = _make_result(answer, model, chunks)
+    result.update({"index": index, "question": question})
     return result
 
+def ask_many(
+    questions: Iterable[str], 
+    model: Optional[str] = None,
+    template_name: Optional[str] = None,
+    source_dir: Optional[str] = None,
+    use_cache: bool = True,
+    max_concurrency: Optional[int] = None,
+    batch_size: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Answer many questions, yielding each result as soon as it is ready.
+    
+    Questions are retrieved ``batch_size`` at a time with
+    ``get_best_chunks_many`` (one embedding batch and one matrix product per
+    batch), and their LLM calls run on up to ``max_concurrency`` threads while
+    the next batch is retrieved. Results therefore arrive out of order; each
+    carries the ``index`` of its question.
+    
+    Args:
+        questions: The questions to ask
+        model: The LLM model to use
+        template_name: Which prompt template to use
+        source_dir: Override the source directory
+        use_cache: Whether to answer repeated prompts from the response cache
+        max_concurrency: Concurrent LLM requests, or None for the provider's ``max_concurrency``
+        batch_size: Questions retrieved together, or None for ``query_batch_size``
+        
+    Yields:
+        Result dictionaries as returned by ``ask_question``, plus ``index`` and ``question``
+    """
+    if model is None:
+        model = get_default_model()
+    questions = list(questions)
+    if max_concurrency is None:
+        max_concurrency = get_max_concurrency(model)
+    if batch_size is None:
+        batch_size = int(get_rag_config().get("query_batch_size", 64))
+    batch_size = max(1, batch_size)
+    
+    kb = get_knowledge_base(source_dir=source_dir)
+    llm = get_llm(model)
+    
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    pending = set()
+    try:
+        for start in range(0, len(questions), batch_size):
+            batch = questions[start:start + batch_size]
+            for offset, chunks in enumerate(get_best_chunks_many(kb, batch)):
+                prompt = build_prompt(chunks, batch[offset], template_name)
+                pending.add(executor.submit(
+                    _answer_one, llm, model, start + offset, batch[offset], prompt, chunks, use_cache
+                ))
+            
+            # Hand back whatever finished while this batch was retrieved
+            done = {future for future in pending if future.done()}
+            pending -= done
+            for future in done:
+                yield future.result()
+        
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # Stop queued questions if the caller stops iterating early
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def preview_matches(
     question: str, 
     top_n: int = 4, 
-    source_dir: Optional[str] = None
+    source_dir: Optional[str] = None,
+    mode: Optional[str] = None
 ) -> List[Tuple[str, str]]:
     """Preview the top matching documents for a question.
     
@@ -131,26 +368,35 @@ def preview_matches(
         question: The question to match against
         top_n: Number of top matches to return
         source_dir: Override the source directory
+        mode: Retrieval mode (semantic, lexical or hybrid), or None for the configured mode
         
     Returns:
         List of (filename, snippet) tuples
     """
-    # Get knowledge base
-    if source_dir is not None:
-        # If source directory is specified, load from there
-        kb = load_knowledge_base(source_dir)
-    else:
-        # Otherwise use cached knowledge base
-        kb = get_knowledge_base()
-    
-    # Get best chunks for this question
-    chunks = get_best_chunks(kb, question, top_n)
+    chunks = get_matches(question, top_n, source_dir, mode)
     
     # Format the results
-    return [
-        (c["filename"], c["content"][:200] + ("..." if len(c["content"]) > 200 else "")) 
-        for c in chunks
-    ]
+    return [(c["filename"], _snippet(c["content"])) for c in chunks]
+
+def get_matches(
+    question: str, 
+    top_n: int = 4, 
+    source_dir: Optional[str] = None,
+    mode: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Get the top matching chunks for a question from the in-memory knowledge base.
+    
+    Args:
+        question: The question to match against
+        top_n: Number of top matches to return
+        source_dir: Override the source directory
+        mode: Retrieval mode (semantic, lexical or hybrid), or None for the configured mode
+        
+    Returns:
+        List of chunk dictionaries (filename, content, chunk_id, ...), each
+        with a "similarity" score when semantic or hybrid search was used
+    """
+    return get_best_chunks(get_knowledge_base(source_dir=source_dir), question, top_n, mode=mode)
 
 def build_or_rebuild_kb(
     save_embeddings: bool = True, 
@@ -158,7 +404,9 @@ def build_or_rebuild_kb(
     chunk_overlap: Optional[int] = None,
     embedding_model: Optional[str] = None,
     force: bool = False,
-    source_dir: Optional[str] = None
+    source_dir: Optional[str] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    jobs: Optional[int] = None
 ) -> int:
     """Build or rebuild the knowledge base.
     
@@ -172,15 +420,12 @@ def build_or_rebuild_kb(
         embedding_model: Name of the embedding model to use
         force: Force rebuild even if no changes detected
         source_dir: Override the source directory
+        progress: Called with (files processed, total files) as the build advances
+        jobs: Number of embedding processes, or None for the configured ``embedding_jobs``
         
     Returns:
         Number of chunks in the knowledge base
     """
-    global _knowledge_base_cache
-    
-    # Force rebuild
-    _knowledge_base_cache = None
-    
     # Build knowledge base with embeddings if available
     kb = build_knowledge_base(
         source_dir=source_dir,
@@ -188,11 +433,13 @@ def build_or_rebuild_kb(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         embedding_model=embedding_model,
-        force=force
+        force=force,
+        progress=progress,
+        jobs=jobs
     )
     
-    # Update cache
-    _knowledge_base_cache = kb
+    # Serve the new build without reloading it from disk
+    knowledge_base.register_knowledge_base(kb, source_dir)
     
     return len(kb)
 
@@ -200,7 +447,8 @@ def process_query(
     question: str, 
     model: Optional[str] = None,
     template_name: Optional[str] = None,
-    source_dir: Optional[str] = None
+    source_dir: Optional[str] = None,
+    use_cache: bool = True
 ) -> str:
     """Process a query and return the answer.
     
@@ -211,6 +459,7 @@ def process_query(
         model: The LLM model to use
         template_name: Which prompt template to use
         source_dir: Override the source directory
+        use_cache: Whether to answer repeated prompts from the response cache
         
     Returns:
         The answer as a string
@@ -219,7 +468,37 @@ def process_query(
         question=question,
         model=model,
         template_name=template_name,
-        source_dir=source_dir
+        source_dir=source_dir,
+        use_cache=use_cache
+    )
+    
+    return result["answer"]
+
+async def process_query_async(
+    question: str, 
+    model: Optional[str] = None,
+    template_name: Optional[str] = None,
+    source_dir: Optional[str] = None,
+    use_cache: bool = True
+) -> str:
+    """Process a query without blocking the event loop and return the answer.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use
+        template_name: Which prompt template to use
+        source_dir: Override the source directory
+        use_cache: Whether to answer repeated prompts from the response cache
+        
+    Returns:
+        The answer as a string
+    """
+    result = await ask_question_async(
+        question=question,
+        model=model,
+        template_name=template_name,
+        source_dir=source_dir,
+        use_cache=use_cache
     )
     
     return result["answer"]
@@ -242,17 +521,17 @@ def get_kb_info(source_dir: Optional[str] = None) -> Dict[str, Any]:
     # Ensure the source directory exists
     os.makedirs(source_dir, exist_ok=True)
     
-    kb_path = os.path.join(source_dir, kb_dir, "knowledge_base.json")
-    metadata_path = os.path.join(source_dir, kb_dir, "metadata.json")
+    kb_path_dir = os.path.join(source_dir, kb_dir)
+    metadata_path = os.path.join(kb_path_dir, kb_store.METADATA_FILE)
     
     result = {
         "source_dir": source_dir,
-        "kb_exists": os.path.exists(kb_path),
+        "kb_exists": kb_store.kb_exists(kb_path_dir),
         "metadata_exists": os.path.exists(metadata_path),
     }
     
-    if os.path.exists(kb_path):
-        kb_size = os.path.getsize(kb_path) / (1024 * 1024)  # Size in MB
+    if result["kb_exists"]:
+        kb_size = kb_store.kb_size_bytes(kb_path_dir) / (1024 * 1024)  # Size in MB
         result["kb_size_mb"] = kb_size
         
         if os.path.exists(metadata_path):
@@ -263,30 +542,12 @@ def get_kb_info(source_dir: Optional[str] = None) -> Dict[str, Any]:
             except (json.JSONDecodeError, FileNotFoundError) as e:
                 result["metadata_error"] = str(e)
     
-    # Count documents
-    doc_count = 0
-    for root, _, files in os.walk(source_dir):
-        if os.path.basename(root) == kb_dir:  # Skip .kb directory
-            continue
-        for file in files:
-            if file.startswith("."):  # Skip hidden files
-                continue
-            doc_count += 1
-    
-    result["doc_count"] = doc_count
+    # Count the documents a build would load, with the same crawl settings
+    documents = list_documents(source_dir)
+    result["doc_count"] = len(documents)
     
     # Get sample documents
-    sample_docs = []
-    for root, _, files in os.walk(source_dir):
-        if os.path.basename(root) == kb_dir or len(sample_docs) >= 5:  # Skip .kb directory and limit to 5 samples
-            continue
-        for file in files:
-            if file.startswith("."):  # Skip hidden files
-                continue
-            rel_path = os.path.relpath(os.path.join(root, file), source_dir)
-            sample_docs.append(rel_path)
-            if len(sample_docs) >= 5:
-                break
+    sample_docs = documents[:5]
     
     result["sample_docs"] = sample_docs
     
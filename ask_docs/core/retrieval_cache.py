@@ -0,0 +1,111 @@
+"""Cache of retrieval results for AskDocs.
+
+Rankings are cached per knowledge base version, so a rebuilt knowledge base
+never serves results computed against its previous contents. The settings
+that change how a query is ranked are part of the key as well. Only the chunk
+indices and scores are stored; chunk texts are read from the table on a hit.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+from ask_docs.config import get_rag_config
+from ask_docs.core.embeddings import normalize_query
+
+DEFAULT_RETRIEVAL_CACHE_SIZE = 256
+
+# Query-time settings that affect rankings; build-time settings change the version instead
+RANKING_SETTINGS = (
+    "hybrid_candidates",
+    "rrf_k",
+    "embedding_rescore_factor",
+    "ann_backend",
+    "ann_min_chunks",
+    "ann_nprobe",
+    "ann_ef_search",
+)
+
+# Cached rankings, most recently used last
+_cache: "OrderedDict[Tuple, Tuple[Tuple[int, ...], Optional[Tuple[float, ...]]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def make_key(version: str, query: str, top_n: int, mode: str, embedding_model: Optional[str]) -> Tuple:
+    """Build the cache key for a retrieval request.
+
+    The current values of the ``RANKING_SETTINGS`` are included, so changing
+    one of them does not serve rankings computed under the old value.
+
+    Args:
+        version: Version of the knowledge base being searched
+        query: Query text
+        top_n: Number of results requested
+        mode: Retrieval mode
+        embedding_model: Embedding model used for the query
+
+    Returns:
+        Hashable cache key
+    """
+    config = get_rag_config()
+    settings = tuple(config.get(name) for name in RANKING_SETTINGS)
+    return (version, normalize_query(query), top_n, mode, embedding_model, settings)
+
+
+def get_ranking(key: Tuple) -> Optional[Tuple[Tuple[int, ...], Optional[Tuple[float, ...]]]]:
+    """Look up a cached ranking.
+
+    Args:
+        key: Key from ``make_key``
+
+    Returns:
+        Tuple of (chunk indices, scores or None), or None on a cache miss
+    """
+    global _hits, _misses
+    with _cache_lock:
+        ranking = _cache.get(key)
+        if ranking is None:
+            _misses += 1
+            return None
+        _cache.move_to_end(key)
+        _hits += 1
+        return ranking
+
+
+def store_ranking(key: Tuple, indices: Sequence[int], scores: Optional[Sequence[float]] = None) -> None:
+    """Cache a ranking, evicting the least recently used entries beyond ``retrieval_cache_size``.
+
+    Args:
+        key: Key from ``make_key``
+        indices: Chunk indices, best first
+        scores: Scores aligned with ``indices``, or None
+    """
+    max_size = int(get_rag_config().get("retrieval_cache_size", DEFAULT_RETRIEVAL_CACHE_SIZE))
+    if max_size <= 0:
+        return
+
+    ranking = (
+        tuple(int(i) for i in indices),
+        None if scores is None else tuple(float(s) for s in scores)
+    )
+    with _cache_lock:
+        _cache[key] = ranking
+        _cache.move_to_end(key)
+        while len(_cache) > max_size:
+            _cache.popitem(last=False)
+
+
+def retrieval_cache_stats() -> Dict[str, int]:
+    """Get hit/miss counters and the current size of the retrieval cache."""
+    with _cache_lock:
+        return {"hits": _hits, "misses": _misses, "size": len(_cache)}
+
+
+def clear_retrieval_cache() -> None:
+    """Empty the retrieval cache and reset its counters."""
+    global _hits, _misses
+    with _cache_lock:
+        _cache.clear()
+        _hits = 0
+        _misses = 0
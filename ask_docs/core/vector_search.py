@@ -0,0 +1,133 @@
+"""Vectorized similarity search for AskDocs.
+
+Chunk embeddings are kept as a single contiguous float32 matrix whose rows are
+L2-normalized, so cosine similarity against a query is one matrix-vector product
+followed by a partial sort of the scores. A batch of queries is scored with
+one matrix-matrix product instead.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Largest (chunks x queries) score matrix computed at once for a batch of queries
+_MAX_BATCH_SCORES = 1 << 25
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of a matrix (or a single vector).
+
+    Args:
+        matrix: Array of shape (n, dim) or (dim,)
+
+    Returns:
+        A contiguous float32 array of the same shape with unit-length rows.
+        Zero rows are left as zeros.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Get the indices of the k highest scores, best first.
+
+    Uses ``np.argpartition`` so only the k selected scores are fully sorted.
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of indices to return
+
+    Returns:
+        Array of at most k indices into ``scores``
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    # Stable sort keeps the original chunk order for equal scores
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order]
+
+
+def cosine_top_k(
+    embeddings: np.ndarray,
+    query_embedding: np.ndarray,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the rows most similar to a query by cosine similarity.
+
+    Args:
+        embeddings: Matrix of L2-normalized row embeddings, shape (n, dim)
+        query_embedding: Query embedding, shape (dim,); need not be normalized
+        k: Number of results to return
+
+    Returns:
+        Tuple of (indices, scores) for the top k rows, best first
+    """
+    query = normalize_rows(query_embedding)
+    scores = embeddings @ query
+    indices = top_k_indices(scores, k)
+    return indices, scores[indices]
+
+
+def cosine_top_k_many(
+    embeddings: np.ndarray,
+    query_embeddings: np.ndarray,
+    k: int
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Find the rows most similar to each of several queries.
+
+    The queries are scored together with one matrix product (split into
+    groups of queries only when the score matrix would be very large).
+
+    Args:
+        embeddings: Matrix of L2-normalized row embeddings, shape (n, dim)
+        query_embeddings: Query embeddings, shape (num_queries, dim); need not be normalized
+        k: Number of results to return per query
+
+    Returns:
+        One (indices, scores) tuple per query, best first
+    """
+    queries = normalize_rows(query_embeddings)
+    step = max(1, _MAX_BATCH_SCORES // max(embeddings.shape[0], 1))
+    results = []
+    for start in range(0, len(queries), step):
+        # One row of scores per query
+        scores = np.ascontiguousarray((embeddings @ queries[start:start + step].T).T)
+        for row in scores:
+            indices = top_k_indices(row, k)
+            results.append((indices, row[indices]))
+    return results
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[np.ndarray],
+    k: int,
+    rrf_k: int = 60
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Combine several rankings with reciprocal-rank fusion.
+
+    Each item scores ``sum(1 / (rrf_k + rank))`` over the rankings it appears
+    in, with ranks starting at 1.
+
+    Args:
+        rankings: Arrays of item indices, each ordered best first
+        k: Number of fused results to return
+        rrf_k: Rank offset that damps the influence of the top ranks
+
+    Returns:
+        Tuple of (item indices, fused scores), best first
+    """
+    rankings = [np.asarray(r, dtype=np.int64) for r in rankings if len(r)]
+    if not rankings:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    items = np.concatenate(rankings)
+    contributions = np.concatenate([1.0 / (rrf_k + np.arange(1, len(r) + 1)) for r in rankings])
+    candidates, inverse = np.unique(items, return_inverse=True)
+    scores = np.bincount(inverse, weights=contributions)
+    best = top_k_indices(scores, k)
+    return candidates[best], scores[best]
@@ -0,0 +1,373 @@
+"""Live updates of a knowledge base as its source directory changes.
+
+A ``SourceWatcher`` watches ``source_dir`` for created, modified and deleted
+documents. File system events come from watchdog (inotify on Linux) when it
+is installed, and otherwise from polling the modification times of the
+documents the crawler would load.
+
+Changed paths are collected until the directory has been quiet for
+``watch_debounce`` seconds, then applied to the loaded chunk table in memory
+(see ``update_documents``): only the documents under those paths are
+re-chunked and re-embedded, deleted ones are dropped, and the search indexes
+are updated rather than rebuilt. The new table replaces the loaded one in the
+knowledge base registry straight away and is saved on a background thread;
+once saved, it is swapped for the same table memory-mapped from disk. When
+the changed paths are unknown, the watcher falls back to an incremental
+``build_knowledge_base`` run.
+
+Updates run on the watcher's own threads, and replaced files are swapped in
+atomically, so questions already being answered keep searching the previous
+table.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from ask_docs.config import get_rag_config
+from ask_docs.core import kb_store, knowledge_base
+from ask_docs.core.ann_index import build_ann_index
+from ask_docs.core.chunk_table import ChunkTable
+from ask_docs.core.crawler import full_path
+from ask_docs.core.document_retrieval import build_knowledge_base, list_documents, update_documents
+
+WATCH_BACKENDS = ("auto", "watchdog", "poll")
+DEFAULT_WATCH_BACKEND = "auto"
+DEFAULT_WATCH_DEBOUNCE = 1.0
+DEFAULT_WATCH_POLL_INTERVAL = 2.0
+
+
+def _resolve_backend(backend: str) -> str:
+    """Choose the event source for a configured backend name.
+
+    Raises:
+        ValueError: If the backend is not supported
+        ImportError: If watchdog was requested but is not installed
+    """
+    if backend not in WATCH_BACKENDS:
+        raise ValueError(f"Unsupported watch backend: {backend}. "
+                         f"Choose from: {', '.join(WATCH_BACKENDS)}")
+    if backend == "auto":
+        try:
+            import watchdog  # noqa: F401
+            return "watchdog"
+        except ImportError:
+            return "poll"
+    if backend == "watchdog":
+        import watchdog  # noqa: F401
+    return backend
+
+
+class SourceWatcher:
+    """Keeps the knowledge base of a source directory up to date in the background."""
+
+    def __init__(
+        self,
+        source_dir: Optional[str] = None,
+        backend: Optional[str] = None,
+        debounce: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        on_update: Optional[Callable[[ChunkTable], None]] = None
+    ):
+        """Initialize the watcher; nothing is watched until ``start`` is called.
+
+        Args:
+            source_dir: Directory containing the documents, or None for the configured one
+            backend: ``auto``, ``watchdog`` or ``poll``, or None for ``watch_backend``
+            debounce: Seconds without changes before an update runs, or None for ``watch_debounce``
+            poll_interval: Seconds between scans of the polling backend, or None for ``watch_poll_interval``
+            on_update: Called with the updated chunk table after each update
+
+        Raises:
+            ValueError: If the backend is not supported
+            ImportError: If watchdog was requested but is not installed
+        """
+        config = get_rag_config()
+        self.source_dir = knowledge_base.resolve_source_dir(source_dir)
+        self.kb_path_dir = knowledge_base.kb_path_for(self.source_dir)
+        self.backend = _resolve_backend(backend or config.get("watch_backend", DEFAULT_WATCH_BACKEND))
+        self.debounce = float(debounce if debounce is not None
+                              else config.get("watch_debounce", DEFAULT_WATCH_DEBOUNCE))
+        self.poll_interval = float(poll_interval if poll_interval is not None
+                                   else config.get("watch_poll_interval", DEFAULT_WATCH_POLL_INTERVAL))
+        self.on_update = on_update
+
+        self.updates = 0
+        self.saves = 0
+        self.errors = 0
+        self.last_update: Optional[float] = None
+        self.last_duration: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._last_change: Optional[float] = None
+        self._paths: Set[str] = set()
+        self._rescan = False
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+        # Latest table and metadata, and whether they still have to be saved
+        self._table: Optional[ChunkTable] = None
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._unsaved = False
+        self._save_requested = threading.Event()
+        self._saver: Optional[threading.Thread] = None
+        # Held while the knowledge base directory is written
+        self._save_lock = threading.Lock()
+
+    def __enter__(self) -> "SourceWatcher":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        """Whether the watcher has been started and not stopped."""
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self) -> None:
+        """Start watching the source directory and applying changes."""
+        if self._threads:
+            return
+        os.makedirs(self.source_dir, exist_ok=True)
+        self._stop.clear()
+        if self.backend == "watchdog":
+            self._start_observer()
+        else:
+            # Changes made once start() returns are compared against this snapshot
+            snapshot = self._snapshot()
+            self._threads.append(threading.Thread(target=self._poll, args=(snapshot,),
+                                                  name="askdocs-watch-poll", daemon=True))
+        self._threads.append(threading.Thread(target=self._apply, name="askdocs-watch", daemon=True))
+        self._saver = threading.Thread(target=self._save_loop, name="askdocs-watch-save", daemon=True)
+        for thread in self._threads + [self._saver]:
+            thread.start()
+        print(f"Watching {self.source_dir} for changes ({self.backend})")
+
+    def stop(self) -> None:
+        """Stop watching; an update already running is allowed to finish and is saved."""
+        self._stop.set()
+        self._changed.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._saver is not None:
+            self._save_requested.set()
+            self._saver.join()
+            self._saver = None
+        # Save an update the background thread stopped before reaching
+        self._save()
+        with self._lock:
+            if self._table is not None and not self._unsaved:
+                # Reload from disk again when the files change
+                knowledge_base.register_knowledge_base(self._table, self.source_dir, self._metadata)
+
+    def join(self) -> None:
+        """Block until the watcher is stopped, e.g. by Ctrl+C in the calling thread."""
+        while self.running:
+            self._stop.wait(0.5)
+
+    def notify(self, path: Optional[str] = None) -> None:
+        """Record a change in the source directory.
+
+        Args:
+            path: Changed file or directory, or None if unknown (the whole directory
+                is then checked); changes inside the knowledge base directory are ignored
+        """
+        if path is not None and self._in_kb_dir(path):
+            return
+        with self._lock:
+            if path is None:
+                self._rescan = True
+            else:
+                self._paths.add(path)
+            self._last_change = time.monotonic()
+        self._changed.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the watcher's counters.
+
+        Returns:
+            Dictionary with ``source_dir``, ``backend``, ``updates``, ``saves``,
+            ``errors``, ``last_update`` and ``last_duration``
+        """
+        return {
+            "source_dir": self.source_dir,
+            "backend": self.backend,
+            "updates": self.updates,
+            "saves": self.saves,
+            "errors": self.errors,
+            "last_update": self.last_update,
+            "last_duration": self.last_duration
+        }
+
+    def _in_kb_dir(self, path: str) -> bool:
+        path = os.path.realpath(path)
+        return path == self.kb_path_dir or path.startswith(self.kb_path_dir + os.sep)
+
+    def _start_observer(self) -> None:
+        """Subscribe to file system events through watchdog."""
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.event_type in ("opened", "closed_no_write"):
+                    return
+                # A directory's own modification only echoes a change to one of its entries
+                if event.is_directory and event.event_type == "modified":
+                    return
+                watcher.notify(event.src_path)
+                dest_path = getattr(event, "dest_path", "")
+                if dest_path:
+                    watcher.notify(dest_path)
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), self.source_dir, recursive=True)
+        self._observer.start()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Get the modification time and size of every document the crawler would load."""
+        snapshot = {}
+        for rel_path in list_documents(self.source_dir):
+            try:
+                stat = os.stat(full_path(self.source_dir, rel_path))
+            except OSError:
+                continue
+            snapshot[rel_path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll(self, previous: Dict[str, Tuple[int, int]]) -> None:
+        """Scan the source directory until stopped, reporting each file that differs from the last scan."""
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = [rel_path for rel_path in set(previous) | set(current)
+                       if previous.get(rel_path) != current.get(rel_path)]
+            previous = current
+            for rel_path in changed:
+                self.notify(full_path(self.source_dir, rel_path))
+
+    def _apply(self) -> None:
+        """Wait for changes, let them settle, then update the knowledge base."""
+        while not self._stop.is_set():
+            self._changed.wait()
+            if self._stop.is_set():
+                return
+            # Changes seen from here on trigger another update
+            self._changed.clear()
+            # Wait until no change has been seen for the debounce period
+            while True:
+                with self._lock:
+                    quiet = time.monotonic() - (self._last_change or 0)
+                if quiet >= self.debounce or self._stop.is_set():
+                    break
+                self._stop.wait(self.debounce - quiet)
+            if self._stop.is_set():
+                return
+            self._update()
+
+    def _update(self) -> None:
+        """Apply the pending changes to the loaded knowledge base."""
+        with self._lock:
+            paths, rescan = self._paths, self._rescan
+            self._paths, self._rescan = set(), False
+        start = time.perf_counter()
+        try:
+            if rescan or not self._load_table():
+                table = self._rebuild()
+            else:
+                result = update_documents(self._table, self._metadata, self.source_dir, paths)
+                if result is None:
+                    return
+                table, metadata = result
+                with self._lock:
+                    self._table, self._metadata, self._unsaved = table, metadata, True
+                    knowledge_base.register_knowledge_base(table, self.source_dir, metadata, live=True)
+                self._save_requested.set()
+        except Exception as e:
+            self.errors += 1
+            print(f"Error updating knowledge base: {e}")
+            with self._lock:
+                # Check the whole directory next time rather than lose these changes
+                self._rescan = True
+            return
+        self.updates += 1
+        self.last_update = time.time()
+        self.last_duration = time.perf_counter() - start
+        if self.on_update is not None:
+            self.on_update(table)
+
+    def _load_table(self) -> bool:
+        """Take the registered knowledge base as the table to update, if it can be updated in place.
+
+        Returns:
+            False if there is no saved knowledge base with a per-file manifest to update
+        """
+        if self._table is not None:
+            return True
+        kb = knowledge_base.get_knowledge_base(self.source_dir)
+        table, metadata = kb.table, kb.metadata
+        if (metadata.get("files") is None or table.version != kb_store.kb_version(metadata) or
+                not all("start" in d for d in table.documents)):
+            return False
+        with self._lock:
+            self._table, self._metadata = table, metadata
+            knowledge_base.register_knowledge_base(table, self.source_dir, metadata, live=True)
+        return True
+
+    def _rebuild(self) -> ChunkTable:
+        """Update the knowledge base with an incremental build over the whole directory."""
+        with self._save_lock:
+            table = build_knowledge_base(self.source_dir)
+            metadata = kb_store.read_metadata(self.kb_path_dir)
+            with self._lock:
+                self._table, self._metadata, self._unsaved = table, metadata, False
+                knowledge_base.register_knowledge_base(table, self.source_dir, metadata, live=True)
+        return table
+
+    def _save_loop(self) -> None:
+        """Save updated tables in the background until stopped."""
+        while not self._stop.is_set():
+            self._save_requested.wait()
+            self._save_requested.clear()
+            self._save()
+
+    def _save(self) -> None:
+        """Save the latest updated table, then switch to reading it from disk.
+
+        Tables updated while a save is running are not saved separately; the
+        next save writes the latest one.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._unsaved:
+                    return
+                table, metadata = self._table, self._metadata
+                self._unsaved = False
+            try:
+                if table.ann_index is None:
+                    # Rebuild an index the in-memory update had to drop
+                    table.ann_index = build_ann_index(table.embeddings)
+                kb_store.save_chunk_table(self.kb_path_dir, table, metadata)
+                saved = kb_store.load_chunk_table(self.kb_path_dir)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error saving knowledge base: {e}")
+                with self._lock:
+                    if self._table is table:
+                        self._unsaved = True
+                return
+            self.saves += 1
+            with self._lock:
+                if self._table is table:
+                    self._table = saved
+                    knowledge_base.register_knowledge_base(saved, self.source_dir, metadata, live=True)
@@ -1,19 +1,103 @@
+"""LLM providers for AskDocs.
+
+``get_llm`` returns one shared instance per provider configuration, so the
+provider's HTTP clients and their keep-alive connections (see
+``ask_docs.llm.pool``) are reused from one question to the next.
+"""
+import threading
+from typing import Any, Dict, Tuple
+
+from ask_docs.config import get_model_config
+from ask_docs.llm.base import BaseLLM
 from ask_docs.llm.openai_llm import OpenAI_LLM
 from ask_docs.llm.ollama_llm import OllamaLLM
 from ask_docs.llm.anthropic_llm import ClaudeLLM
 from ask_docs.llm.gemini_llm import GeminiLLM
 from ask_docs.llm.groq_llm import GroqLLM
+from ask_docs.llm.pool import get_pool_settings
+
+_PROVIDERS = {
+    "openai": OpenAI_LLM,
+    "ollama": OllamaLLM,
+    "claude": ClaudeLLM,
+    "gemini": GeminiLLM,
+    "groq": GroqLLM,
+}
+
+# Shared instances keyed by (provider, model, credentials, pool settings)
+_llm_cache: Dict[Tuple, BaseLLM] = {}
+_llm_cache_lock = threading.Lock()
+_llm_cache_hits = 0
+_llm_cache_misses = 0
+
+
+def _cache_key(model: str) -> Tuple:
+    """Build the cache key for a provider from its current configuration."""
+    config = get_model_config(model)
+    settings = get_pool_settings()
+    return (model, config.get("model"), config.get("api_key"), config.get("base_url"),
+            settings["pool_size"], settings["keepalive_expiry"])
+
 
 def get_llm(model: str):
-    if model == "openai":
-        return OpenAI_LLM()
-    elif model == "ollama":
-        return OllamaLLM()
-    elif model == "claude":
-        return ClaudeLLM()
-    elif model == "gemini":
-        return GeminiLLM()
-    elif model == "groq":
-        return GroqLLM()
-    else:
-        raise ValueError(f"Unsupported model: {model}")
\ No newline at end of file
+    """Get the shared LLM instance for a provider.
+
+    The instance is created on first use and reused while the provider's
+    configured model, credentials and pool settings stay the same.
+
+    Args:
+        model: Provider name, e.g. "openai" or "ollama"
+
+    Returns:
+        The provider's LLM instance
+
+    Raises:
+        ValueError: If the provider is not supported
+    """
+    global _llm_cache_hits, _llm_cache_misses
+
+    if model not in _PROVIDERS:
+        raise ValueError(f"Unsupported model: {model}")
+
+    key = _cache_key(model)
+    with _llm_cache_lock:
+        llm = _llm_cache.get(key)
+        if llm is not None:
+            _llm_cache_hits += 1
+            return llm
+        _llm_cache_misses += 1
+        llm = _llm_cache[key] = _PROVIDERS[model]()
+        return llm
+
+
+def llm_pool_stats() -> Dict[str, Any]:
+    """Get cache counters and the connection pool statistics of each cached LLM.
+
+    Returns:
+        Dictionary with cache ``hits``, ``misses`` and ``size``, the configured
+        ``pool_size``, and a ``clients`` list with the provider, model and pool
+        counters of each cached instance
+    """
+    with _llm_cache_lock:
+        cached = list(_llm_cache.items())
+        stats = {"hits": _llm_cache_hits, "misses": _llm_cache_misses, "size": len(cached)}
+
+    stats["pool_size"] = get_pool_settings()["pool_size"]
+    # Keys hold credentials, so only the provider and model are reported
+    stats["clients"] = [
+        {"provider": key[0], "model": llm.model, **llm.pool_stats()}
+        for key, llm in cached
+    ]
+    return stats
+
+
+def clear_llm_cache() -> None:
+    """Close and remove all cached LLM instances and reset the cache counters."""
+    global _llm_cache_hits, _llm_cache_misses
+    with _llm_cache_lock:
+        cached = list(_llm_cache.values())
+        _llm_cache.clear()
+        _llm_cache_hits = 0
+        _llm_cache_misses = 0
+    for llm in cached:
+        llm.close()
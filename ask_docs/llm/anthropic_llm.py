@@ -1,11 +1,15 @@
 """Anthropic (Claude) LLM implementation."""
-from anthropic import Anthropic
+from typing import Any, AsyncIterator, Dict, Iterator
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
 from ask_docs.config import get_model_config
 from ask_docs.llm.base import BaseLLM
+from ask_docs.llm.pool import ConnectionPool
 
 class ClaudeLLM(BaseLLM):
     """Anthropic Claude LLM implementation."""
     
+    provider = "claude"
+    
     def __init__(self, model=None, api_key=None):
         """Initialize the Claude LLM.
         
@@ -16,7 +20,20 @@ class ClaudeLLM(BaseLLM):
         config = get_model_config("claude")
         self.model = model or config.get("model", "claude-3-haiku-20240307") 
         self.api_key = api_key or config.get("api_key")
-        self.client = Anthropic(api_key=self.api_key) if self.api_key else None
+        self.max_tokens = 1000
+        self.pool = ConnectionPool()
+        self.client = Anthropic(
+            api_key=self.api_key, http_client=self.pool.http_client(DefaultHttpxClient)
+        ) if self.api_key else None
+    
+    def _async_client(self) -> AsyncAnthropic:
+        """Get the async client for the running event loop."""
+        return self.pool.loop_local("client", lambda: AsyncAnthropic(
+            api_key=self.api_key, http_client=self.pool.async_http_client(DefaultAsyncHttpxClient)))
+    
+    def generation_params(self) -> Dict[str, Any]:
+        """Get the generation parameters sent with each prompt."""
+        return {"max_tokens": self.max_tokens}
     
     def ask(self, prompt: str) -> str:
         """Send a prompt to Claude and return the response.
@@ -33,11 +50,87 @@ class ClaudeLLM(BaseLLM):
         try:
             message = self.client.messages.create(
                 model=self.model,
-                max_tokens=1000,
+                max_tokens=self.max_tokens,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            return message.content[0].text
+        except Exception as e:
+            return f"Error with Claude API: {str(e)}"
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Send a prompt to Claude and yield the response as it is generated.
+        
+        Args:
+            prompt: The prompt to send to Claude
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        if not self.api_key or not self.client:
+            yield "Error: Claude API key is not configured."
+            return
+            
+        try:
+            with self.client.messages.stream(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
+        except Exception as e:
+            yield f"Error with Claude API: {str(e)}"
+    
+    async def ask_async(self, prompt: str) -> str:
+        """Send a prompt to Claude using the async client.
+        
+        Args:
+            prompt: The prompt to send to Claude
+            
+        Returns:
+            The AI's response as a string
+        """
+        if not self.api_key:
+            return "Error: Claude API key is not configured."
+            
+        try:
+            message = await self._async_client().messages.create(
+                model=self.model,
+                max_tokens=self.max_tokens,
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
             )
             return message.content[0].text
         except Exception as e:
-            return f"Error with Claude API: {str(e)}"
\ No newline at end of file
+            return f"Error with Claude API: {str(e)}"
+    
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the response from Claude using the async client.
+        
+        Args:
+            prompt: The prompt to send to Claude
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        if not self.api_key:
+            yield "Error: Claude API key is not configured."
+            return
+            
+        try:
+            async with self._async_client().messages.stream(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+        except Exception as e:
+            yield f"Error with Claude API: {str(e)}"
\ No newline at end of file
@@ -1,9 +1,16 @@
 """Base class for all LLM implementations."""
+import asyncio
 from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterator
 
 class BaseLLM(ABC):
     """Base class that all LLM implementations must inherit from."""
     
+    # Provider name, as passed to ``get_llm``
+    provider = None
+    # Keep-alive HTTP connections (an ``ask_docs.llm.pool.ConnectionPool``), if the provider uses one
+    pool = None
+    
     @abstractmethod
     def ask(self, prompt: str) -> str:
         """Send a prompt to the LLM and return the response.
@@ -14,4 +21,76 @@ class BaseLLM(ABC):
         Returns:
             The LLM's response as a string
         """
-        pass
\ No newline at end of file
+        pass
+    
+    async def ask_async(self, prompt: str) -> str:
+        """Send a prompt to the LLM without blocking the event loop.
+        
+        Providers override this with their SDK's async client; the default
+        runs ``ask`` in a worker thread.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            
+        Returns:
+            The LLM's response as a string
+        """
+        return await asyncio.to_thread(self.ask, prompt)
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Send a prompt to the LLM and yield the response as it is generated.
+        
+        Providers override this with their streaming API; the default yields
+        the whole response from ``ask`` at once.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            
+        Yields:
+            Pieces of the response text, in order
+        """
+        yield self.ask(prompt)
+    
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the response as it is generated, without blocking the event loop.
+        
+        Providers override this with their SDK's async streaming API; the
+        default advances ``stream`` in a worker thread, one piece at a time.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            
+        Yields:
+            Pieces of the response text, in order
+        """
+        pieces = iter(self.stream(prompt))
+        done = object()
+        while True:
+            piece = await asyncio.to_thread(next, pieces, done)
+            if piece is done:
+                return
+            yield piece
+    
+    def generation_params(self) -> Dict[str, Any]:
+        """Get the generation parameters sent with each prompt, besides the model.
+        
+        They are part of the response cache key, so providers that send
+        parameters such as ``max_tokens`` must report them here.
+        
+        Returns:
+            Dictionary of parameter names and values
+        """
+        return {}
+    
+    def pool_stats(self) -> Dict[str, int]:
+        """Get request and connection counters for this LLM's connection pool.
+        
+        Returns:
+            Dictionary of counters, empty if the provider has no pool
+        """
+        return self.pool.stats() if self.pool is not None else {}
+    
+    def close(self) -> None:
+        """Close the LLM's persistent connections."""
+        if self.pool is not None:
+            self.pool.close()
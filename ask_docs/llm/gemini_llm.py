@@ -1,4 +1,5 @@
 """Google Gemini LLM implementation."""
+from typing import Iterator
 import google.generativeai as genai
 from ask_docs.config import get_model_config
 from ask_docs.llm.base import BaseLLM
@@ -6,6 +7,8 @@ from ask_docs.llm.base import BaseLLM
 class GeminiLLM(BaseLLM):
     """Google Gemini LLM implementation."""
     
+    provider = "gemini"
+    
     def __init__(self, model=None, api_key=None):
         """Initialize the Gemini LLM.
         
@@ -17,9 +20,20 @@ class GeminiLLM(BaseLLM):
         self.model = model or config.get("model", "models/gemini-pro")
         self.api_key = api_key or config.get("api_key")
         
+        self._generative_model = None
+        
         if self.api_key:
             genai.configure(api_key=self.api_key)
     
+    def _get_model(self) -> "genai.GenerativeModel":
+        """Get the Gemini model, created on first use and reused for later prompts.
+        
+        The SDK keeps its own persistent gRPC channel, so there is no HTTP pool to manage.
+        """
+        if self._generative_model is None:
+            self._generative_model = genai.GenerativeModel(self.model)
+        return self._generative_model
+    
     def ask(self, prompt: str) -> str:
         """Send a prompt to Gemini and return the response.
         
@@ -33,8 +47,47 @@ class GeminiLLM(BaseLLM):
             return "Error: Google Gemini API key is not configured."
         
         try:
-            model = genai.GenerativeModel(self.model)
+            model = self._get_model()
             response = model.generate_content(prompt)
             return response.text
+        except Exception as e:
+            return f"Error with Google Gemini API: {str(e)}"
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Send a prompt to Gemini and yield the response as it is generated.
+        
+        Args:
+            prompt: The prompt to send to Gemini
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        if not self.api_key:
+            yield "Error: Google Gemini API key is not configured."
+            return
+        
+        try:
+            model = self._get_model()
+            for chunk in model.generate_content(prompt, stream=True):
+                yield chunk.text
+        except Exception as e:
+            yield f"Error with Google Gemini API: {str(e)}"
+    
+    async def ask_async(self, prompt: str) -> str:
+        """Send a prompt to Gemini using the SDK's async generation call.
+        
+        Args:
+            prompt: The prompt to send to Gemini
+            
+        Returns:
+            The AI's response as a string
+        """
+        if not self.api_key:
+            return "Error: Google Gemini API key is not configured."
+        
+        try:
+            model = self._get_model()
+            response = await model.generate_content_async(prompt)
+            return response.text
         except Exception as e:
             return f"Error with Google Gemini API: {str(e)}"
\ No newline at end of file
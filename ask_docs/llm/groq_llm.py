@@ -1,11 +1,15 @@
 """Groq LLM implementation."""
+from typing import AsyncIterator, Iterator
 import groq
 from ask_docs.config import get_model_config
 from ask_docs.llm.base import BaseLLM
+from ask_docs.llm.pool import ConnectionPool
 
 class GroqLLM(BaseLLM):
     """Groq LLM implementation."""
     
+    provider = "groq"
+    
     def __init__(self, model=None, api_key=None):
         """Initialize the Groq LLM.
         
@@ -16,7 +20,15 @@ class GroqLLM(BaseLLM):
         config = get_model_config("groq")
         self.model = model or config.get("model", "mixtral-8x7b-32768")
         self.api_key = api_key or config.get("api_key")
-        self.client = groq.Groq(api_key=self.api_key) if self.api_key else None
+        self.pool = ConnectionPool()
+        self.client = groq.Groq(
+            api_key=self.api_key, http_client=self.pool.http_client(groq.DefaultHttpxClient)
+        ) if self.api_key else None
+    
+    def _async_client(self) -> groq.AsyncGroq:
+        """Get the async client for the running event loop."""
+        return self.pool.loop_local("client", lambda: groq.AsyncGroq(
+            api_key=self.api_key, http_client=self.pool.async_http_client(groq.DefaultAsyncHttpxClient)))
     
     def ask(self, prompt: str) -> str:
         """Send a prompt to Groq and return the response.
@@ -37,4 +49,75 @@ class GroqLLM(BaseLLM):
             )
             return chat_completion.choices[0].message.content
         except Exception as e:
-            return f"Error with Groq API: {str(e)}"
\ No newline at end of file
+            return f"Error with Groq API: {str(e)}"
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Send a prompt to Groq and yield the response as it is generated.
+        
+        Args:
+            prompt: The prompt to send to Groq
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        if not self.api_key or not self.client:
+            yield "Error: Groq API key is not configured."
+            return
+            
+        try:
+            chat_completion = self.client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model,
+                stream=True
+            )
+            for chunk in chat_completion:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"Error with Groq API: {str(e)}"
+    
+    async def ask_async(self, prompt: str) -> str:
+        """Send a prompt to Groq using the async client.
+        
+        Args:
+            prompt: The prompt to send to Groq
+            
+        Returns:
+            The AI's response as a string
+        """
+        if not self.api_key:
+            return "Error: Groq API key is not configured."
+            
+        try:
+            chat_completion = await self._async_client().chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model,
+            )
+            return chat_completion.choices[0].message.content
+        except Exception as e:
+            return f"Error with Groq API: {str(e)}"
+    
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the response from Groq using the async client.
+        
+        Args:
+            prompt: The prompt to send to Groq
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        if not self.api_key:
+            yield "Error: Groq API key is not configured."
+            return
+            
+        try:
+            chat_completion = await self._async_client().chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model,
+                stream=True
+            )
+            async for chunk in chat_completion:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"Error with Groq API: {str(e)}"
\ No newline at end of file
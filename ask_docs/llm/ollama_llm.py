@@ -1,11 +1,17 @@
 """Ollama LLM implementation."""
-import requests
+import json
+from typing import AsyncIterator, Iterator
+
+import httpx
 from ask_docs.config import get_model_config
 from ask_docs.llm.base import BaseLLM
+from ask_docs.llm.pool import ConnectionPool
 
 class OllamaLLM(BaseLLM):
     """Ollama LLM implementation."""
     
+    provider = "ollama"
+    
     def __init__(self, model=None, base_url=None):
         """Initialize the Ollama LLM.
         
@@ -17,6 +23,7 @@ class OllamaLLM(BaseLLM):
         self.model = model or config.get("model", "llama3")
         self.base_url = base_url or config.get("base_url", "http://localhost:11434")
         self.api_url = f"{self.base_url}/api/generate"
+        self.pool = ConnectionPool()
     
     def ask(self, prompt: str) -> str:
         """Send a prompt to Ollama and return the response.
@@ -28,7 +35,7 @@ class OllamaLLM(BaseLLM):
             The AI's response as a string
         """
         try:
-            response = requests.post(
+            response = self.pool.session().post(
                 self.api_url,
                 json={"model": self.model, "prompt": prompt}
             )
@@ -37,4 +44,94 @@ class OllamaLLM(BaseLLM):
             else:
                 return f"Error: Ollama returned status code {response.status_code}"
         except Exception as e:
-            return f"Error with Ollama API: {str(e)}"
\ No newline at end of file
+            return f"Error with Ollama API: {str(e)}"
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Send a prompt to Ollama and yield the response as it is generated.
+        
+        Ollama streams newline-delimited JSON objects, each carrying the next
+        piece of the response, until one with ``"done": true``.
+        
+        Args:
+            prompt: The prompt to send to Ollama
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        try:
+            with self.pool.session().post(
+                self.api_url,
+                json={"model": self.model, "prompt": prompt, "stream": True},
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    yield f"Error: Ollama returned status code {response.status_code}"
+                    return
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        yield f"Error with Ollama API: {data['error']}"
+                        return
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        return
+        except Exception as e:
+            yield f"Error with Ollama API: {str(e)}"
+    
+    async def ask_async(self, prompt: str) -> str:
+        """Send a prompt to Ollama using the pool's async HTTP client.
+        
+        Args:
+            prompt: The prompt to send to Ollama
+            
+        Returns:
+            The AI's response as a string
+        """
+        try:
+            client = self.pool.async_http_client(httpx.AsyncClient, timeout=None)
+            response = await client.post(
+                self.api_url,
+                json={"model": self.model, "prompt": prompt, "stream": False}
+            )
+            if response.status_code == 200:
+                return response.json().get("response", "")
+            else:
+                return f"Error: Ollama returned status code {response.status_code}"
+        except Exception as e:
+            return f"Error with Ollama API: {str(e)}"
+    
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the response from Ollama using the pool's async HTTP client.
+        
+        Args:
+            prompt: The prompt to send to Ollama
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        try:
+            client = self.pool.async_http_client(httpx.AsyncClient, timeout=None)
+            async with client.stream(
+                "POST",
+                self.api_url,
+                json={"model": self.model, "prompt": prompt, "stream": True}
+            ) as response:
+                if response.status_code != 200:
+                    yield f"Error: Ollama returned status code {response.status_code}"
+                    return
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        yield f"Error with Ollama API: {data['error']}"
+                        return
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        return
+        except Exception as e:
+            yield f"Error with Ollama API: {str(e)}"
\ No newline at end of file
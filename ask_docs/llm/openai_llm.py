@@ -1,11 +1,15 @@
 """OpenAI LLM implementation."""
-from openai import OpenAI
+from typing import AsyncIterator, Iterator
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 from ask_docs.config import get_model_config
 from ask_docs.llm.base import BaseLLM
+from ask_docs.llm.pool import ConnectionPool
 
 class OpenAI_LLM(BaseLLM):
     """OpenAI LLM implementation."""
     
+    provider = "openai"
+    
     def __init__(self, model=None, api_key=None):
         """Initialize the OpenAI LLM.
         
@@ -16,7 +20,15 @@ class OpenAI_LLM(BaseLLM):
         config = get_model_config("openai")
         self.model = model or config.get("model", "gpt-3.5-turbo")
         self.api_key = api_key or config.get("api_key")
-        self.client = OpenAI(api_key=self.api_key) if self.api_key else None
+        self.pool = ConnectionPool()
+        self.client = OpenAI(
+            api_key=self.api_key, http_client=self.pool.http_client(DefaultHttpxClient)
+        ) if self.api_key else None
+    
+    def _async_client(self) -> AsyncOpenAI:
+        """Get the async client for the running event loop."""
+        return self.pool.loop_local("client", lambda: AsyncOpenAI(
+            api_key=self.api_key, http_client=self.pool.async_http_client(DefaultAsyncHttpxClient)))
     
     def ask(self, prompt: str) -> str:
         """Send a prompt to OpenAI and return the response.
@@ -37,4 +49,75 @@ class OpenAI_LLM(BaseLLM):
             )
             return response.choices[0].message.content
         except Exception as e:
-            return f"Error with OpenAI API: {str(e)}"
\ No newline at end of file
+            return f"Error with OpenAI API: {str(e)}"
+    
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Send a prompt to OpenAI and yield the response as it is generated.
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        if not self.api_key or not self.client:
+            yield "Error: OpenAI API key is not configured."
+            return
+            
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True
+            )
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"Error with OpenAI API: {str(e)}"
+    
+    async def ask_async(self, prompt: str) -> str:
+        """Send a prompt to OpenAI using the async client.
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            
+        Returns:
+            The AI's response as a string
+        """
+        if not self.api_key:
+            return "Error: OpenAI API key is not configured."
+            
+        try:
+            response = await self._async_client().chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            return f"Error with OpenAI API: {str(e)}"
+    
+    async def stream_async(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the response from OpenAI using the async client.
+        
+        Args:
+            prompt: The prompt to send to OpenAI
+            
+        Yields:
+            Pieces of the AI's response
+        """
+        if not self.api_key:
+            yield "Error: OpenAI API key is not configured."
+            return
+            
+        try:
+            response = await self._async_client().chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"Error with OpenAI API: {str(e)}"
\ No newline at end of file
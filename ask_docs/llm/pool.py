@@ -0,0 +1,198 @@
+"""Keep-alive HTTP connection pools for LLM providers.
+
+Each cached LLM instance (see ``ask_docs.llm.get_llm``) owns one
+``ConnectionPool``, so consecutive questions to the same provider reuse open
+connections instead of paying for a new TCP and TLS handshake every time.
+The pool hands out:
+
+- one synchronous HTTP client (httpx, or the provider SDK's httpx subclass)
+- one asynchronous HTTP client per event loop, since async connections are
+  bound to the loop that opened them
+- one ``requests`` session, for providers called through ``requests``
+
+The number of idle connections kept open is set by ``pool_size`` and how
+long they are kept by ``keepalive_expiry`` in the ``llm`` configuration.
+"""
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from ask_docs.config import get_config
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+
+def get_pool_settings() -> Dict[str, Any]:
+    """Get the configured pool size and keep-alive expiry (in seconds)."""
+    config = get_config()["llm"]
+    return {
+        "pool_size": max(1, int(config.get("pool_size", DEFAULT_POOL_SIZE))),
+        "keepalive_expiry": float(config.get("keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY))
+    }
+
+
+class ConnectionPool:
+    """HTTP clients with persistent connections shared by one LLM instance."""
+
+    def __init__(self, pool_size: Optional[int] = None, keepalive_expiry: Optional[float] = None):
+        """Initialize the pool; clients are created on first use.
+
+        Args:
+            pool_size: Idle connections kept open per client, or None for the configured size
+            keepalive_expiry: Seconds an idle connection is kept, or None for the configured value
+        """
+        settings = get_pool_settings()
+        self.pool_size = pool_size or settings["pool_size"]
+        self.keepalive_expiry = keepalive_expiry if keepalive_expiry is not None else settings["keepalive_expiry"]
+        # Reentrant: loop-local factories create their HTTP client through the pool
+        self._lock = threading.RLock()
+        self._client = None
+        self._session = None
+        # Objects bound to an event loop, dropped when the loop is garbage collected
+        self._loop_objects: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._counters = {"requests": 0, "connections": 0, "tls_handshakes": 0}
+
+    @property
+    def limits(self) -> httpx.Limits:
+        """Connection limits for httpx clients."""
+        return httpx.Limits(max_connections=None, max_keepalive_connections=self.pool_size,
+                            keepalive_expiry=self.keepalive_expiry)
+
+    def http_client(self, factory: Callable[..., Any] = httpx.Client, **kwargs) -> Any:
+        """Get the pool's synchronous HTTP client, creating it on first use.
+
+        Args:
+            factory: httpx client class to create, e.g. an SDK's ``DefaultHttpxClient``
+            **kwargs: Extra arguments for the client, such as ``timeout``
+
+        Returns:
+            The shared client
+        """
+        with self._lock:
+            if self._client is None:
+                self._client = factory(limits=self.limits,
+                                       event_hooks={"request": [self._on_request]}, **kwargs)
+            return self._client
+
+    def async_http_client(self, factory: Callable[..., Any] = httpx.AsyncClient, **kwargs) -> Any:
+        """Get the asynchronous HTTP client for the running event loop.
+
+        Args:
+            factory: httpx async client class to create, e.g. an SDK's ``DefaultAsyncHttpxClient``
+            **kwargs: Extra arguments for the client, such as ``timeout``
+
+        Returns:
+            The client shared by callers on this event loop
+
+        Raises:
+            RuntimeError: If no event loop is running
+        """
+        return self.loop_local("http_client", lambda: factory(
+            limits=self.limits, event_hooks={"request": [self._on_request_async]}, **kwargs))
+
+    def loop_local(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Get an object bound to the running event loop, creating it on first use.
+
+        Provider SDK async clients hold an async HTTP client, so they must
+        be kept per loop as well.
+
+        Args:
+            name: Name of the object within this pool
+            factory: Creates the object
+
+        Returns:
+            The object for the running loop
+
+        Raises:
+            RuntimeError: If no event loop is running
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            objects = self._loop_objects.setdefault(loop, {})
+            if name not in objects:
+                objects[name] = factory()
+            return objects[name]
+
+    def session(self) -> requests.Session:
+        """Get the pool's ``requests`` session, creating it on first use."""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.hooks["response"].append(self._on_response)
+                self._session = session
+            return self._session
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _on_trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore reports every new connection and TLS handshake through the trace extension
+        if event_name == "connection.connect_tcp.complete":
+            self._count("connections")
+        elif event_name == "connection.start_tls.complete":
+            self._count("tls_handshakes")
+
+    async def _on_trace_async(self, event_name: str, info: Dict[str, Any]) -> None:
+        self._on_trace(event_name, info)
+
+    def _on_request(self, request: Any) -> None:
+        self._count("requests")
+        request.extensions.setdefault("trace", self._on_trace)
+
+    async def _on_request_async(self, request: Any) -> None:
+        self._count("requests")
+        request.extensions.setdefault("trace", self._on_trace_async)
+
+    def _on_response(self, response: Any, *args, **kwargs) -> None:
+        self._count("requests")
+
+    def stats(self) -> Dict[str, int]:
+        """Get request and connection counters for this pool.
+
+        Returns:
+            Dictionary with ``requests`` sent, ``connections`` opened,
+            ``tls_handshakes`` made and ``idle_connections`` currently kept open
+        """
+        with self._lock:
+            clients = [self._client] + [objects.get("http_client") for objects in self._loop_objects.values()]
+            session = self._session
+            stats = dict(self._counters)
+
+        idle = 0
+        for client in clients:
+            # httpx does not expose its pool publicly; count what httpcore reports
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            idle += sum(1 for connection in getattr(pool, "connections", []) if connection.is_idle())
+        if session is not None:
+            for adapter in set(session.adapters.values()):
+                for key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools[key]
+                    # urllib3 counts connections itself, and has no TLS handshake counter
+                    stats["connections"] += pool.num_connections
+                    idle += sum(1 for connection in list(pool.pool.queue) if connection is not None)
+        stats["idle_connections"] = idle
+        return stats
+
+    def close(self) -> None:
+        """Close the synchronous client and session.
+
+        Async clients are left to their event loops, which may already be closed.
+        """
+        with self._lock:
+            client, session = self._client, self._session
+            self._client = self._session = None
+            self._loop_objects = weakref.WeakKeyDictionary()
+        if client is not None:
+            client.close()
+        if session is not None:
+            session.close()
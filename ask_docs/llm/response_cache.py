@@ -0,0 +1,330 @@
+"""On-disk cache of LLM responses.
+
+``build_prompt`` is deterministic, so asking the same question against the
+same knowledge base produces the same prompt again. The response cache keeps
+answers in a SQLite database keyed by (provider, model, prompt hash,
+generation parameters) so that repeated prompts skip the network call.
+
+The database lives at a fixed path (``cache.path``, by default in
+``~/.docbuddy``) and is opened in WAL mode with a short connection per
+operation, so the CLI, TUI and web interface can share it from separate
+processes. Entries older than ``cache.ttl`` seconds are not returned, and the
+least recently used entries are evicted once the cached responses exceed
+``cache.max_size_mb``.
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from ask_docs.config import get_config
+
+DEFAULT_CACHE_PATH = os.path.join("~", ".docbuddy", "response_cache.sqlite3")
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+DEFAULT_CACHE_MAX_SIZE_MB = 100
+
+# A stream that fails part-way ends with an "Error with <provider> API: ..." piece
+_STREAM_ERROR = re.compile(r"Error with [\w ]+ API: ")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Open caches by database path
+_caches: Dict[str, "ResponseCache"] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache_config() -> Dict[str, Any]:
+    """Get the response cache configuration."""
+    return get_config().get("cache", {})
+
+
+class ResponseCache:
+    """SQLite-backed cache of LLM responses with a TTL and a size limit."""
+
+    def __init__(self, path: str, ttl: float = DEFAULT_CACHE_TTL,
+                 max_size_mb: float = DEFAULT_CACHE_MAX_SIZE_MB):
+        """Open (and if needed create) the cache database.
+
+        Args:
+            path: Path to the SQLite database file
+            ttl: Seconds a response stays valid, or 0 for no expiry
+            max_size_mb: Total size of cached responses before eviction, in MB
+        """
+        self.path = os.path.expanduser(path)
+        self.ttl = float(ttl)
+        self.max_bytes = int(float(max_size_mb) * 1024 * 1024)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection for one transaction; other processes may be writing too."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _expired_before(self, now: float) -> float:
+        """Creation time before which entries have expired."""
+        return now - self.ttl if self.ttl > 0 else float("-inf")
+
+    @staticmethod
+    def _increment(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute("INSERT INTO counters (name, value) VALUES (?, 1) "
+                     "ON CONFLICT (name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, or None if it is missing or expired."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] < self._expired_before(now):
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._increment(conn, "misses")
+                return None
+            conn.execute("UPDATE responses SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._increment(conn, "hits")
+            return row[0]
+
+    def put(self, key: str, provider: str, model: str, response: str) -> None:
+        """Store a response, then drop expired entries and evict down to the size limit."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, response, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, size, now, now)
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (self._expired_before(now),))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evict = []
+            for old_key, old_size in conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                if total <= self.max_bytes:
+                    break
+                evict.append((old_key,))
+                total -= old_size
+            conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+            conn.execute("INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+                         "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (len(evict),))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the size of the cache and its counters, totalled over every process using it.
+
+        Returns:
+            Dictionary with ``path``, ``entries``, ``size_bytes``, ``hits``,
+            ``misses``, ``evictions``, ``ttl``, ``max_size_mb`` and the number
+            of entries per provider in ``providers``
+        """
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+            providers = dict(conn.execute("SELECT provider, COUNT(*) FROM responses GROUP BY provider"))
+        return {
+            "path": self.path,
+            "entries": entries,
+            "size_bytes": size,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "ttl": self.ttl,
+            "max_size_mb": self.max_bytes / (1024 * 1024),
+            "providers": providers
+        }
+
+    def clear(self) -> int:
+        """Remove every cached response and reset the counters.
+
+        Returns:
+            Number of responses removed
+        """
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM responses").rowcount
+            conn.execute("DELETE FROM counters")
+        return removed
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the configured response cache, or None if caching is disabled."""
+    config = get_cache_config()
+    if not config.get("enabled", False):
+        return None
+    path = os.path.expanduser(config.get("path") or DEFAULT_CACHE_PATH)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ResponseCache(
+                path,
+                ttl=config.get("ttl", DEFAULT_CACHE_TTL),
+                max_size_mb=config.get("max_size_mb", DEFAULT_CACHE_MAX_SIZE_MB)
+            )
+        return cache
+
+
+def response_cache_key(llm: Any, prompt: str) -> str:
+    """Build the cache key for a prompt sent to an LLM.
+
+    Args:
+        llm: The LLM instance; its provider, model and generation parameters are part of the key
+        prompt: The prompt text
+
+    Returns:
+        Hex digest identifying the request
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    parts = [llm.provider, llm.model, prompt_hash, llm.generation_params()]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _is_cacheable(response: str) -> bool:
+    # Providers report failures as "Error..." answers, which must not be replayed
+    return bool(response) and not response.startswith("Error")
+
+
+def _is_stream_cacheable(pieces: List[str]) -> bool:
+    # A partial answer followed by a provider error must not be replayed either
+    return _is_cacheable("".join(pieces)) and not any(_STREAM_ERROR.match(piece) for piece in pieces)
+
+
+def cached_ask(llm: Any, prompt: str, use_cache: bool = True) -> str:
+    """Send a prompt to an LLM, answering from the response cache when possible.
+
+    Args:
+        llm: The LLM instance
+        prompt: The prompt to send
+        use_cache: Set to False to bypass the cache for this call
+
+    Returns:
+        The LLM's response as a string
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return llm.ask(prompt)
+
+    key = response_cache_key(llm, prompt)
+    response = cache.get(key)
+    if response is None:
+        response = llm.ask(prompt)
+        if _is_cacheable(response):
+            cache.put(key, llm.provider, llm.model, response)
+    return response
+
+
+def cached_stream(llm: Any, prompt: str, use_cache: bool = True) -> Iterator[str]:
+    """Stream a response from an LLM; a cached response is yielded in one piece.
+
+    Args:
+        llm: The LLM instance
+        prompt: The prompt to send
+        use_cache: Set to False to bypass the cache for this call
+
+    Yields:
+        Pieces of the response, in order
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        yield from llm.stream(prompt)
+        return
+
+    key = response_cache_key(llm, prompt)
+    response = cache.get(key)
+    if response is not None:
+        yield response
+        return
+
+    pieces = []
+    for piece in llm.stream(prompt):
+        pieces.append(piece)
+        yield piece
+    # Only a stream that ran to completion is stored
+    if _is_stream_cacheable(pieces):
+        cache.put(key, llm.provider, llm.model, "".join(pieces))
+
+
+async def cached_ask_async(llm: Any, prompt: str, use_cache: bool = True) -> str:
+    """Send a prompt to an LLM asynchronously, answering from the response cache when possible.
+
+    Cache lookups run in a worker thread, since SQLite may wait on another
+    process's write.
+
+    Args:
+        llm: The LLM instance
+        prompt: The prompt to send
+        use_cache: Set to False to bypass the cache for this call
+
+    Returns:
+        The LLM's response as a string
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return await llm.ask_async(prompt)
+
+    key = response_cache_key(llm, prompt)
+    response = await asyncio.to_thread(cache.get, key)
+    if response is None:
+        response = await llm.ask_async(prompt)
+        if _is_cacheable(response):
+            await asyncio.to_thread(cache.put, key, llm.provider, llm.model, response)
+    return response
+
+
+async def cached_stream_async(llm: Any, prompt: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """Stream a response from an LLM asynchronously; a cached response is yielded in one piece.
+
+    Args:
+        llm: The LLM instance
+        prompt: The prompt to send
+        use_cache: Set to False to bypass the cache for this call
+
+    Yields:
+        Pieces of the response, in order
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        async for piece in llm.stream_async(prompt):
+            yield piece
+        return
+
+    key = response_cache_key(llm, prompt)
+    response = await asyncio.to_thread(cache.get, key)
+    if response is not None:
+        yield response
+        return
+
+    pieces = []
+    async for piece in llm.stream_async(prompt):
+        pieces.append(piece)
+        yield piece
+    # Only a stream that ran to completion is stored
+    if _is_stream_cacheable(pieces):
+        await asyncio.to_thread(cache.put, key, llm.provider, llm.model, "".join(pieces))
@@ -1,6 +1,18 @@
 """Main module for AskDocs API."""
 
-from ask_docs.core import process_query, get_matching_documents, kb_info
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from ask_docs.core import (
+    ask_question as ask_question_with_result,
+    ask_question_async as ask_question_with_result_async,
+    process_query,
+    process_query_async,
+    stream_question,
+    stream_question_async,
+    get_matches,
+    kb_info
+)
 from ask_docs.config import get_default_model, get_prompt_template
 
 def ask_question(question: str, model: str = None, template_name: str = None) -> str:
@@ -19,6 +31,95 @@ def ask_question(question: str, model: str = None, template_name: str = None) ->
         
     return process_query(question, model, template_name)
 
+def ask_question_with_matches(question: str, model: str = None, template_name: str = None) -> Dict[str, Any]:
+    """Ask a question using AskDocs and get the answer together with its sources.
+    
+    Retrieval runs once: the chunks used to build the prompt are the ones returned.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use (defaults to config)
+        template_name: The prompt template to use (defaults to config)
+        
+    Returns:
+        Dict with the "answer", the "model" used and "chunks": the matching
+        chunks as dicts with "filename", "snippet" and, when semantic or
+        hybrid retrieval was used, "similarity"
+    """
+    if model is None:
+        model = get_default_model()
+        
+    return ask_question_with_result(question, model, template_name=template_name)
+
+def ask_question_stream(question: str, model: str = None, template_name: str = None) -> Iterator[str]:
+    """Ask a question using AskDocs and yield the answer as it is generated.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use (defaults to config)
+        template_name: The prompt template to use (defaults to config)
+        
+    Yields:
+        Pieces of the answer, in order
+    """
+    if model is None:
+        model = get_default_model()
+        
+    return stream_question(question, model, template_name=template_name)
+
+async def ask_question_with_matches_async(question: str, model: str = None, template_name: str = None,
+                                          executor: Optional[Executor] = None) -> Dict[str, Any]:
+    """Ask a question and get the answer with its sources, without blocking the event loop.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use (defaults to config)
+        template_name: The prompt template to use (defaults to config)
+        executor: Bounded pool to run retrieval on, or None for a default worker thread
+        
+    Returns:
+        Dict as returned by ``ask_question_with_matches``
+    """
+    if model is None:
+        model = get_default_model()
+        
+    return await ask_question_with_result_async(question, model, template_name=template_name,
+                                                executor=executor)
+
+def ask_question_stream_async(question: str, model: str = None, template_name: str = None,
+                              executor: Optional[Executor] = None) -> AsyncIterator[str]:
+    """Ask a question and iterate over the answer as it is generated, without blocking the event loop.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use (defaults to config)
+        template_name: The prompt template to use (defaults to config)
+        executor: Bounded pool to run retrieval on, or None for a default worker thread
+        
+    Returns:
+        Async iterator over pieces of the answer, in order
+    """
+    if model is None:
+        model = get_default_model()
+        
+    return stream_question_async(question, model, template_name=template_name, executor=executor)
+
+async def ask_question_async(question: str, model: str = None, template_name: str = None) -> str:
+    """Ask a question using AskDocs without blocking the event loop.
+    
+    Args:
+        question: The question to ask
+        model: The LLM model to use (defaults to config)
+        template_name: The prompt template to use (defaults to config)
+        
+    Returns:
+        The answer to the question
+    """
+    if model is None:
+        model = get_default_model()
+        
+    return await process_query_async(question, model, template_name)
+
 def preview_matches(question: str, top_k: int = 3) -> list:
     """Preview the top matching documents for a question.
     
@@ -29,7 +130,7 @@ def preview_matches(question: str, top_k: int = 3) -> list:
     Returns:
         List of (filename, snippet) tuples for the top matches
     """
-    return get_matching_documents(question, top_k)
+    return [(chunk["filename"], chunk["content"]) for chunk in get_matches(question, top_k)]
 
 def get_kb_info() -> dict:
     """Get information about the knowledge base.
@@ -1,4 +1,6 @@
 """Textual TUI application for AskDocs."""
+import asyncio
+
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Container, Horizontal, Vertical
@@ -6,7 +8,7 @@ from textual.screen import Screen, ModalScreen
 from textual.widgets import Header, Footer, Input, Button, Select, Static, Label, TextArea, OptionList, LoadingIndicator
 
 from ask_docs.config import get_config, get_default_model
-from ask_docs.main import ask_question, preview_matches, get_kb_info
+from ask_docs.main import ask_question_stream, preview_matches, get_kb_info
 from ask_docs.core import build_knowledge_base
 
 class ResultScreen(Screen):
@@ -21,7 +23,7 @@ class ResultScreen(Screen):
         
         Args:
             question: The question that was asked
-            answer: The answer from the LLM
+            answer: The answer from the LLM, or the start of it while it is streamed
             matches: List of matching documents
             model: The model used for the answer
         """
@@ -40,7 +42,7 @@ class ResultScreen(Screen):
             
             yield Label("Answer:", classes="section-header")
             with Container(classes="answer-container"):
-                yield Static(self.answer, classes="answer")
+                yield Static(self.answer, classes="answer", id="answer")
             
             yield Label("Sources:", classes="section-header")
             with Container(classes="sources-container"):
@@ -59,6 +61,15 @@ class ResultScreen(Screen):
     def on_mount(self) -> None:
         """Called when the screen is mounted."""
         self.title = "AskDocs - Result"
+    
+    def append_answer(self, text: str) -> None:
+        """Add the next piece of a streamed answer.
+        
+        Args:
+            text: Text to append to the answer shown
+        """
+        self.answer += text
+        self.query_one("#answer", Static).update(self.answer)
 
 
 class PreviewScreen(Screen):
@@ -298,25 +309,43 @@ class AskDocsApp(App):
             self.push_screen(loading)
             
             try:
-                # Get answer from AskDocs
-                answer = ask_question(question, model, template)
-                
                 # Get matching documents
-                matches = preview_matches(question, 3)
-                
-                # Show result screen
-                result_screen = ResultScreen(question, answer, matches, model)
-                self.switch_screen(result_screen)
+                matches = await asyncio.to_thread(preview_matches, question, 3)
             except Exception as e:
                 # Handle errors
                 error_msg = f"Error: {str(e)}"
                 self.notify(error_msg, title="Error", severity="error")
+                return
             finally:
                 # Remove loading screen
                 self.pop_screen()
+            
+            # Show the result screen right away and fill in the answer as it arrives
+            result_screen = ResultScreen(question, "", matches, model)
+            self.push_screen(result_screen)
+            self.run_worker(
+                lambda: self.stream_answer(result_screen, question, model, template),
+                thread=True
+            )
         
         self.run_worker(ask_task())
     
+    def stream_answer(self, screen: ResultScreen, question: str, model: str, template: str) -> None:
+        """Stream an answer into a result screen; runs in a worker thread.
+        
+        Args:
+            screen: Result screen showing the answer
+            question: The question to ask
+            model: The LLM model to use
+            template: The prompt template to use
+        """
+        try:
+            for piece in ask_question_stream(question, model, template):
+                self.call_from_thread(screen.append_answer, piece)
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            self.call_from_thread(self.notify, error_msg, title="Error", severity="error")
+    
     async def preview_matches(self) -> None:
         """Handle previewing matches."""
         question = self.query_one("#question-input").value
@@ -354,7 +383,21 @@ class AskDocsApp(App):
         self.push_screen(KBInfoScreen())
 
 
-def run_app() -> None:
-    """Run the AskDocs TUI app."""
+def run_app(watch: bool = False) -> None:
+    """Run the AskDocs TUI app.
+    
+    Args:
+        watch: Update the knowledge base as documents change
+    """
+    watcher = None
+    if watch:
+        from ask_docs.core.watcher import SourceWatcher
+        watcher = SourceWatcher()
+        watcher.start()
+    
     app = AskDocsApp()
-    app.run()
\ No newline at end of file
+    try:
+        app.run()
+    finally:
+        if watcher is not None:
+            watcher.stop()
\ No newline at end of file
@@ -1,9 +1,13 @@
 """FastHTML web app for AskDocs."""
 from fasthtml.common import *
 from ask_docs.config import get_config
+from ask_docs.core import warmup_embedding_models
+from ask_docs.web.workers import shutdown_workers
 from ask_docs.web.handlers import (
     get_index,
     post_question,
+    post_api_ask,
+    get_ask_stream,
     get_model_info,
     get_templates,
     get_preview,
@@ -31,6 +35,8 @@ def create_app():
     # Routes - Server-side only, no JavaScript required
     rt("/")(get_index)
     rt("/ask", methods=["POST"])(post_question)
+    rt("/ask-stream")(get_ask_stream)
+    rt("/api/ask", methods=["POST"])(post_api_ask)
     rt("/model-info")(get_model_info)
     rt("/templates")(get_templates)
     rt("/preview")(get_preview)
@@ -46,12 +52,13 @@ def create_app():
     
     return app
 
-def serve_app(host=None, port=None):
+def serve_app(host=None, port=None, watch=None):
     """Serve the FastHTML app.
     
     Args:
         host: Host to serve on (defaults to config)
         port: Port to serve on (defaults to config)
+        watch: Update the knowledge base as documents change (defaults to config)
     """
     config = get_config()
     web_config = config.get("web", {})
@@ -62,11 +69,28 @@ def serve_app(host=None, port=None):
     if port is None:
         port = web_config.get("port", 8000)
     
+    if watch is None:
+        watch = web_config.get("watch", False)
+    
     print(f"Starting AskDocs web server at http://{host}:{port}")
     print("Press Ctrl+C to stop the server")
     
+    # Load the embedding model before the first request arrives
+    warmup_embedding_models()
+    
+    watcher = None
+    if watch:
+        from ask_docs.core.watcher import SourceWatcher
+        watcher = SourceWatcher()
+        watcher.start()
+    
     app = create_app()
-    serve(app=app, host=host, port=port)
+    try:
+        serve(app=app, host=host, port=port)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        shutdown_workers()
 
 if __name__ == "__main__":
     serve_app()
\ No newline at end of file
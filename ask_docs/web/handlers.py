@@ -1,8 +1,15 @@
-"""FastHTML request handlers for AskDocs web interface."""
+"""FastHTML request handlers for AskDocs web interface.
+
+Handlers that answer questions or search the knowledge base are async: the
+blocking parts run on the bounded pools in ``ask_docs.web.workers`` and LLM
+calls are awaited, so slow answers do not hold up other requests.
+"""
 from fasthtml.common import *
-from ask_docs.main import ask_question, preview_matches
+from starlette.responses import JSONResponse
+from ask_docs.main import ask_question_with_matches_async, ask_question_stream_async, preview_matches
 from ask_docs.config import get_config
 from ask_docs.core import kb_info
+from ask_docs.web.workers import get_retrieval_executor, question_slots, run_blocking
 
 def get_index(request):
     """Render the index page."""
@@ -16,11 +23,12 @@ def get_index(request):
         default_model=config["llm"]["default_model"]
     )
 
-def post_question(request):
+async def post_question(request):
     """Process a question from the user."""
-    question = request.form.get("question", "")
-    model = request.form.get("model", None)
-    template = request.form.get("template", None)
+    form = await request.form()
+    question = form.get("question", "")
+    model = form.get("model", None)
+    template = form.get("template", None)
     
     if not question:
         return render_template(
@@ -31,14 +39,12 @@ def post_question(request):
         )
     
     try:
-        # Get the answer
-        answer = ask_question(question, model, template)
-        
-        # Get the matching documents
-        matches = preview_matches(question, 3)
-        
-        # Format matches for template
-        match_data = [{"filename": fname, "snippet": snippet} for fname, snippet in matches]
+        # One retrieval pass builds the prompt and supplies the matches shown with the answer
+        async with question_slots():
+            result = await ask_question_with_matches_async(question, model, template,
+                                                           executor=get_retrieval_executor())
+        answer = result["answer"]
+        match_data = result["chunks"]
         
         return render_template(
             "index.html",
@@ -61,13 +67,70 @@ def post_question(request):
             error=f"Error: {str(e)}"
         )
 
+async def post_api_ask(request):
+    """Answer a question as JSON, with the scored chunks the answer was based on.
+    
+    Expects a JSON body with "question" and optionally "model" and
+    "template"; responds with the result of ``ask_question_with_matches_async``.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict) or not body.get("question"):
+        return JSONResponse({"error": "Please enter a question"}, status_code=400)
+    
+    try:
+        async with question_slots():
+            result = await ask_question_with_matches_async(
+                body["question"], body.get("model"), body.get("template"),
+                executor=get_retrieval_executor()
+            )
+    except Exception as e:
+        return JSONResponse({"error": f"Error: {str(e)}"}, status_code=500)
+    return JSONResponse(result)
+
+async def get_ask_stream(request):
+    """Stream the answer to a question as server-sent events.
+    
+    Each ``message`` event carries the next piece of the answer. A ``done``
+    event follows once the answer is complete, or an ``error`` event if the
+    question could not be answered.
+    """
+    question = request.query_params.get("question", "")
+    model = request.query_params.get("model") or None
+    template = request.query_params.get("template") or None
+    
+    if not question:
+        return EventStream(iter([_sse_event("Please enter a question", "error")]))
+    
+    async def events():
+        try:
+            # The slot is held until the whole answer has been streamed
+            async with question_slots():
+                async for piece in ask_question_stream_async(question, model, template,
+                                                             executor=get_retrieval_executor()):
+                    yield _sse_event(piece)
+            yield _sse_event("", "done")
+        except Exception as e:
+            yield _sse_event(f"Error: {str(e)}", "error")
+    
+    return EventStream(events())
+
+def _sse_event(data: str, event: str = "message") -> str:
+    """Format a server-sent event, splitting multi-line data over several data fields."""
+    lines = "\n".join(f"data: {line}" for line in data.split("\n"))
+    if event == "message":
+        return f"{lines}\n\n"
+    return f"event: {event}\n{lines}\n\n"
+
 def get_model_info(request):
     """Get information about available models."""
     config = get_config()
     
     models = {}
     for provider, provider_config in config["llm"].items():
-        if provider == "default_model":
+        if not isinstance(provider_config, dict):
             continue
             
         models[provider] = {
@@ -97,10 +160,10 @@ def get_templates(request):
         templates=templates
     )
 
-def get_preview(request):
+async def get_preview(request):
     """Preview matching documents for a question."""
-    question = request.args.get("question", "")
-    top_k = int(request.args.get("top_k", "3"))
+    question = request.query_params.get("question", "")
+    top_k = int(request.query_params.get("top_k", "3"))
     
     if not question:
         return render_template(
@@ -111,7 +174,7 @@ def get_preview(request):
         )
     
     try:
-        matches = preview_matches(question, top_k)
+        matches = await run_blocking(preview_matches, question, top_k)
         match_data = [{"filename": fname, "snippet": snippet} for fname, snippet in matches]
         
         return render_template(
@@ -130,9 +193,10 @@ def get_preview(request):
             error=f"Error: {str(e)}"
         )
 
-def get_kb_status(request):
+async def get_kb_status(request):
     """Get knowledge base status."""
-    info = kb_info()
+    # Counting the documents reads the whole source directory
+    info = await run_blocking(kb_info)
     
     return render_template(
         "kb_status.html",
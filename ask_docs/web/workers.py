@@ -0,0 +1,78 @@
+"""Bounded worker pools for the AskDocs web handlers.
+
+The handlers run on the server's event loop and must not block it. Work that
+blocks, such as loading the knowledge base, embedding the question and
+searching, runs on one shared thread pool of ``web.retrieval_workers``
+threads. NumPy and the embedding model release the GIL while they compute,
+so these threads run in parallel. LLM calls are awaited through the
+providers' async clients and hold no thread while they wait.
+
+At most ``web.max_concurrent_questions`` questions are answered at once.
+Further requests wait for a free slot, so a burst of questions cannot open
+an unbounded number of connections to the LLM provider.
+"""
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ask_docs.config import get_config
+
+DEFAULT_RETRIEVAL_WORKERS = 8
+DEFAULT_MAX_CONCURRENT_QUESTIONS = 256
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Semaphores are bound to the event loop they are first awaited on
+_question_slots: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_worker_settings() -> Dict[str, int]:
+    """Get the configured retrieval thread count and question limit."""
+    web_config = get_config().get("web", {})
+    return {
+        "retrieval_workers": max(1, int(web_config.get("retrieval_workers", DEFAULT_RETRIEVAL_WORKERS))),
+        "max_concurrent_questions": max(1, int(web_config.get("max_concurrent_questions",
+                                                              DEFAULT_MAX_CONCURRENT_QUESTIONS)))
+    }
+
+
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """Get the thread pool for blocking retrieval work, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_worker_settings()["retrieval_workers"],
+                                           thread_name_prefix="askdocs-retrieval")
+        return _executor
+
+
+def question_slots() -> asyncio.Semaphore:
+    """Get the semaphore limiting questions answered at once on the running event loop.
+
+    Raises:
+        RuntimeError: If no event loop is running
+    """
+    loop = asyncio.get_running_loop()
+    with _executor_lock:
+        slots = _question_slots.get(loop)
+        if slots is None:
+            slots = _question_slots[loop] = asyncio.Semaphore(get_worker_settings()["max_concurrent_questions"])
+        return slots
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking function on the retrieval thread pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_retrieval_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_workers() -> None:
+    """Shut down the retrieval thread pool; it is recreated on next use."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
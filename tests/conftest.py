@@ -0,0 +1,10 @@
+"""Shared test fixtures."""
+import pytest
+
+from ask_docs.config import get_config
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    """Keep tests from reading or writing the user's LLM response cache, even if their config enables it."""
+    monkeypatch.setitem(get_config()["cache"], "enabled", False)
@@ -67,4 +67,48 @@ def test_cli_preview(mock_preview):
     assert "file1.txt" in result.stdout
     assert "file2.txt" in result.stdout
     assert "This is sample content from file 1." in result.stdout
-    assert "This is sample content from file 2." in result.stdout
\ No newline at end of file
+    assert "This is sample content from file 2." in result.stdout
+
+def test_cli_cache_stats_and_clear(tmp_path, monkeypatch):
+    """Test the CLI cache stats and clear commands."""
+    from ask_docs.config import get_config
+    from ask_docs.llm.response_cache import get_response_cache
+    monkeypatch.setitem(get_config(), "cache", {"enabled": True, "path": str(tmp_path / "cache.sqlite3")})
+    get_response_cache().put("key", "openai", "gpt", "cached answer")
+    
+    result = runner.invoke(app, ["cache", "stats", "--json"])
+    assert result.exit_code == 0
+    assert '"entries": 1' in result.stdout
+    
+    result = runner.invoke(app, ["cache", "clear"])
+    assert result.exit_code == 0
+    assert "Removed 1 cached responses" in result.stdout
+    assert get_response_cache().stats()["entries"] == 0
+
+@patch('ask_docs.cli.main.ask_many')
+def test_cli_ask_batch(mock_ask_many, tmp_path):
+    """Test that ask-batch reads JSONL questions and writes one JSON answer per line."""
+    import json
+    mock_ask_many.return_value = iter([
+        {"index": 1, "question": "Second?", "answer": "B"},
+        {"index": 0, "question": "First?", "answer": "A"},
+    ])
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text('{"id": "q1", "question": "First?"}\n\n"Second?"\n')
+    
+    result = runner.invoke(app, ["ask-batch", str(questions), "--model", "ollama", "--concurrency", "3"])
+    
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    assert [(line["answer"], line.get("id")) for line in lines] == [("B", None), ("A", "q1")]
+    assert mock_ask_many.call_args.args[0] == ["First?", "Second?"]
+    assert mock_ask_many.call_args.kwargs["max_concurrency"] == 3
+
+@pytest.mark.parametrize("args, watch", [([], None), (["--watch"], True), (["-w"], True), (["--no-watch"], False)])
+def test_cli_web_watch_defaults_to_config(args, watch):
+    """Test that the web command leaves --watch to the web.watch setting unless it is given."""
+    with patch("ask_docs.web.app.serve_app") as mock_serve:
+        result = runner.invoke(app, ["web"] + args)
+    
+    assert result.exit_code == 0
+    mock_serve.assert_called_once_with(host=None, port=None, watch=watch)
@@ -2,8 +2,20 @@
 import os
 import tempfile
 import pytest
+from unittest.mock import patch, MagicMock
 from pathlib import Path
-from ask_docs.core.document_retrieval import load_documents, get_best_chunks
+from ask_docs.core.document_retrieval import list_documents, load_documents, get_best_chunks
+from ask_docs.core.embeddings import clear_query_cache
+from ask_docs.core.retrieval_cache import clear_retrieval_cache, retrieval_cache_stats
+
+@pytest.fixture(autouse=True)
+def empty_query_cache():
+    """Keep cached query embeddings and rankings from leaking between tests."""
+    clear_query_cache()
+    clear_retrieval_cache()
+    yield
+    clear_query_cache()
+    clear_retrieval_cache()
 
 def test_load_documents_empty_dir():
     """Test loading documents from an empty directory."""
@@ -54,6 +66,36 @@ def test_load_documents_skips_binary():
         assert len(docs) == 1
         assert docs[0]["filename"] == "text.txt"
 
+def test_load_documents_prunes_ignored_paths():
+    """Test that hidden, excluded and git-ignored paths are not loaded."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        for rel_path in ["guide.md", "api/ref.md", "api/build/out.md", "node_modules/pkg/README.md",
+                         ".git/HEAD", "notes.log", "drafts/keep.md", "drafts/skip.md"]:
+            (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+            (root / rel_path).write_text("text")
+        (root / ".gitignore").write_text("*.log\nbuild/\ndrafts/*\n!drafts/keep.md\n")
+        
+        docs = load_documents(temp_dir)
+        
+        assert [Path(d["filename"]).as_posix() for d in docs] == ["api/ref.md", "drafts/keep.md", "guide.md"]
+        # Listing applies the same rules without reading the files
+        assert list_documents(temp_dir) == ["api/ref.md", "drafts/keep.md", "guide.md"]
+
+def test_crawl_files_include_exclude():
+    """Test include and exclude globs."""
+    from ask_docs.core.crawler import crawl_files
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        for rel_path in ["a.md", "b.txt", "sub/c.md", "sub/old/d.md"]:
+            (root / rel_path).parent.mkdir(parents=True, exist_ok=True)
+            (root / rel_path).write_text("text")
+        
+        files = crawl_files(temp_dir, include=["*.md"], exclude=["sub/old"])
+        
+        assert files == ["a.md", "sub/c.md"]
+
 def test_get_best_chunks():
     """Test getting best chunks based on a query."""
     docs = [
@@ -81,4 +123,306 @@ def test_get_best_chunks():
     # Test with top_n parameter
     results = get_best_chunks(docs, query, top_n=1)
     assert len(results) == 1
-    assert results[0]["filename"] == "file1.txt"
\ No newline at end of file
+    assert results[0]["filename"] == "file1.txt"
+
+def test_top_k_indices_matches_full_sort():
+    """Test that the partial sort returns the same order as a full sort."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.vector_search import top_k_indices
+    
+    scores = np.random.default_rng(0).random(1000)
+    expected = np.argsort(-scores)[:10]
+    
+    assert list(top_k_indices(scores, 10)) == list(expected)
+    assert len(top_k_indices(scores[:3], 10)) == 3
+
+def test_get_best_chunks_semantic():
+    """Test semantic search over a chunk table's embedding matrix."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.chunk_table import ChunkTable
+    
+    chunks = [
+        {"filename": "a.txt", "content": "alpha", "chunk_id": 0, "embedding": [1.0, 0.0]},
+        {"filename": "b.txt", "content": "beta", "chunk_id": 0, "embedding": [0.0, 2.0]},
+        {"filename": "c.txt", "content": "gamma", "chunk_id": 0, "embedding": [1.0, 1.0]},
+    ]
+    table = ChunkTable.from_chunks(chunks)
+    assert table.embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(table.embeddings, axis=1), 1.0)
+    
+    model = MagicMock()
+    model.encode.return_value = np.array([0.0, 3.0])
+    with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+        results = get_best_chunks(table, "query", top_n=2)
+    
+    assert [r["filename"] for r in results] == ["b.txt", "c.txt"]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+
+def test_bm25_index_scores_only_matching_chunks():
+    """Test that the BM25 index ranks chunks containing the query terms."""
+    from ask_docs.core.lexical_index import BM25Index
+    
+    index = BM25Index.build([
+        "The WSYNC register halts the CPU.",
+        "Missiles are drawn with the missile graphics registers.",
+        "Playfield graphics cover the background.",
+    ])
+    
+    indices, scores = index.search("How do I draw missiles?", top_n=3)
+    assert list(indices) == [1]
+    assert scores[0] > 0
+    
+    indices, _ = index.search("playfield graphics", top_n=3)
+    assert list(indices) == [2, 1]
+
+def test_bm25_index_save_and_load():
+    """Test that a saved BM25 index gives the same results when loaded."""
+    from ask_docs.core.lexical_index import BM25Index
+    
+    texts = ["alpha beta", "beta gamma", "gamma delta delta"]
+    index = BM25Index.build(texts)
+    with tempfile.TemporaryDirectory() as kb_dir:
+        index.save(kb_dir)
+        loaded = BM25Index.load(kb_dir)
+        
+        for query in ["beta", "delta gamma", "missing"]:
+            expected = index.search(query, 3)
+            actual = loaded.search(query, 3)
+            assert list(actual[0]) == list(expected[0])
+            assert list(actual[1]) == pytest.approx(list(expected[1]))
+
+def test_bm25_index_update_matches_build():
+    """Test that updating a BM25 index ranks like an index built over the resulting texts."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.lexical_index import BM25Index
+    
+    texts = ["alpha beta", "beta gamma", "gamma delta delta", "epsilon alpha"]
+    index = BM25Index.build(texts)
+    keep = np.array([True, False, True, True])
+    added = ["delta zeta", "alpha zeta zeta"]
+    updated = index.update(keep, added)
+    built = BM25Index.build([t for t, k in zip(texts, keep) if k] + added)
+    
+    for query in ["alpha", "beta", "delta zeta", "gamma epsilon", "missing"]:
+        expected = built.search(query, 5)
+        actual = updated.search(query, 5)
+        assert list(actual[0]) == list(expected[0])
+        assert list(actual[1]) == pytest.approx(list(expected[1]))
+
+def test_ivf_index_update_drops_and_adds_rows():
+    """Test that an updated IVF index lists every kept and new row once, renumbered."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.ann_index import IVFFlatIndex
+    from ask_docs.core.vector_search import normalize_rows
+    
+    rng = np.random.default_rng(0)
+    embeddings = normalize_rows(rng.normal(size=(200, 8)))
+    index = IVFFlatIndex.build(embeddings, nlist=8)
+    keep = np.ones(200, dtype=bool)
+    keep[::3] = False
+    new_rows = normalize_rows(rng.normal(size=(10, 8)))
+    updated = index.update(keep, new_rows)
+    combined = np.vstack([embeddings[keep], new_rows])
+    
+    assert sorted(updated.ids) == list(range(len(combined)))
+    # New rows are listed under their nearest centroid
+    for row in range(int(keep.sum()), len(combined)):
+        position = int(np.flatnonzero(updated.ids == row)[0])
+        list_id = int(np.searchsorted(updated.offsets, position, side="right") - 1)
+        assert list_id == int(np.argmax(index.centroids @ combined[row]))
+    
+    with patch("ask_docs.core.ann_index._ann_setting", side_effect=lambda name, default: default):
+        indices, scores = updated.search(combined, combined[-1], 1)
+    assert list(indices) == [len(combined) - 1]
+
+def test_ivf_index_recall():
+    """Test that the NumPy IVF index finds the exact nearest neighbours on clustered data."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.ann_index import IVFFlatIndex
+    from ask_docs.core.vector_search import cosine_top_k, normalize_rows
+    
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 16))
+    embeddings = normalize_rows(centers[rng.integers(0, 20, 2000)] + 0.2 * rng.normal(size=(2000, 16)))
+    index = IVFFlatIndex.build(embeddings)
+    
+    with patch("ask_docs.core.ann_index._ann_setting", side_effect=lambda name, default: default):
+        for query in embeddings[:10]:
+            exact, _ = cosine_top_k(embeddings, query, 5)
+            approx, _ = index.search(embeddings, query, 5)
+            assert set(approx) == set(exact)
+
+def test_get_best_chunks_uses_ann_index():
+    """Test that large tables are searched through their ANN index."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.chunk_table import ChunkTable
+    
+    table = ChunkTable.from_chunks([
+        {"filename": "a.txt", "content": "alpha", "chunk_id": 0, "embedding": [1.0, 0.0]},
+        {"filename": "b.txt", "content": "beta", "chunk_id": 0, "embedding": [0.0, 1.0]},
+    ])
+    table.ann_index = MagicMock()
+    table.ann_index.search.return_value = (np.array([1]), np.array([0.5]))
+    model = MagicMock()
+    model.encode.return_value = np.array([1.0, 0.0])
+    
+    with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model), \
+         patch("ask_docs.core.document_retrieval.use_ann", return_value=True):
+        results = get_best_chunks(table, "query", top_n=1)
+    
+    assert [r["filename"] for r in results] == ["b.txt"]
+    table.ann_index.search.assert_called_once()
+
+def test_reciprocal_rank_fusion():
+    """Test that items ranked well by both rankings come first."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.vector_search import reciprocal_rank_fusion
+    
+    indices, scores = reciprocal_rank_fusion([np.array([3, 1, 2]), np.array([1, 4, 3])], 3)
+    
+    assert list(indices) == [1, 3, 4]
+    assert scores[0] == pytest.approx(1 / 62 + 1 / 61)
+
+def test_get_best_chunks_hybrid():
+    """Test that hybrid mode combines lexical and semantic matches."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.chunk_table import ChunkTable
+    
+    table = ChunkTable.from_chunks([
+        {"filename": "a.txt", "content": "WSYNC halts the CPU", "chunk_id": 0, "embedding": [0.0, 1.0]},
+        {"filename": "b.txt", "content": "Timing the beam", "chunk_id": 0, "embedding": [1.0, 0.0]},
+        {"filename": "c.txt", "content": "Unrelated text", "chunk_id": 0, "embedding": [-1.0, 0.0]},
+    ])
+    model = MagicMock()
+    model.encode.return_value = np.array([1.0, 0.2])
+    
+    with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+        results = get_best_chunks(table, "WSYNC timing", top_n=2, mode="hybrid")
+    
+    assert {r["filename"] for r in results} == {"a.txt", "b.txt"}
+    
+    with pytest.raises(ValueError):
+        get_best_chunks(table, "WSYNC", mode="unknown")
+
+def test_get_best_chunks_caches_rankings_per_version():
+    """Test that saved knowledge bases reuse rankings until their version changes."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.chunk_table import ChunkTable
+    
+    table = ChunkTable.from_chunks([
+        {"filename": "a.txt", "content": "WSYNC halts the CPU", "chunk_id": 0, "embedding": [1.0, 0.0]},
+        {"filename": "b.txt", "content": "Timing the beam", "chunk_id": 0, "embedding": [0.0, 1.0]},
+    ])
+    table.version = "v1"
+    
+    with patch("ask_docs.core.document_retrieval._semantic_search",
+               return_value=(np.array([1]), np.array([0.9]))) as search:
+        first = get_best_chunks(table, "beam timing", top_n=1, mode="semantic")
+        second = get_best_chunks(table, " beam  timing ", top_n=1, mode="semantic")
+        table.version = "v2"
+        get_best_chunks(table, "beam timing", top_n=1, mode="semantic")
+    
+    assert first == second
+    assert first[0]["filename"] == "b.txt"
+    assert search.call_count == 2
+    assert retrieval_cache_stats()["hits"] == 1
+
+def test_get_best_chunks_cache_key_includes_ranking_settings():
+    """Test that changing a query-time ranking setting bypasses cached rankings."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.config import DEFAULT_CONFIG
+    from ask_docs.core.chunk_table import ChunkTable
+    
+    table = ChunkTable.from_chunks([
+        {"filename": "a.txt", "content": "WSYNC halts the CPU", "chunk_id": 0, "embedding": [1.0, 0.0]},
+        {"filename": "b.txt", "content": "Timing the beam", "chunk_id": 0, "embedding": [0.0, 1.0]},
+    ])
+    table.version = "v1"
+    config = dict(DEFAULT_CONFIG["rag"])
+    
+    with patch("ask_docs.core.document_retrieval._semantic_search",
+               return_value=(np.array([1]), np.array([0.9]))) as search, \
+         patch("ask_docs.core.document_retrieval.get_rag_config", return_value=config), \
+         patch("ask_docs.core.retrieval_cache.get_rag_config", return_value=config):
+        get_best_chunks(table, "beam timing", top_n=1, mode="semantic")
+        config["ann_nprobe"] = 32
+        get_best_chunks(table, "beam timing", top_n=1, mode="semantic")
+        config["rrf_k"] = 10
+        get_best_chunks(table, "beam timing", top_n=1, mode="semantic")
+        get_best_chunks(table, "beam timing", top_n=1, mode="semantic")
+    
+    assert search.call_count == 3
+    assert retrieval_cache_stats()["hits"] == 1
+
+def test_chunk_table_rows_behave_like_chunk_dicts():
+    """Test that table rows are lightweight views with the chunk dictionary API."""
+    from ask_docs.core.chunk_table import ChunkTable
+
+    chunks = [
+        {"filename": "a.md", "content": "First chunk", "chunk_id": 0, "filepath": "/d/a.md", "file_type": ".md"},
+        {"filename": "a.md", "content": "Second chunk", "chunk_id": 1, "filepath": "/d/a.md", "file_type": ".md"},
+    ]
+    table = ChunkTable.from_chunks(chunks)
+    row = table.row(1, similarity=0.5)
+
+    assert len(table.documents) == 1
+    assert row.content == "Second chunk"
+    assert row["filename"] == "a.md"
+    assert row.get("missing", "default") == "default"
+    assert dict(row) == dict(chunks[1], similarity=0.5)
+    assert table[0] == chunks[0]
+    assert not hasattr(row, "__dict__")
+    assert table.to_chunks() == chunks
+
+def test_chunk_table_filter_and_top_k():
+    """Test vectorized filtering and top-k selection on a chunk table."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.chunk_table import ChunkTable
+
+    table = ChunkTable.from_chunks([
+        {"filename": "a.md", "content": "one", "chunk_id": 0, "file_type": ".md", "embedding": [1.0, 0.0]},
+        {"filename": "b.txt", "content": "two", "chunk_id": 0, "file_type": ".txt", "embedding": [0.0, 1.0]},
+        {"filename": "c.md", "content": "three", "chunk_id": 0, "file_type": ".md", "embedding": [1.0, 1.0]},
+    ])
+
+    markdown = table.filter(file_types=[".md"])
+    assert [r["content"] for r in markdown] == ["one", "three"]
+    assert markdown.embeddings.shape == (2, 2)
+
+    scores = np.array([0.1, 0.9, 0.5])
+    assert [r["content"] for r in table.top_k(scores, 2)] == ["two", "three"]
+    best = table.top_k(scores, 5, mask=table.document_mask(file_types=[".md"]))
+    assert [(r["content"], r["similarity"]) for r in best] == [("three", 0.5), ("one", 0.1)]
+
+def test_get_best_chunks_many_matches_single_queries():
+    """Test that batched retrieval embeds all queries at once and ranks like get_best_chunks."""
+    np = pytest.importorskip("numpy")
+    from ask_docs.core.chunk_table import ChunkTable
+    from ask_docs.core.document_retrieval import get_best_chunks_many
+    from ask_docs.core.embeddings import clear_query_cache
+    clear_query_cache()
+    
+    table = ChunkTable.from_chunks([
+        {"filename": "a.txt", "content": "WSYNC halts the CPU", "chunk_id": 0, "embedding": [1.0, 0.0]},
+        {"filename": "b.txt", "content": "Timing the beam", "chunk_id": 0, "embedding": [0.0, 1.0]},
+        {"filename": "c.txt", "content": "Colour clocks", "chunk_id": 0, "embedding": [1.0, 1.0]},
+    ])
+    vectors = {"wsync": [1.0, 0.1], "beam": [0.1, 1.0], "both": [1.0, 0.9]}
+    model = MagicMock()
+    model.encode.side_effect = lambda texts: np.array([vectors[t] for t in texts])
+    
+    with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+        batched = get_best_chunks_many(table, ["wsync", "beam", "both"], top_n=2, mode="semantic")
+    
+    assert model.encode.call_count == 1
+    assert [[r["filename"] for r in results] for results in batched] == [
+        ["a.txt", "c.txt"], ["b.txt", "c.txt"], ["c.txt", "a.txt"]
+    ]
+    
+    single = MagicMock()
+    single.encode.side_effect = lambda text: np.array(vectors[text])
+    clear_query_cache()
+    with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=single):
+        for query, results in zip(["wsync", "beam", "both"], batched):
+            expected = get_best_chunks(table, query, top_n=2, mode="semantic")
+            assert [r["similarity"] for r in results] == pytest.approx([r["similarity"] for r in expected])
@@ -0,0 +1,118 @@
+"""Tests for the embedding model registry."""
+import threading
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ask_docs.core import embeddings
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    """Start and finish every test with an empty model registry."""
+    embeddings.clear_embedding_models()
+    yield
+    embeddings.clear_embedding_models()
+
+
+def test_get_embedding_model_loads_once():
+    """Test that concurrent requests for the same model load it only once."""
+    calls = []
+
+    def slow_load(model_name):
+        calls.append(model_name)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    with patch("ask_docs.core.embeddings._load_model", side_effect=slow_load):
+        threads = [
+            threading.Thread(target=lambda: results.append(embeddings.get_embedding_model("m")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert calls == ["m"]
+    assert len(results) == 8
+    assert all(model is results[0] for model in results)
+
+
+def test_get_embedding_model_evicts_least_recently_used():
+    """Test that the registry evicts the least recently used model."""
+    with patch("ask_docs.core.embeddings._load_model", side_effect=lambda name: object()), \
+         patch("ask_docs.core.embeddings._get_max_loaded_models", return_value=2):
+        embeddings.get_embedding_model("a")
+        embeddings.get_embedding_model("b")
+        embeddings.get_embedding_model("a")  # "b" is now least recently used
+        embeddings.get_embedding_model("c")
+
+    assert embeddings.loaded_embedding_models() == ["a", "c"]
+
+
+def test_warmup_embedding_models():
+    """Test that warmup loads the requested models."""
+    with patch("ask_docs.core.embeddings._load_model", side_effect=lambda name: object()):
+        loaded = embeddings.warmup_embedding_models(["a", "b"])
+
+    assert loaded == ["a", "b"]
+    assert embeddings.loaded_embedding_models() == ["a", "b"]
+
+
+def test_encode_query_cache():
+    """Test that repeated queries are served from the query embedding cache."""
+    embeddings.clear_query_cache()
+    model = MagicMock()
+    model.encode.side_effect = lambda text: np.array([float(len(text))])
+
+    first = embeddings.encode_query(model, "m", "How does  WSYNC work?")
+    second = embeddings.encode_query(model, "m", " How does WSYNC work? ")
+    embeddings.encode_query(model, "other", "How does WSYNC work?")
+
+    assert first is second
+    assert model.encode.call_count == 2
+    assert embeddings.query_cache_stats() == {"hits": 1, "misses": 2, "size": 2}
+
+
+def test_encode_query_cache_evicts_least_recently_used():
+    """Test that the query cache respects its size limit."""
+    embeddings.clear_query_cache()
+    model = MagicMock()
+    model.encode.side_effect = lambda text: np.array([1.0])
+
+    with patch("ask_docs.core.embeddings.get_rag_config", return_value={"query_cache_size": 2}):
+        for query in ["a", "b", "a", "c"]:
+            embeddings.encode_query(model, "m", query)
+        embeddings.encode_query(model, "m", "b")
+
+    assert embeddings.query_cache_stats()["misses"] == 4
+
+
+def test_batch_encoder_sorts_by_length_and_restores_order():
+    """Test that texts are encoded longest first and returned in their original order."""
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, batch_size: np.array([[len(t)] for t in texts], dtype=float)
+
+    with embeddings.BatchEncoder(model, batch_size=8) as encoder:
+        result = encoder.encode(["bb", "a", "dddd", "ccc"])
+
+    assert model.encode.call_args.args[0] == ["dddd", "ccc", "bb", "a"]
+    assert model.encode.call_args.kwargs["batch_size"] == 8
+    assert result[:, 0].tolist() == [2, 1, 4, 3]
+    assert encoder.num_encoded == 4
+
+
+def test_batch_encoder_uses_multi_process_pool():
+    """Test that several jobs encode through a sentence-transformers process pool."""
+    model = MagicMock()
+    model.encode_multi_process.side_effect = lambda texts, pool, batch_size: np.zeros((len(texts), 2))
+
+    with embeddings.BatchEncoder(model, batch_size=4, jobs=3) as encoder:
+        encoder.encode(["x", "y"])
+
+    model.start_multi_process_pool.assert_called_once_with(target_devices=["cpu"] * 3)
+    model.stop_multi_process_pool.assert_called_once()
+    model.encode.assert_not_called()
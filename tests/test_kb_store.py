@@ -0,0 +1,487 @@
+"""Tests for knowledge base storage."""
+import json
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+from ask_docs.core import kb_store
+from ask_docs.core.chunk_table import ChunkTable
+from ask_docs.core.document_retrieval import build_knowledge_base, load_knowledge_base, split_text_into_chunks
+
+CHUNKS = [
+    {"filename": "a.txt", "content": "First chunk of a", "chunk_id": 0,
+     "filepath": "/docs/a.txt", "file_type": ".txt", "embedding": [1.0, 0.0, 0.0]},
+    {"filename": "a.txt", "content": "Second chunk of a é", "chunk_id": 1,
+     "filepath": "/docs/a.txt", "file_type": ".txt", "embedding": [0.0, 1.0, 0.0]},
+    {"filename": "b.md", "content": "Only chunk of b", "chunk_id": 0,
+     "filepath": "/docs/b.md", "file_type": ".md", "embedding": [0.0, 0.0, 2.0]},
+]
+
+def _strip(chunks):
+    return [{k: v for k, v in c.items() if k != "embedding"} for c in chunks]
+
+def test_save_and_load_chunk_table():
+    """Test that a saved chunk table loads back memory-mapped and unchanged."""
+    with tempfile.TemporaryDirectory() as kb_dir:
+        table = ChunkTable.from_chunks(CHUNKS)
+        kb_store.save_chunk_table(kb_dir, table, {"num_chunks": 3})
+        
+        loaded = kb_store.load_chunk_table(kb_dir)
+        
+        assert isinstance(loaded.embeddings, np.memmap)
+        assert np.allclose(loaded.embeddings, table.embeddings)
+        assert loaded.to_chunks() == _strip(CHUNKS)
+        assert kb_store.read_metadata(kb_dir)["format_version"] == kb_store.KB_FORMAT_VERSION
+
+def test_legacy_kb_is_migrated():
+    """Test that a knowledge_base.json is converted to the binary format on load."""
+    with tempfile.TemporaryDirectory() as kb_dir:
+        with open(os.path.join(kb_dir, kb_store.LEGACY_KB_FILE), "w") as f:
+            json.dump(CHUNKS, f)
+        
+        loaded = kb_store.load_chunk_table(kb_dir)
+        
+        assert loaded.to_chunks() == _strip(CHUNKS)
+        assert not os.path.exists(os.path.join(kb_dir, kb_store.LEGACY_KB_FILE))
+        assert os.path.exists(os.path.join(kb_dir, kb_store.EMBEDDINGS_FILE))
+
+def test_build_knowledge_base_writes_binary_format():
+    """Test that build_knowledge_base saves and reloads the binary format."""
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 4))
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        Path(source_dir, "doc.txt").write_text("Some documentation text.")
+        
+        with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            table = build_knowledge_base(source_dir, force=True)
+            loaded = load_knowledge_base(source_dir)
+        
+        kb_path_dir = os.path.join(source_dir, ".kb")
+        assert not os.path.exists(os.path.join(kb_path_dir, kb_store.LEGACY_KB_FILE))
+        assert len(loaded) == len(table) == 1
+        assert loaded[0]["content"] == "Some documentation text."
+        assert loaded.embeddings.shape == (1, 4)
+
+def _fake_model():
+    """Create a mock embedding model with deterministic per-text embeddings."""
+    model = MagicMock()
+    def encode(texts, **kwargs):
+        return np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts])
+    model.encode.side_effect = encode
+    return model
+
+def test_incremental_rebuild_matches_full_rebuild():
+    """Test that an incremental rebuild only embeds changed files and matches a full build."""
+    model = _fake_model()
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        Path(source_dir, "keep.txt").write_text("Unchanged document. " * 80)
+        Path(source_dir, "edit.txt").write_text("Original text.")
+        Path(source_dir, "gone.txt").write_text("This file will be deleted.")
+        
+        with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            build_knowledge_base(source_dir, force=True)
+            
+            Path(source_dir, "edit.txt").write_text("Edited text.")
+            Path(source_dir, "gone.txt").unlink()
+            Path(source_dir, "new.txt").write_text("A brand new file.")
+            
+            model.encode.reset_mock()
+            incremental = build_knowledge_base(source_dir)
+            encoded = [text for call in model.encode.call_args_list for text in call.args[0]]
+            
+            full = build_knowledge_base(source_dir, force=True)
+        
+        assert sorted(encoded) == ["A brand new file.", "Edited text."]
+        assert incremental.to_chunks() == full.to_chunks()
+        assert np.allclose(incremental.embeddings, full.embeddings)
+        
+        files = kb_store.read_metadata(os.path.join(source_dir, ".kb"))["files"]
+        assert "gone.txt" not in files
+        assert files["keep.txt"]["chunk_end"] - files["keep.txt"]["chunk_start"] > 1
+
+def test_update_documents_matches_full_rebuild():
+    """Test that an in-memory update of changed paths matches a full build and saves compactly."""
+    from ask_docs.core.document_retrieval import update_documents
+    
+    model = _fake_model()
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        kb_dir = os.path.join(source_dir, ".kb")
+        Path(source_dir, "keep.txt").write_text("Unchanged document. " * 80)
+        Path(source_dir, "edit.txt").write_text("Original text.")
+        Path(source_dir, "sub").mkdir()
+        Path(source_dir, "sub", "gone.txt").write_text("This directory will be deleted.")
+        
+        with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            build_knowledge_base(source_dir, force=True)
+            table = kb_store.load_chunk_table(kb_dir)
+            metadata = kb_store.read_metadata(kb_dir)
+            
+            Path(source_dir, "edit.txt").write_text("Edited text.")
+            Path(source_dir, "sub", "gone.txt").unlink()
+            Path(source_dir, "sub").rmdir()
+            Path(source_dir, "new.txt").write_text("A brand new file.")
+            
+            model.encode.reset_mock()
+            updated, metadata = update_documents(
+                table, metadata, source_dir,
+                [os.path.join(source_dir, "edit.txt"), "sub", "new.txt", "keep.txt"])
+            encoded = [text for call in model.encode.call_args_list for text in call.args[0]]
+            
+            kb_store.save_chunk_table(kb_dir, updated, metadata)
+            saved = kb_store.load_chunk_table(kb_dir)
+            
+            # The next build only has to check the files, not embed them
+            model.encode.reset_mock()
+            build_knowledge_base(source_dir)
+            assert not model.encode.called
+            full = build_knowledge_base(source_dir, force=True)
+        
+        assert sorted(encoded) == ["A brand new file.", "Edited text."]
+        
+        def by_chunk(table):
+            return sorted(zip(table.to_chunks(), table.embeddings[:].tolist()),
+                          key=lambda pair: (pair[0]["filename"], pair[0]["chunk_id"]))
+        
+        expected = by_chunk(full)
+        for actual in (by_chunk(updated), by_chunk(saved)):
+            assert [c for c, _ in actual] == [c for c, _ in expected]
+            assert np.allclose([e for _, e in actual], [e for _, e in expected])
+        # Only the text of current documents was saved
+        assert os.path.getsize(os.path.join(kb_dir, "texts.bin")) == len(full.text_store)
+        indices, _ = saved.lexical_index.search("edited", 1)
+        assert saved.filenames[int(indices[0])] == "edit.txt"
+        assert sorted(metadata["files"]) == ["edit.txt", "keep.txt", "new.txt"]
+
+def test_interrupted_build_resumes_from_checkpoint():
+    """Test that a build interrupted mid-way resumes without re-embedding finished batches."""
+    from ask_docs.config import DEFAULT_CONFIG
+    config = dict(DEFAULT_CONFIG["rag"], ingest_batch_size=1)
+    model = _fake_model()
+    encode = model.encode.side_effect
+    
+    def crash_on_third_batch(texts, **kwargs):
+        if model.encode.call_count == 3:
+            raise KeyboardInterrupt
+        return encode(texts)
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        for name in ["a.txt", "b.txt", "c.txt", "d.txt"]:
+            Path(source_dir, name).write_text(f"Contents of {name}.")
+        
+        with patch("ask_docs.core.document_retrieval.get_rag_config", return_value=config), \
+             patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            model.encode.side_effect = crash_on_third_batch
+            try:
+                build_knowledge_base(source_dir, force=True)
+            except KeyboardInterrupt:
+                pass
+            assert os.path.exists(os.path.join(source_dir, ".kb", kb_store.STAGING_DIR))
+            
+            model.encode.side_effect = encode
+            model.encode.reset_mock()
+            resumed = build_knowledge_base(source_dir, force=True)
+            encoded = [text for call in model.encode.call_args_list for text in call.args[0]]
+            
+            full = build_knowledge_base(source_dir, force=True)
+        
+        assert encoded == ["Contents of c.txt.", "Contents of d.txt."]
+        assert resumed.to_chunks() == full.to_chunks()
+        assert np.allclose(resumed.embeddings, full.embeddings)
+        assert not os.path.exists(os.path.join(source_dir, ".kb", kb_store.STAGING_DIR))
+
+def test_chunks_are_offsets_into_document_store():
+    """Test that overlapping chunks share one copy of each document's text."""
+    text = "Ünïcode sentence number one. " * 60
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        Path(source_dir, "doc.txt").write_text(text, encoding="utf-8")
+        
+        with patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=_fake_model()):
+            table = build_knowledge_base(source_dir, force=True, chunk_size=200, chunk_overlap=50)
+        
+        kb_path_dir = os.path.join(source_dir, ".kb")
+        assert os.path.getsize(os.path.join(kb_path_dir, kb_store.TEXTS_FILE)) == len(text.encode("utf-8"))
+        assert len(table) > 1
+        assert [c["content"] for c in table] == split_text_into_chunks(text, 200, 50)
+        assert table.documents[0]["end"] == len(text.encode("utf-8"))
+
+def test_quantized_embeddings_round_trip():
+    """Test that float16 and int8 storage stays close to the float32 embeddings."""
+    from ask_docs.core.quantization import QuantizedEmbeddings
+    rng = np.random.default_rng(0)
+    chunks = [dict(c, embedding=rng.normal(size=64).tolist()) for c in CHUNKS]
+    
+    for dtype, tolerance in [("float16", 1e-3), ("int8", 1e-2)]:
+        with tempfile.TemporaryDirectory() as kb_dir:
+            table = ChunkTable.from_chunks(chunks)
+            kb_store.save_chunk_table(kb_dir, table, {"embedding_dtype": dtype})
+            loaded = kb_store.load_chunk_table(kb_dir)
+            
+            assert isinstance(loaded.embeddings, QuantizedEmbeddings)
+            assert loaded.embeddings.storage_dtype == dtype
+            assert np.allclose(loaded.embeddings[:], table.embeddings, atol=tolerance)
+            query = table.embeddings[1]
+            assert np.allclose(loaded.embeddings @ query, table.embeddings @ query, atol=tolerance * 8)
+
+def test_build_with_int8_embeddings_and_rescoring():
+    """Test that an int8 build is smaller and rescoring keeps full-precision scores."""
+    from ask_docs.config import DEFAULT_CONFIG
+    from ask_docs.core.document_retrieval import _semantic_search
+    from ask_docs.core.embeddings import clear_query_cache
+    clear_query_cache()
+    config = dict(DEFAULT_CONFIG["rag"], embedding_dtype="int8", embedding_rescore_factor=2)
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, **kwargs: np.array(
+        [[len(t), sum(map(ord, t)) % 97, 1.0] * 32 for t in texts], dtype=float
+    )
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        for i in range(6):
+            Path(source_dir, f"doc{i}.txt").write_text(f"Document number {i} " * (i + 1))
+        
+        with patch("ask_docs.core.document_retrieval.get_rag_config", return_value=config), \
+             patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            table = build_knowledge_base(source_dir, force=True)
+            model.encode.side_effect = lambda text: np.array([12.0, 40.0, 1.0] * 32)
+            indices, scores = _semantic_search(table, "query", 3, "m")
+        
+        kb_path_dir = os.path.join(source_dir, ".kb")
+        codes = np.load(os.path.join(kb_path_dir, kb_store.EMBEDDINGS_FILE))
+        full = np.load(os.path.join(kb_path_dir, kb_store.FULL_EMBEDDINGS_FILE))
+        metadata = kb_store.read_metadata(kb_path_dir)
+        
+        assert codes.dtype == np.int8
+        assert codes.nbytes * 4 == full.nbytes
+        assert metadata["embedding_dtype"] == "int8" and metadata["embedding_rescore"]
+        query = np.array([12.0, 40.0, 1.0] * 32) / np.linalg.norm([12.0, 40.0, 1.0] * 32)
+        assert np.allclose(scores, full[indices] @ query, atol=1e-6)
+
+def test_incremental_int8_update_copies_stored_rows():
+    """Test that an update copies the int8 codes and scales of unchanged files as stored."""
+    from ask_docs.config import DEFAULT_CONFIG
+    from ask_docs.core.quantization import QuantizedEmbeddings, quantize
+    from ask_docs.core.vector_search import normalize_rows
+    config = dict(DEFAULT_CONFIG["rag"], embedding_dtype="int8", embedding_rescore_factor=0)
+    model = MagicMock()
+    def encode(texts, **kwargs):
+        return np.array([np.random.default_rng(sum(map(ord, t))).normal(size=16) for t in texts])
+    model.encode.side_effect = encode
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        for name in ["a.txt", "b.txt", "c.txt"]:
+            Path(source_dir, name).write_text(f"Contents of {name}.")
+        
+        with patch("ask_docs.core.document_retrieval.get_rag_config", return_value=config), \
+             patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            table = build_knowledge_base(source_dir, force=True)
+            # Store coarser codes that quantizing the dequantized rows again would not reproduce
+            kb_path_dir = os.path.join(source_dir, ".kb")
+            values = (np.array(table.embeddings.values) // 2).astype(np.int8)
+            scales = np.array(table.embeddings.scales) * 2
+            del table
+            np.save(os.path.join(kb_path_dir, kb_store.EMBEDDINGS_FILE), values)
+            np.save(os.path.join(kb_path_dir, kb_store.EMBEDDING_SCALES_FILE), scales)
+            
+            Path(source_dir, "b.txt").write_text("New contents of b.txt.")
+            updated = build_knowledge_base(source_dir)
+        
+        assert isinstance(updated.embeddings, QuantizedEmbeddings)
+        assert updated.embeddings.full is None
+        unchanged = [0, 2]
+        assert np.array_equal(updated.embeddings.values[unchanged], values[unchanged])
+        assert np.array_equal(updated.embeddings.scales[unchanged], scales[unchanged])
+        expected, expected_scales = quantize(normalize_rows(encode(["New contents of b.txt."])), "int8")
+        assert np.array_equal(updated.embeddings.values[1], expected[0])
+        assert np.allclose(updated.embeddings.scales[1], expected_scales[0])
+
+def test_fit_projection_truncate_keeps_neighbours():
+    """Test that truncating away empty dimensions keeps every nearest neighbour."""
+    from ask_docs.core.projection import fit_projection
+    rng = np.random.default_rng(1)
+    embeddings = np.zeros((200, 16), dtype=np.float32)
+    embeddings[:, :4] = rng.normal(size=(200, 4))
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    
+    projection = fit_projection(embeddings, "truncate", 4)
+    
+    assert projection.dim == 4
+    assert projection.info["recall_at_k"] == 1.0
+    assert projection.info["recall_queries"] == 20
+    assert fit_projection(embeddings, "pca", 16) is None
+
+def test_build_with_pca_projection():
+    """Test that projected builds store reduced embeddings and project queries and updates."""
+    from ask_docs.config import DEFAULT_CONFIG
+    from ask_docs.core.document_retrieval import _semantic_search
+    from ask_docs.core.embeddings import clear_query_cache
+    from ask_docs.core.vector_search import normalize_rows
+    clear_query_cache()
+    config = dict(DEFAULT_CONFIG["rag"], embedding_dim=4)
+    model = MagicMock()
+    def encode(texts, **kwargs):
+        return np.array([np.random.default_rng(sum(map(ord, t))).normal(size=32) for t in texts])
+    model.encode.side_effect = encode
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        for i in range(30):
+            Path(source_dir, f"doc{i}.txt").write_text(f"Document {i} about topic {i * 7}.")
+        
+        with patch("ask_docs.core.document_retrieval.get_rag_config", return_value=config), \
+             patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            table = build_knowledge_base(source_dir, force=True)
+            
+            Path(source_dir, "doc0.txt").write_text("Edited document.")
+            model.encode.reset_mock()
+            updated = build_knowledge_base(source_dir)
+            encoded = [text for call in model.encode.call_args_list for text in call.args[0]]
+            
+            model.encode.side_effect = lambda text: encode([text])[0]
+            indices, scores = _semantic_search(updated, "query", 3, "m")
+        
+        kb_path_dir = os.path.join(source_dir, ".kb")
+        info = kb_store.read_metadata(kb_path_dir)["embedding_projection"]
+        assert table.embeddings.shape == updated.embeddings.shape == (30, 4)
+        assert info["method"] == "pca" and info["input_dim"] == 32 and info["dim"] == 4
+        assert 0.0 <= info["recall_at_k"] <= 1.0
+        assert encoded == ["Edited document."]
+        assert np.allclose(updated.projection.components, table.projection.components)
+        query = updated.projection.transform(normalize_rows(encode(["query"])[0]))
+        assert np.allclose(scores, np.asarray(updated.embeddings[indices]) @ query, atol=1e-6)
+
+def test_projected_search_normalizes_queries_before_projecting():
+    """Test that queries from a model without normalization are projected like the stored rows."""
+    from ask_docs.config import DEFAULT_CONFIG
+    from ask_docs.core.document_retrieval import _semantic_search, _semantic_search_many
+    from ask_docs.core.embeddings import clear_query_cache
+    clear_query_cache()
+    config = dict(DEFAULT_CONFIG["rag"], embedding_dim=4)
+    model = MagicMock()
+    def encode(texts, **kwargs):
+        # Unnormalized vectors far from the origin, so the PCA mean matters
+        return np.array([np.random.default_rng(sum(map(ord, t))).normal(size=32) * 3 + 5 for t in texts])
+    model.encode.side_effect = encode
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        for i in range(30):
+            Path(source_dir, f"doc{i}.txt").write_text(f"Document {i} about topic {i * 7}.")
+        
+        with patch("ask_docs.core.document_retrieval.get_rag_config", return_value=config), \
+             patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            table = build_knowledge_base(source_dir, force=True)
+            row = list(table.filenames).index("doc3.txt")
+            query = table.contents[row]
+            
+            model.encode.side_effect = lambda text: encode([text])[0]
+            indices, scores = _semantic_search(table, query, 1, "m")
+            clear_query_cache()
+            model.encode.side_effect = encode
+            [(many_indices, many_scores)] = _semantic_search_many(table, [query], 1, "m")
+    
+    assert list(indices) == list(many_indices) == [row]
+    assert np.allclose(scores, 1.0, atol=1e-5) and np.allclose(many_scores, 1.0, atol=1e-5)
+
+def test_interrupted_projected_update_resumes_with_changed_files():
+    """Test that a projected update restarted after its finished files changed keeps the projection."""
+    from ask_docs.config import DEFAULT_CONFIG
+    from ask_docs.core.vector_search import normalize_rows
+    config = dict(DEFAULT_CONFIG["rag"], embedding_dim=4, ingest_batch_size=1)
+    model = MagicMock()
+    def encode(texts, **kwargs):
+        return np.array([np.random.default_rng(sum(map(ord, t))).normal(size=32) for t in texts])
+    def crash_on_second_batch(texts, **kwargs):
+        if model.encode.call_count == 2:
+            raise KeyboardInterrupt
+        return encode(texts)
+    
+    with tempfile.TemporaryDirectory() as source_dir:
+        for i in range(30):
+            Path(source_dir, f"doc{i}.txt").write_text(f"Document {i} about topic {i * 7}.")
+        
+        with patch("ask_docs.core.document_retrieval.get_rag_config", return_value=config), \
+             patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+            model.encode.side_effect = encode
+            table = build_knowledge_base(source_dir, force=True)
+            
+            Path(source_dir, "doc20.txt").write_text("Edited document twenty.")
+            Path(source_dir, "doc5.txt").write_text("Edited document five.")
+            model.encode.reset_mock()
+            model.encode.side_effect = crash_on_second_batch
+            try:
+                build_knowledge_base(source_dir)
+            except KeyboardInterrupt:
+                pass
+            
+            # A file the interrupted build already processed changes, so it starts over
+            Path(source_dir, "doc0.txt").write_text("Edited document zero.")
+            model.encode.side_effect = encode
+            updated = build_knowledge_base(source_dir)
+        
+        assert updated.embeddings.shape == (30, 4)
+        assert np.allclose(updated.projection.components, table.projection.components)
+        doc0 = list(updated.filenames).index("doc0.txt")
+        expected = updated.projection.transform(normalize_rows(encode(["Edited document zero."])))[0]
+        assert np.allclose(np.asarray(updated.embeddings[doc0]), expected, atol=1e-6)
+
+def test_knowledge_base_registry_reloads_changed_files():
+    """Test that a loaded knowledge base is reused until its files change on disk."""
+    from ask_docs.core.knowledge_base import clear_knowledge_bases, get_knowledge_base
+    
+    clear_knowledge_bases()
+    with tempfile.TemporaryDirectory() as source_dir:
+        kb_dir = os.path.join(source_dir, ".kb")
+        os.makedirs(kb_dir)
+        kb_store.save_chunk_table(kb_dir, ChunkTable.from_chunks(CHUNKS), {"num_chunks": 3})
+        
+        first = get_knowledge_base(source_dir)
+        assert get_knowledge_base(os.path.join(source_dir, ".")) is first
+        assert len(first) == 3
+        
+        kb_store.save_chunk_table(kb_dir, ChunkTable.from_chunks(CHUNKS[:2]), {"num_chunks": 2})
+        assert first.is_stale()
+        
+        second = get_knowledge_base(source_dir)
+        assert second is not first
+        assert len(second) == 2
+        assert second.metadata["num_chunks"] == 2
+    clear_knowledge_bases()
+
+def test_knowledge_base_registry_memory_budget(monkeypatch):
+    """Test that the least recently used knowledge bases are dropped beyond the memory budget."""
+    from ask_docs.config import get_config
+    from ask_docs.core.knowledge_base import clear_knowledge_bases, get_knowledge_base, loaded_knowledge_bases
+    
+    clear_knowledge_bases()
+    monkeypatch.setitem(get_config()["rag"], "kb_memory_budget_mb", 0.0001)
+    with tempfile.TemporaryDirectory() as first_dir, tempfile.TemporaryDirectory() as second_dir:
+        for source_dir in (first_dir, second_dir):
+            kb_dir = os.path.join(source_dir, ".kb")
+            os.makedirs(kb_dir)
+            kb_store.save_chunk_table(kb_dir, ChunkTable.from_chunks(CHUNKS), {"num_chunks": 3})
+            get_knowledge_base(source_dir)
+        
+        loaded = loaded_knowledge_bases()
+        assert [info["source_dir"] for info in loaded] == [os.path.realpath(second_dir)]
+        assert loaded[0]["memory_mb"] > 0
+    clear_knowledge_bases()
+
+def test_kb_info_counts_only_crawled_documents():
+    """Test that get_kb_info counts what a build would load, not files inside the knowledge base."""
+    from ask_docs.core.query_processor import get_kb_info
+    with tempfile.TemporaryDirectory() as source_dir:
+        Path(source_dir, "guide.md").write_text("# Guide")
+        Path(source_dir, "notes").mkdir()
+        Path(source_dir, "notes", "todo.txt").write_text("Todo")
+        staging_dir = Path(source_dir, ".kb", kb_store.STAGING_DIR)
+        staging_dir.mkdir(parents=True)
+        (staging_dir / "progress.json").write_text("{}")
+        (staging_dir / "texts.bin").write_bytes(b"staged")
+        
+        info = get_kb_info(source_dir)
+    
+    assert info["doc_count"] == 2
+    assert sorted(info["sample_docs"]) == ["guide.md", os.path.join("notes", "todo.txt")]
@@ -1,6 +1,6 @@
 """Tests for LLM implementations."""
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 from ask_docs.llm.base import BaseLLM
 from ask_docs.llm import get_llm
@@ -27,6 +27,53 @@ def test_get_llm():
     llm = get_llm("groq")
     assert isinstance(llm, GroqLLM)
 
+def test_get_llm_returns_cached_instance():
+    """Test that get_llm reuses instances until the provider configuration changes."""
+    from ask_docs.llm import clear_llm_cache, llm_pool_stats
+    clear_llm_cache()
+    config = {"model": "llama3", "base_url": "http://localhost:11434"}
+    
+    with patch("ask_docs.llm.get_model_config", return_value=config):
+        first = get_llm("ollama")
+        second = get_llm("ollama")
+        config["base_url"] = "http://gpu-box:11434"
+        third = get_llm("ollama")
+    
+    assert first is second
+    assert third is not first
+    stats = llm_pool_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    assert [client["provider"] for client in stats["clients"]] == ["ollama", "ollama"]
+    clear_llm_cache()
+    assert llm_pool_stats()["size"] == 0
+
+def test_connection_pool_reuses_session():
+    """Test that the pool hands out one keep-alive session sized by pool_size."""
+    from ask_docs.llm.pool import ConnectionPool
+    pool = ConnectionPool(pool_size=4)
+    
+    session = pool.session()
+    
+    assert pool.session() is session
+    assert session.get_adapter("https://example.com")._pool_maxsize == 4
+    assert pool.stats() == {"requests": 0, "connections": 0, "tls_handshakes": 0, "idle_connections": 0}
+    pool.close()
+
+def test_connection_pool_keeps_one_async_client_per_loop():
+    """Test that async HTTP clients are shared within an event loop but not across loops."""
+    import asyncio
+    from ask_docs.llm.pool import ConnectionPool
+    pool = ConnectionPool()
+    
+    async def get_clients():
+        return pool.async_http_client(), pool.async_http_client()
+    
+    first, same = asyncio.run(get_clients())
+    other, _ = asyncio.run(get_clients())
+    
+    assert first is same
+    assert other is not first
+
 def test_get_llm_invalid():
     """Test that get_llm raises an error for invalid model."""
     with pytest.raises(ValueError):
@@ -62,7 +109,7 @@ def test_openai_llm_no_api_key(mock_openai):
     mock_openai.assert_not_called()
 
 # Ollama LLM Tests
-@patch('ask_docs.llm.ollama_llm.requests.post')
+@patch('requests.Session.post')
 def test_ollama_llm(mock_post):
     """Test the Ollama LLM implementation."""
     # Setup mock
@@ -78,7 +125,7 @@ def test_ollama_llm(mock_post):
     assert response == "This is a test response"
     mock_post.assert_called_once()
 
-@patch('ask_docs.llm.ollama_llm.requests.post')
+@patch('requests.Session.post')
 def test_ollama_llm_error(mock_post):
     """Test Ollama LLM error handling."""
     # Setup mock to raise an exception
@@ -89,4 +136,268 @@ def test_ollama_llm_error(mock_post):
     response = llm.ask("Test prompt")
     
     # Verify
-    assert "Error with Ollama API: Test error" in response
\ No newline at end of file
+    assert "Error with Ollama API: Test error" in response
+
+def test_base_llm_ask_async_runs_ask_in_thread():
+    """Test that providers without a native async client fall back to ask."""
+    import asyncio
+    
+    class EchoLLM(BaseLLM):
+        def ask(self, prompt):
+            return f"echo: {prompt}"
+    
+    assert asyncio.run(EchoLLM().ask_async("hi")) == "echo: hi"
+
+@patch('ask_docs.llm.openai_llm.AsyncOpenAI')
+@patch('ask_docs.llm.openai_llm.OpenAI')
+def test_openai_llm_ask_async(mock_openai, mock_async_openai):
+    """Test that the OpenAI LLM uses the async client in ask_async."""
+    import asyncio
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "Async response"
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+    mock_async_openai.return_value = mock_client
+    
+    llm = OpenAI_LLM(api_key="test_key")
+    response = asyncio.run(llm.ask_async("Test prompt"))
+    
+    assert response == "Async response"
+    mock_client.chat.completions.create.assert_awaited_once()
+    mock_openai.return_value.chat.completions.create.assert_not_called()
+
+@patch('ask_docs.llm.ollama_llm.httpx.AsyncClient')
+def test_ollama_llm_ask_async(mock_client_class):
+    """Test that the Ollama LLM posts through its pooled async HTTP client."""
+    import asyncio
+    mock_response = MagicMock(status_code=200)
+    mock_response.json.return_value = {"response": "Async response"}
+    mock_client = mock_client_class.return_value
+    mock_client.post = AsyncMock(return_value=mock_response)
+    
+    response = asyncio.run(OllamaLLM().ask_async("Test prompt"))
+    
+    assert response == "Async response"
+    assert mock_client.post.call_args.kwargs["json"]["stream"] is False
+
+def test_process_query_async():
+    """Test that process_query_async retrieves and awaits the LLM."""
+    import asyncio
+    from ask_docs.core.query_processor import process_query_async
+    llm = MagicMock()
+    llm.ask_async = AsyncMock(return_value="The answer")
+    chunks = [{"filename": "a.md", "content": "WSYNC halts the CPU"}]
+    
+    with patch("ask_docs.core.query_processor._retrieve", return_value=(chunks, "prompt")), \
+         patch("ask_docs.core.query_processor.get_llm", return_value=llm):
+        answer = asyncio.run(process_query_async("What does WSYNC do?", model="openai"))
+    
+    assert answer == "The answer"
+    llm.ask_async.assert_awaited_once_with("prompt")
+
+@patch('requests.Session.post')
+def test_ollama_llm_stream_parses_ndjson(mock_post):
+    """Test that the Ollama LLM yields the pieces of its NDJSON stream."""
+    mock_response = mock_post.return_value.__enter__.return_value
+    mock_response.status_code = 200
+    mock_response.iter_lines.return_value = [
+        b'{"response": "Hello", "done": false}',
+        b'',
+        b'{"response": " world", "done": false}',
+        b'{"response": "", "done": true}',
+    ]
+    
+    pieces = list(OllamaLLM().stream("Test prompt"))
+    
+    assert pieces == ["Hello", " world"]
+    assert mock_post.call_args.kwargs["json"]["stream"] is True
+
+@patch('ask_docs.llm.openai_llm.OpenAI')
+def test_openai_llm_stream(mock_openai):
+    """Test that the OpenAI LLM yields content deltas from a streamed completion."""
+    def chunk(content):
+        c = MagicMock()
+        c.choices[0].delta.content = content
+        return c
+    mock_openai.return_value.chat.completions.create.return_value = iter([chunk("Hel"), chunk(None), chunk("lo")])
+    
+    pieces = list(OpenAI_LLM(api_key="test_key").stream("Test prompt"))
+    
+    assert pieces == ["Hel", "lo"]
+    assert mock_openai.return_value.chat.completions.create.call_args.kwargs["stream"] is True
+
+def test_ask_question_streams_to_on_token():
+    """Test that ask_question passes streamed pieces to on_token and joins the answer."""
+    from ask_docs.core.query_processor import ask_question
+    llm = MagicMock()
+    llm.stream.return_value = iter(["The ", "answer"])
+    tokens = []
+    
+    with patch("ask_docs.core.query_processor._retrieve", return_value=([], "prompt")), \
+         patch("ask_docs.core.query_processor.get_llm", return_value=llm):
+        result = ask_question("What does WSYNC do?", model="openai", on_token=tokens.append)
+    
+    assert tokens == ["The ", "answer"]
+    assert result["answer"] == "The answer"
+    llm.ask.assert_not_called()
+
+class CountingLLM(BaseLLM):
+    """LLM that numbers its answers, to tell fresh answers from cached ones."""
+    provider = "test"
+    model = "counting"
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def ask(self, prompt):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+def test_response_cache_is_opt_in(monkeypatch):
+    """Test that responses are only cached once the cache is enabled in the config."""
+    from ask_docs.config import DEFAULT_CONFIG, get_config
+    from ask_docs.llm.response_cache import get_response_cache
+    assert DEFAULT_CONFIG["cache"]["enabled"] is False
+    monkeypatch.setitem(get_config(), "cache", {})
+    assert get_response_cache() is None
+
+@pytest.fixture
+def response_cache(tmp_path, monkeypatch):
+    """Enable the response cache in a temporary database."""
+    from ask_docs.config import get_config
+    from ask_docs.llm.response_cache import get_response_cache
+    monkeypatch.setitem(get_config(), "cache", {"enabled": True, "path": str(tmp_path / "cache.sqlite3"),
+                                                "ttl": 3600, "max_size_mb": 1})
+    return get_response_cache()
+
+def test_response_cache_answers_repeated_prompts(response_cache):
+    """Test that identical prompts are answered from the cache unless it is bypassed."""
+    import asyncio
+    from ask_docs.llm.response_cache import cached_ask, cached_ask_async, cached_stream
+    llm = CountingLLM()
+    
+    assert cached_ask(llm, "prompt") == "answer 1"
+    assert cached_ask(llm, "prompt") == "answer 1"
+    assert list(cached_stream(llm, "prompt")) == ["answer 1"]
+    assert asyncio.run(cached_ask_async(llm, "prompt")) == "answer 1"
+    assert cached_ask(llm, "prompt", use_cache=False) == "answer 2"
+    assert cached_ask(llm, "other prompt") == "answer 3"
+    
+    stats = response_cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 3, 2)
+    assert stats["providers"] == {"test": 2}
+
+def test_cached_stream_async_bridges_sync_stream(response_cache):
+    """Test that the default async stream yields the sync stream's pieces and is cached."""
+    import asyncio
+    from ask_docs.llm.response_cache import cached_stream_async
+    
+    class PiecesLLM(CountingLLM):
+        def stream(self, prompt):
+            self.calls += 1
+            yield "first "
+            yield "second"
+    
+    async def collect(llm):
+        return [piece async for piece in cached_stream_async(llm, "prompt")]
+    
+    llm = PiecesLLM()
+    assert asyncio.run(collect(llm)) == ["first ", "second"]
+    assert asyncio.run(collect(llm)) == ["first second"]
+    assert llm.calls == 1
+
+def test_response_cache_expires_and_evicts(response_cache):
+    """Test that expired entries are dropped and the least recently used are evicted."""
+    response_cache.put("old", "test", "m", "stale")
+    with patch("ask_docs.llm.response_cache.time.time", return_value=10 ** 10):
+        assert response_cache.get("old") is None
+    
+    response_cache.max_bytes = 20
+    response_cache.put("a", "test", "m", "x" * 10)
+    response_cache.put("b", "test", "m", "y" * 10)
+    response_cache.get("a")  # "b" is now least recently used
+    response_cache.put("c", "test", "m", "z" * 10)
+    
+    assert response_cache.get("b") is None
+    assert response_cache.get("a") == "x" * 10
+    assert response_cache.stats()["evictions"] == 1
+
+def test_response_cache_skips_errors(response_cache):
+    """Test that provider error messages are not cached."""
+    from ask_docs.llm.response_cache import cached_ask
+    llm = MagicMock(provider="test", model="m")
+    llm.generation_params.return_value = {}
+    llm.ask.return_value = "Error with Test API: timeout"
+    
+    cached_ask(llm, "prompt")
+    cached_ask(llm, "prompt")
+    
+    assert llm.ask.call_count == 2
+    assert response_cache.stats()["entries"] == 0
+
+def test_response_cache_skips_streams_ending_in_errors(response_cache):
+    """Test that a stream interrupted by a provider error is not cached."""
+    import asyncio
+    from ask_docs.llm.response_cache import cached_stream, cached_stream_async
+    
+    class FailingStreamLLM(CountingLLM):
+        def stream(self, prompt):
+            self.calls += 1
+            yield "Partial "
+            yield "Error with OpenAI API: connection reset"
+    
+    async def collect(llm):
+        return [piece async for piece in cached_stream_async(llm, "prompt")]
+    
+    llm = FailingStreamLLM()
+    assert list(cached_stream(llm, "prompt")) == ["Partial ", "Error with OpenAI API: connection reset"]
+    assert asyncio.run(collect(llm)) == ["Partial ", "Error with OpenAI API: connection reset"]
+    assert llm.calls == 2
+    assert response_cache.stats()["entries"] == 0
+
+def test_ask_many_retrieves_in_batches_and_limits_concurrency():
+    """Test that ask_many retrieves per batch and keeps LLM calls under the concurrency limit."""
+    import threading
+    import time
+    from ask_docs.core.query_processor import ask_many
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    
+    class SlowLLM(BaseLLM):
+        provider, model = "test", "slow"
+        def ask(self, prompt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return f"answer to {prompt}"
+    
+    def retrieve(kb, questions):
+        return [[{"filename": "a.md", "content": q}] for q in questions]
+    
+    questions = [f"q{i}" for i in range(7)]
+    with patch("ask_docs.core.query_processor.get_knowledge_base", return_value=MagicMock()), \
+         patch("ask_docs.core.query_processor.get_best_chunks_many", side_effect=retrieve) as batches, \
+         patch("ask_docs.core.query_processor.build_prompt", side_effect=lambda chunks, q, t: q), \
+         patch("ask_docs.core.query_processor.get_llm", return_value=SlowLLM()):
+        results = list(ask_many(questions, model="test", max_concurrency=2, batch_size=3))
+    
+    assert batches.call_count == 3
+    assert sorted(r["index"] for r in results) == list(range(7))
+    assert all(r["answer"] == f"answer to {r['question']}" for r in results)
+    assert peak[0] == 2
+
+def test_ask_question_returns_scored_chunks():
+    """Test that ask_question reports the scores of the chunks it retrieved."""
+    from ask_docs.core.query_processor import ask_question
+    llm = MagicMock()
+    llm.ask.return_value = "The answer"
+    chunks = [{"filename": "a.md", "content": "WSYNC halts the CPU", "similarity": 0.75}]
+    
+    with patch("ask_docs.core.query_processor._retrieve", return_value=(chunks, "prompt")), \
+         patch("ask_docs.core.query_processor.get_llm", return_value=llm):
+        result = ask_question("What does WSYNC do?", model="openai")
+    
+    assert result["chunks"] == [{"filename": "a.md", "snippet": "WSYNC halts the CPU", "similarity": 0.75}]
@@ -0,0 +1,134 @@
+"""Tests for the source directory watcher."""
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pytest
+
+from ask_docs.core import knowledge_base
+from ask_docs.core.document_retrieval import build_knowledge_base, get_best_chunks_lexical
+from ask_docs.core.watcher import SourceWatcher
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    """Start and finish every test with no loaded knowledge bases."""
+    knowledge_base.clear_knowledge_bases()
+    yield
+    knowledge_base.clear_knowledge_bases()
+
+
+def _fake_model():
+    """Create a mock embedding model with deterministic per-text embeddings."""
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, **kwargs: np.array(
+        [[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts])
+    return model
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the watcher"
+        time.sleep(0.02)
+
+
+def test_watcher_applies_changes_incrementally():
+    """Test that created, modified and deleted files reach the loaded knowledge base."""
+    model = _fake_model()
+
+    with tempfile.TemporaryDirectory() as source_dir, \
+         patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+        Path(source_dir, "a.txt").write_text("Alpha document.")
+        Path(source_dir, "b.txt").write_text("Beta document.")
+        build_knowledge_base(source_dir, force=True)
+        before = knowledge_base.get_knowledge_base(source_dir)
+        model.encode.reset_mock()
+
+        with SourceWatcher(source_dir, backend="poll", debounce=0.05, poll_interval=0.02) as watcher:
+            Path(source_dir, "a.txt").write_text("Alpha document, revised.")
+            Path(source_dir, "b.txt").unlink()
+            Path(source_dir, "c.txt").write_text("Gamma document.")
+            _wait_for(lambda: sorted(knowledge_base.get_knowledge_base(source_dir).table.filenames)
+                      == ["a.txt", "c.txt"])
+
+        after = knowledge_base.get_knowledge_base(source_dir)
+        assert watcher.updates >= 1 and watcher.errors == 0
+        assert after is not before
+        assert len(before) == 2
+        assert [chunk["content"] for chunk in after.table] == ["Alpha document, revised.", "Gamma document."]
+        # Only the new and modified files were embedded again
+        embedded = [t for call in model.encode.call_args_list for t in call.args[0]]
+        assert sorted(embedded) == ["Alpha document, revised.", "Gamma document."]
+
+
+def test_watcher_updates_table_in_memory_and_saves_in_background():
+    """Test that changed paths are applied without a full build and then saved."""
+    model = _fake_model()
+
+    with tempfile.TemporaryDirectory() as source_dir, \
+         patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=model):
+        Path(source_dir, "a.txt").write_text("Alpha document.")
+        Path(source_dir, "b.txt").write_text("Beta document.")
+        build_knowledge_base(source_dir, force=True)
+
+        with patch("ask_docs.core.watcher.build_knowledge_base") as full_build, \
+             SourceWatcher(source_dir, backend="poll", debounce=0.05, poll_interval=0.02) as watcher:
+            Path(source_dir, "b.txt").write_text("Beta document, revised.")
+            Path(source_dir, "c.txt").write_text("Gamma document.")
+            _wait_for(lambda: sorted(knowledge_base.get_knowledge_base(source_dir).table.filenames)
+                      == ["a.txt", "b.txt", "c.txt"] and watcher.saves >= 1)
+            assert knowledge_base.get_knowledge_base(source_dir).live
+
+        assert not full_build.called
+        assert watcher.errors == 0
+        # The saved knowledge base holds the changes and is read from disk again
+        knowledge_base.clear_knowledge_bases()
+        saved = knowledge_base.get_knowledge_base(source_dir)
+        assert not saved.live
+        assert sorted(chunk["content"] for chunk in saved.table) == [
+            "Alpha document.", "Beta document, revised.", "Gamma document."]
+        assert sorted(saved.metadata["files"]) == ["a.txt", "b.txt", "c.txt"]
+
+
+def test_loaded_table_keeps_searching_during_update():
+    """Test that a table loaded before an update still searches its own memory-mapped files."""
+    with tempfile.TemporaryDirectory() as source_dir, \
+         patch("ask_docs.core.document_retrieval.get_embedding_model", return_value=_fake_model()):
+        Path(source_dir, "a.txt").write_text("Alpha apples grow on alpha trees.")
+        Path(source_dir, "b.txt").write_text("Beta bananas are yellow.")
+        Path(source_dir, "c.txt").write_text("Gamma grapes and alpha apples.")
+        build_knowledge_base(source_dir, force=True)
+        # Load from disk, so the lexical index is memory-mapped
+        knowledge_base.clear_knowledge_bases()
+        old_table = knowledge_base.get_knowledge_base(source_dir).table
+        assert isinstance(old_table.lexical_index.doc_ids, np.memmap)
+        expected = [chunk["content"] for chunk in get_best_chunks_lexical(old_table, "alpha apples", 2)]
+
+        with SourceWatcher(source_dir, backend="poll", debounce=0.05, poll_interval=0.02):
+            Path(source_dir, "a.txt").write_text("Delta dates.")
+            Path(source_dir, "c.txt").unlink()
+            _wait_for(lambda: knowledge_base.get_knowledge_base(source_dir).table is not old_table)
+
+        assert [chunk["content"] for chunk in get_best_chunks_lexical(old_table, "alpha apples", 2)] == expected
+        assert expected == ["Alpha apples grow on alpha trees.", "Gamma grapes and alpha apples."]
+
+
+def test_watcher_ignores_knowledge_base_directory():
+    """Test that writes to the knowledge base directory do not trigger updates."""
+    with tempfile.TemporaryDirectory() as source_dir:
+        watcher = SourceWatcher(source_dir, backend="poll", debounce=0.01)
+        watcher.notify(os.path.join(source_dir, ".kb", "metadata.json"))
+        assert not watcher._changed.is_set()
+
+        watcher.notify(os.path.join(source_dir, "notes.md"))
+        assert watcher._changed.is_set()
+
+
+def test_unsupported_watch_backend():
+    """Test that an unknown backend is rejected."""
+    with pytest.raises(ValueError):
+        SourceWatcher(backend="fsevents")
@@ -1,6 +1,8 @@
 """Tests for web interface."""
+import asyncio
+import time
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from starlette.testclient import TestClient
 
 from ask_docs.web.app import create_app
@@ -77,4 +79,63 @@ def test_model_info_route(client):
     assert "Ollama" in response.text.lower() or "ollama" in response.text.lower()
     assert "Claude" in response.text.lower() or "claude" in response.text.lower()
     assert "Gemini" in response.text.lower() or "gemini" in response.text.lower() 
-    assert "Groq" in response.text.lower() or "groq" in response.text.lower()
\ No newline at end of file
+    assert "Groq" in response.text.lower() or "groq" in response.text.lower()
+
+async def _pieces(*pieces):
+    for piece in pieces:
+        yield piece
+
+@patch('ask_docs.web.handlers.ask_question_stream_async')
+def test_ask_stream_route(mock_stream, client):
+    """Test that the streaming route sends the answer as server-sent events."""
+    mock_stream.return_value = _pieces("First line\nsecond", " line")
+    
+    response = client.get("/ask-stream", params={"question": "How does WSYNC work?", "model": "openai"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        "data: First line\ndata: second\n\n"
+        "data:  line\n\n"
+        "event: done\ndata: \n\n"
+    )
+    assert mock_stream.call_args.args == ("How does WSYNC work?", "openai", None)
+
+@patch('ask_docs.web.handlers.ask_question_with_matches_async', new_callable=AsyncMock)
+def test_api_ask_returns_answer_and_scored_chunks(mock_ask, client):
+    """Test that the JSON API returns the answer with the chunks from the same retrieval."""
+    mock_ask.return_value = {
+        "answer": "WSYNC halts the CPU.",
+        "model": "openai",
+        "num_chunks": 1,
+        "chunks": [{"filename": "tia.md", "snippet": "WSYNC halts...", "similarity": 0.82}]
+    }
+    
+    response = client.post("/api/ask", json={"question": "What does WSYNC do?", "model": "openai"})
+    
+    assert response.status_code == 200
+    assert response.json()["chunks"][0]["similarity"] == 0.82
+    mock_ask.assert_awaited_once()
+    assert mock_ask.call_args.args == ("What does WSYNC do?", "openai", None)
+    assert client.post("/api/ask", json={}).status_code == 400
+
+def test_api_ask_serves_questions_concurrently(client):
+    """Test that slow answers are awaited concurrently, not one request at a time."""
+    async def slow_answer(question, model, template, executor=None):
+        await asyncio.sleep(0.2)
+        return {"answer": question, "model": model, "num_chunks": 0, "chunks": []}
+    
+    async def ask_all(app):
+        from httpx import ASGITransport, AsyncClient
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+            return await asyncio.gather(*[
+                http.post("/api/ask", json={"question": f"Question {i}"}) for i in range(10)
+            ])
+    
+    with patch("ask_docs.web.handlers.ask_question_with_matches_async", side_effect=slow_answer):
+        start = time.perf_counter()
+        responses = asyncio.run(ask_all(client.app))
+        elapsed = time.perf_counter() - start
+    
+    assert [r.json()["answer"] for r in responses] == [f"Question {i}" for i in range(10)]
+    assert elapsed < 1.0